@@ -1,12 +1,30 @@
+import os
+
 import celery
-from django_tools.utils import setup_django_if_needed
 
-setup_django_if_needed()
+from feed.codec import register_codec
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+# O worker roda o django.setup() pelo fixup do Celery; os system checks
+# importariam a URLconf e o Ninja, que ele não usa. Rode-os no deploy.
+os.environ.setdefault("CELERY_SKIP_CHECKS", "1")
+register_codec()
 
 celery_app = celery.Celery("feed")
 
 celery_app.config_from_object("django.conf:settings", namespace="CELERY")
 
-celery_app.autodiscover_tasks()
+
+@celery_app.on_after_configure.connect
+def configure_queues(sender, **kwargs):  # noqa: ARG001
+    """Filas das partições, montadas só quando a configuração é lida."""
+    from feed.partitions import product_queues
+
+    # Filas das partições ligadas ao exchange product_events; um worker por
+    # partição (-Q product_reply.N --concurrency 1) mantém a ordem por SKU.
+    sender.conf.task_queues = product_queues()
+
+
+celery_app.autodiscover_tasks(related_name="task")
 
 __all__ = ("celery_app",)
@@ -0,0 +1,137 @@
+"""Roteamento de leituras para a réplica do banco.
+
+Com o alias ``replica`` configurado (veja ``DATABASE_REPLICA_NAME`` no
+settings), só as leituras marcadas com ``read_replica``/``replica_reads`` vão
+para a réplica: endpoints somente leitura e jobs de exportação/reconciliação.
+Todo o resto, escritas, relay do outbox e leituras dentro de uma transação,
+fica no primário.
+
+Uma leitura logo depois de uma escrita pode não enxergar o dado na réplica
+(atraso de replicação). Por isso, depois de uma escrita, as leituras do mesmo
+contexto ficam no primário por ``DATABASE_PRIMARY_STICKY_SECONDS``. No feed não
+há fixação entre requisições: a API não grava (o espelho é escrito pelos
+consumidores), então ``PrimaryPinningMiddleware`` não está instalado aqui; ele
+só faz efeito na API de produtos.
+"""
+
+import inspect
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = "replica"
+PIN_COOKIE = "db_primary_until"
+
+_use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+_primary_until: ContextVar[float] = ContextVar("primary_until", default=0.0)
+# Estado da requisição corrente; um objeto mutável para a escrita ser vista
+# pelo middleware mesmo quando a view roda em outro contexto (sync_to_async).
+_request_state: ContextVar[dict | None] = ContextVar("request_state", default=None)
+
+
+def has_replica() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def replica_reads():
+    """Leituras feitas neste bloco podem ir para a réplica."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def read_replica(view):
+    """Marca um endpoint (síncrono ou assíncrono) como somente leitura."""
+    if inspect.iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+
+    return wrapper
+
+
+def pin_primary(seconds: float | None = None):
+    """Mantém as leituras deste contexto no primário pelos próximos ``seconds``."""
+    if seconds is None:
+        seconds = settings.DATABASE_PRIMARY_STICKY_SECONDS
+    _primary_until.set(max(_primary_until.get(), time.time() + seconds))
+
+
+class ReplicaRouter:
+    """Escritas no primário; leituras marcadas na réplica, salvo escrita recente."""
+
+    def db_for_read(self, model, **hints):  # noqa: ARG002
+        if not _use_replica.get() or not has_replica():
+            return DEFAULT_DB_ALIAS
+        if time.time() < _primary_until.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Dentro de uma transação de escrita a leitura tem que ver o que ela gravou.
+            return DEFAULT_DB_ALIAS
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):  # noqa: ARG002
+        pin_primary()
+        state = _request_state.get()
+        if state is not None:
+            state["escreveu"] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):  # noqa: ARG002
+        # Primário e réplica têm os mesmos dados.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):  # noqa: ARG002
+        # A réplica recebe o esquema pela replicação (ou por sync_replica).
+        return db != REPLICA_ALIAS
+
+
+class PrimaryPinningMiddleware:
+    """Fixa no primário, por um cookie, as leituras do cliente que acabou de escrever."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0.0
+
+        state = {"escreveu": False}
+        pin_token = _primary_until.set(pinned_until)
+        state_token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(state_token)
+            _primary_until.reset(pin_token)
+
+        # Só quem gravou fica fixo: um POST somente leitura (/produtos/batch) não.
+        if state["escreveu"]:
+            window = settings.DATABASE_PRIMARY_STICKY_SECONDS
+            response.set_cookie(
+                PIN_COOKIE,
+                f"{time.time() + window:.3f}",
+                max_age=math.ceil(window),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -1,5 +1,6 @@
 """Django settings for core project."""
 
+import os
 from pathlib import Path
 
 from django_tools.settings import DjangoSettings
@@ -14,7 +15,6 @@ base_settings = DjangoSettings(env_file=ENV_FILE)
 # === Security Settings ===
 SECRET_KEY = base_settings.secret_key
 DEBUG = base_settings.debug
-print(f"ALLOWED_HOSTS: {base_settings.allowed_hosts}\nAPI_NAME: {base_settings.api_name}")
 ALLOWED_HOSTS = base_settings.allowed_hosts
 
 # === Application Definition ===
@@ -43,6 +43,20 @@ WSGI_APPLICATION = "core.wsgi.application"
 # === Database ===
 DATABASES = base_settings.databases
 
+# === Database Routing ===
+# Réplica de leitura: a configuração do default com outro NAME (banco ou arquivo
+# SQLite) e/ou HOST. Sem as variáveis tudo vai para o default. Só leituras
+# marcadas (core.db_router.read_replica/replica_reads) usam a réplica.
+_replica = {
+    key: os.environ[f"DATABASE_REPLICA_{key}"]
+    for key in ("NAME", "HOST", "PORT")
+    if os.environ.get(f"DATABASE_REPLICA_{key}")
+}
+if _replica:
+    DATABASES["replica"] = {**DATABASES["default"], **_replica}
+DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+DATABASE_PRIMARY_STICKY_SECONDS = 2.0  # leituras no primário depois de uma escrita
+
 # === Authentication & Password Validation ===
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -100,6 +114,9 @@ for key, value in base_settings.celery_config.items():
     celery_key = f"CELERY_{key.upper()}"
     globals()[celery_key] = value
 
+# Eventos de produto chegam no codec binário (feed.codec); JSON segue aceito.
+CELERY_ACCEPT_CONTENT = ["json", "application/x-produto-msgpack"]
+
 # === Redis Configuration ===
 for key, value in base_settings.redis_config.items():
     redis_key = f"REDIS_{key.upper()}"
@@ -110,13 +127,86 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
         "LOCATION": base_settings.redis_url,
-        "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
-        },
         "KEY_PREFIX": "feed_cache",
         "TIMEOUT": 300,  # 5 minutos
     }
 }
 
+# === Batching Consumer ===
+FEED_BATCH_MAX_ITEMS = 500  # produtos por lote aplicado
+FEED_BATCH_MAX_LATENCY_MS = 200  # espera máxima pelo lote, em ms
+
+# === Product Partitions ===
+# Filas product_reply.N entre as quais os eventos são divididos por SKU. Tem
+# que ser igual em api_produtos e api_feed; veja o README antes de mudar.
+PRODUCT_PARTITIONS = int(os.environ.get("PRODUCT_PARTITIONS", "1"))
+
+# === Event Deduplication ===
+# Janela de evento_id já aplicados: "cache" (Redis, compartilhada entre os
+# workers), "memory" (LRU por processo), "bloom" (Bloom por processo) ou None.
+FEED_DEDUP_BACKEND = "cache"
+FEED_DEDUP_TTL = 3600  # segundos que um evento fica na janela "cache"
+FEED_DEDUP_WINDOW = 100_000  # eventos lembrados pelas janelas "memory" e "bloom"
+FEED_DEDUP_ERROR_RATE = 0.001  # taxa de falso positivo da janela "bloom"
+
+# === Retries & Dead Letters ===
+# Erros transitórios (banco travado/fora do ar) são tentados de novo com backoff
+# exponencial e jitter; os permanentes vão para a fila product_dead_letter
+# (veja replay_dead_letters).
+FEED_RETRY_MAX_ATTEMPTS = 5  # novas tentativas de uma task antes da dead-letter
+FEED_RETRY_BASE_DELAY = 1.0  # segundos; dobra a cada tentativa
+FEED_RETRY_MAX_DELAY = 60.0  # teto do backoff, em segundos
+
+# === Catalog Snapshot ===
+FEED_SNAPSHOT_SEGMENT_SIZE = 10_000  # SKUs por segmento (após mudar, rode build_snapshot --reset)
+FEED_SNAPSHOT_COMPRESS_LEVEL = 6  # nível do gzip dos segmentos
+
+# === Catalog Facets ===
+# Limites inferiores das faixas de preço das facetas; após mudar, rode recompute_facets.
+FEED_FACET_PRICE_BANDS = (0, 50, 100, 250, 500, 1000, 2500)
+
+# === Reconciliation ===
+PRODUTOS_API_URL = "http://0.0.0.0:8001"
+RECONCILE_FANOUT = 16  # subfaixas comparadas por nível
+RECONCILE_LEAF_SIZE = 256  # abaixo disso a faixa é reparada direto
+
+# === Metrics ===
+# Cada processo (API, workers, consumidores) exporta suas métricas para este
+# diretório; o endpoint /metrics soma os snapshots dos processos vivos (gauges
+# saem por pid) e apaga os não regravados há 3 intervalos.
+METRICS_DIR = os.environ.get("METRICS_DIR", f"{BASE_DIR}/.metrics")
+METRICS_EXPORT_INTERVAL = 5.0  # segundos entre exportações de cada processo
+
+# === Health Check ===
+HEALTH_DEADLINE = 2.0  # prazo total (s) para sondar broker, Redis, banco e workers
+HEALTH_CACHE_TTL = 5.0  # segundos em que o último relatório é reaproveitado
+
+# === Benchmark Overrides ===
+# Com ECOSSISTEM_BENCH_DIR definido o serviço roda isolado numa máquina: SQLite,
+# broker em arquivos (kombu filesystem) e cache em memória. Usado por
+# benchmarks/pipeline.py.
+BENCH_DIR = os.environ.get("ECOSSISTEM_BENCH_DIR")
+if BENCH_DIR:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": f"{BENCH_DIR}/feed.sqlite3",
+            "OPTIONS": {
+                "timeout": 30,
+                "transaction_mode": "IMMEDIATE",
+                "init_command": "PRAGMA journal_mode=WAL;",
+            },
+        }
+    }
+    CELERY_BROKER_URL = "filesystem://"
+    CELERY_BROKER_TRANSPORT_OPTIONS = {
+        "data_folder_in": f"{BENCH_DIR}/broker/data",
+        "data_folder_out": f"{BENCH_DIR}/broker/data",
+        "control_folder": f"{BENCH_DIR}/broker/control",
+    }
+    CELERY_RESULT_BACKEND = None
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    METRICS_DIR = f"{BENCH_DIR}/metrics"
+
 STATIC_URL = "static/"
 TEMPLATES = base_settings.templates
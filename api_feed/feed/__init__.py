@@ -1 +0,0 @@
-from . import task  # noqa: F401
@@ -0,0 +1,167 @@
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from ninja import Query, Router, Schema
+from ninja.errors import HttpError
+
+from core.db_router import read_replica
+from feed.cache import get_or_fill, list_key, product_key
+from feed.models import ProdutoMirror
+
+# Busca, snapshot e facetas leem da réplica (read_replica) e nunca gravam: os segmentos do
+# snapshot são renderizados pelo build_snapshot, no primário. Os endpoints que preenchem o
+# cache (listagem, multi, batch e por SKU) ficam no primário: um valor atrasado da
+# réplica continuaria no cache até o TTL.
+router = Router(tags=["produtos"])
+
+MAX_PAGE_SIZE = 1000
+MAX_MULTI_GET = 200
+MAX_SEARCH_RESULTS = 100
+MAX_BATCH_SKUS = 5000
+SNAPSHOT_RETRY_AFTER = 5  # segundos; segmento ainda não renderizado por build_snapshot
+
+
+class BatchIn(Schema):
+    skus: list[int]
+
+
+@router.get("/")
+async def list_produtos(request, cursor: int | None = None, limit: int = 100):
+    """Lista o catálogo espelhado paginando por ``sku``, com cache read-through."""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HttpError(400, f"limit deve estar entre 1 e {MAX_PAGE_SIZE}")
+
+    async def load_page():
+        queryset = ProdutoMirror.objects.order_by("sku")
+        if cursor is not None:
+            queryset = queryset.filter(sku__gt=cursor)
+        items = [produto.to_dict() async for produto in queryset[:limit]]
+        next_cursor = items[-1]["sku"] if len(items) == limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    return await get_or_fill(await list_key(cursor, limit), load_page)
+
+
+@router.get("/multi")
+async def multi_get_produtos(request, sku: list[int] = Query(...)):
+    """Vários produtos por ``?sku=1&sku=2``: hits do cache + um ``in_bulk`` para o resto."""
+    from feed.cache import get_many_products
+
+    if len(sku) > MAX_MULTI_GET:
+        raise HttpError(400, f"No máximo {MAX_MULTI_GET} SKUs por requisição")
+
+    found = await get_many_products(sku)
+    return {"items": [found[item] for item in dict.fromkeys(sku) if item in found]}
+
+
+@router.post("/batch")
+async def batch_produtos(request, payload: BatchIn):
+    """Até ``MAX_BATCH_SKUS`` produtos: hits do cache + um ``in_bulk``, na ordem pedida.
+
+    ``items`` tem uma posição por SKU pedido, ``null`` para os inexistentes,
+    que também são listados em ``missing``.
+    """
+    from feed.cache import get_many_products
+
+    if len(payload.skus) > MAX_BATCH_SKUS:
+        raise HttpError(400, f"No máximo {MAX_BATCH_SKUS} SKUs por requisição")
+
+    found = await get_many_products(payload.skus)
+    return {
+        "items": [found.get(sku) for sku in payload.skus],
+        "missing": [sku for sku in dict.fromkeys(payload.skus) if sku not in found],
+    }
+
+
+@router.get("/busca")
+@read_replica
+async def search_produtos(
+    request,
+    q: str,
+    limit: int = 20,
+    preco_min: Decimal | None = None,
+    preco_max: Decimal | None = None,
+    em_estoque: bool = False,
+):
+    """Busca textual ranqueada em nome e descrição, com prefixo e filtros de preço/estoque."""
+    from feed.search import search_products
+
+    if not 1 <= limit <= MAX_SEARCH_RESULTS:
+        raise HttpError(400, f"limit deve estar entre 1 e {MAX_SEARCH_RESULTS}")
+
+    items = await sync_to_async(search_products)(q, limit, preco_min, preco_max, em_estoque)
+    return {"items": items}
+
+
+@router.get("/snapshot")
+@read_replica
+async def snapshot_index(request):
+    """Índice do snapshot do catálogo: faixas de SKU e o ETag gravado de cada segmento.
+
+    Só lê: os segmentos são renderizados por ``build_snapshot``.
+    """
+    from feed.snapshot import segment_size, snapshot_index
+
+    segmentos = await sync_to_async(snapshot_index)()
+    return {"tamanho_segmento": segment_size(), "segmentos": segmentos}
+
+
+@router.get("/snapshot/{segmento}")
+@read_replica
+async def snapshot_segment(request, segmento: int):
+    """Segmento do catálogo em JSON já comprimido; ``If-None-Match`` igual devolve 304.
+
+    Serve a última renderização gravada, mesmo com mudanças pendentes. Um
+    segmento que ainda não foi renderizado por ``build_snapshot`` devolve 503.
+    """
+    import gzip
+
+    from feed.snapshot import stored_segment
+
+    segment = await sync_to_async(stored_segment)(segmento)
+    if segment is not None and segment.conteudo is None:
+        response = HttpResponse(status=503)
+        response["Retry-After"] = str(SNAPSHOT_RETRY_AFTER)
+        return response
+    if segment is None or not segment.produtos:
+        raise HttpError(404, f"Segmento {segmento} não encontrado")
+
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    if "*" in if_none_match or segment.etag in if_none_match:
+        response = HttpResponse(status=304)
+    else:
+        body = bytes(segment.conteudo)
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            response = HttpResponse(body, content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(gzip.decompress(body), content_type="application/json")
+    response["ETag"] = segment.etag
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@router.get("/facetas")
+@read_replica
+async def facets(request):
+    """Produtos, itens sem estoque e valor do estoque por faixa de preço, e os totais."""
+    from feed.facets import facets_summary
+
+    return await sync_to_async(facets_summary)()
+
+
+@router.get("/{sku}")
+async def get_produto(request, sku: int):
+    """Retorna um produto do espelho, lendo primeiro do cache."""
+
+    async def load_produto():
+        produto = await ProdutoMirror.objects.filter(sku=sku).afirst()
+        return produto.to_dict() if produto else None
+
+    produto = await get_or_fill(product_key(sku), load_produto)
+    if produto is None:
+        raise HttpError(404, f"Produto {sku} não encontrado")
+    return produto
@@ -0,0 +1,155 @@
+"""Carga inicial do ProdutoMirror a partir do snapshot da API de produtos.
+
+Um feed novo começa com o espelho vazio. ``bootstrap_mirror`` baixa o
+catálogo de ``/produtos/snapshot`` (NDJSON em gzip), grava em blocos com
+``bulk_create`` e com os índices secundários e o índice de busca desligados,
+recria os índices uma vez só no fim e então reaplica, com ``apply_products``,
+os eventos de ``/produtos/eventos`` posteriores à posição do snapshot. Por ser
+last-writer-wins por ``versao``, reaplicar um evento que o snapshot já trazia
+não muda nada.
+"""
+
+import json
+import zlib
+from contextlib import contextmanager
+
+from django.db import connections, router, transaction
+
+from feed.models import ProdutoMirror
+from feed.search import (
+    POSTGRESQL_DROP_SEARCH_INDEX,
+    POSTGRESQL_SEARCH_INDEX,
+    SQLITE_DROP_FTS_TRIGGERS,
+    SQLITE_FTS_REBUILD,
+    SQLITE_FTS_TRIGGERS,
+)
+
+LOAD_FIELDS = ("sku", "nome", "descricao", "preco", "estoque", "versao")
+
+
+def read_snapshot(chunks) -> tuple[dict, object]:
+    """Descomprime o snapshot enquanto ele chega.
+
+    Args:
+        chunks: Blocos de bytes do gzip (``response.iter_content`` ou um arquivo).
+
+    Returns:
+        O cabeçalho (``posicao``, ``produtos``, ``gerado_em``) e um iterador
+        com os produtos, na ordem de ``sku``.
+    """
+    lines = _iter_lines(chunks)
+    first = next(lines, None)
+    header = json.loads(first).get("snapshot") if first else None
+    if not header or "posicao" not in header:
+        msg = "Snapshot sem o cabeçalho com a posição do outbox"
+        raise ValueError(msg)
+    return header, (json.loads(line) for line in lines)
+
+
+def _iter_lines(chunks):
+    decompressor = zlib.decompressobj(31)  # 31: cabeçalho gzip
+    pending = b""
+    for chunk in chunks:
+        pending += decompressor.decompress(chunk)
+        *lines, pending = pending.split(b"\n")
+        yield from (line for line in lines if line)
+    pending += decompressor.flush()
+    if not decompressor.eof:
+        msg = "Snapshot truncado: o gzip terminou antes do fim"
+        raise ValueError(msg)
+    if pending:
+        yield pending
+
+
+def load_snapshot(products, chunk_size: int = 5000, replace: bool = False) -> int:
+    """Grava os produtos do snapshot no ProdutoMirror com os índices desligados.
+
+    Sem ``replace`` o espelho precisa estar vazio. Linhas que já existirem
+    (um consumidor que gravou durante a carga) são mantidas. Retorna a
+    quantidade de produtos lidos do snapshot.
+    """
+    using = router.db_for_write(ProdutoMirror)
+    mirror = ProdutoMirror.objects.using(using)
+    if not replace and mirror.exists():
+        msg = "ProdutoMirror já tem produtos; use replace para recarregar"
+        raise ValueError(msg)
+
+    loaded = 0
+    with indexes_disabled(using):
+        if replace:
+            mirror.all().delete()
+        batch = []
+        for product_data in products:
+            batch.append(ProdutoMirror(**{field: product_data[field] for field in LOAD_FIELDS}))
+            if len(batch) >= chunk_size:
+                loaded += _insert(batch, using)
+                batch = []
+        if batch:
+            loaded += _insert(batch, using)
+    return loaded
+
+
+def _insert(batch: list[ProdutoMirror], using: str) -> int:
+    with transaction.atomic(using=using):
+        ProdutoMirror.objects.using(using).bulk_create(batch, ignore_conflicts=True)
+    return len(batch)
+
+
+@contextmanager
+def indexes_disabled(using: str):
+    """Remove os índices secundários e o índice de busca e os recria na saída.
+
+    Criar um índice sobre a tabela cheia é bem mais barato que mantê-lo linha a
+    linha durante a carga. Os índices voltam mesmo se a carga falhar.
+    """
+    connection = connections[using]
+    indexes = ProdutoMirror._meta.indexes
+    drop_search, create_search = _search_statements(connection.vendor)
+    with connection.schema_editor() as schema_editor:
+        for statement in drop_search:
+            schema_editor.execute(statement)
+        for index in indexes:
+            schema_editor.remove_index(ProdutoMirror, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as schema_editor:
+            for index in indexes:
+                schema_editor.add_index(ProdutoMirror, index)
+            for statement in create_search:
+                schema_editor.execute(statement)
+
+
+def _search_statements(vendor: str) -> tuple[list[str], list[str]]:
+    # Mesmo SQL da migração do índice de busca. No SQLite só os triggers saem;
+    # a tabela FTS5 é de conteúdo externo e o 'rebuild' a refaz a partir do espelho.
+    if vendor == "sqlite":
+        return list(SQLITE_DROP_FTS_TRIGGERS), [*SQLITE_FTS_TRIGGERS, SQLITE_FTS_REBUILD]
+    if vendor == "postgresql":
+        return [POSTGRESQL_DROP_SEARCH_INDEX], [POSTGRESQL_SEARCH_INDEX]
+    return [], []
+
+
+def catch_up(fetch_events, posicao: int) -> dict:
+    """Aplica os eventos do outbox posteriores a ``posicao``, página a página.
+
+    Args:
+        fetch_events: Função ``(depois_de) -> dict`` que devolve uma página de
+            ``/produtos/eventos`` (``eventos`` e ``proxima_posicao``).
+        posicao: Posição informada no cabeçalho do snapshot.
+
+    Returns:
+        Quantidade de eventos, de produtos e a posição final.
+    """
+    from feed.mirror import apply_products
+
+    stats = {"eventos": 0, "produtos": 0, "posicao": posicao}
+    while True:
+        page = fetch_events(stats["posicao"])
+        if not page["eventos"]:
+            return stats
+        products = [product for evento in page["eventos"] for product in evento["produtos"]]
+        apply_products(products)
+        stats["eventos"] += len(page["eventos"])
+        stats["produtos"] += len(products)
+        stats["posicao"] = page["proxima_posicao"]
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from feed.metrics import CACHE_HITS, CACHE_MISSES
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_KEY = "produto:{sku}"
+LIST_KEY = "produtos:{generation}:{cursor}:{limit}"
+LIST_GENERATION_KEY = "produtos:geracao"
+
+FILL_LOCK_TIMEOUT = 10  # segundos
+FILL_WAIT_INTERVAL = 0.02  # segundos entre checagens de quem espera o preenchimento
+FILL_WAIT_TIMEOUT = 2.0  # depois disso, quem espera vai direto ao banco
+
+_MISSING = object()
+
+
+async def get_or_fill(key: str, loader, timeout=DEFAULT_TIMEOUT):
+    """Lê ``key`` do cache; na falta, carrega com ``loader`` e grava (read-through).
+
+    ``loader`` é uma corrotina (consulta no ORM assíncrono). Só um processo
+    preenche cada chave por vez (single-flight): quem consegue a trava com
+    ``cache.aadd`` consulta o banco, os demais aguardam o valor aparecer no
+    cache sem bloquear o event loop. ``None`` também é cacheado, então SKUs
+    inexistentes não martelam o banco. Sem ``timeout`` a entrada expira pelo
+    ``TIMEOUT`` do cache; ``None`` a tornaria permanente.
+    """
+    try:
+        value = await cache.aget(key, _MISSING)
+    except Exception:
+        logger.exception("Falha ao ler o cache; consultando o banco")
+        return await loader()
+
+    if value is not _MISSING:
+        CACHE_HITS.inc()
+        return value
+    CACHE_MISSES.inc()
+
+    lock_key = f"{key}:lock"
+    if await cache.aadd(lock_key, 1, FILL_LOCK_TIMEOUT):
+        try:
+            value = await loader()
+            await cache.aset(key, value, timeout)
+        finally:
+            await cache.adelete(lock_key)
+        return value
+
+    deadline = time.monotonic() + FILL_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(FILL_WAIT_INTERVAL)
+        value = await cache.aget(key, _MISSING)
+        if value is not _MISSING:
+            return value
+    return await loader()
+
+
+def product_key(sku: int) -> str:
+    return PRODUCT_KEY.format(sku=sku)
+
+
+async def list_key(cursor: int | None, limit: int) -> str:
+    try:
+        generation = await cache.aget_or_set(LIST_GENERATION_KEY, 1, timeout=None)
+    except Exception:
+        logger.exception("Falha ao ler a geração da listagem no cache")
+        generation = 0
+    return LIST_KEY.format(generation=generation, cursor=cursor, limit=limit)
+
+
+async def get_many_products(skus) -> dict[int, dict]:
+    """Busca vários SKUs: um ``get_many`` no cache e um ``in_bulk`` para os que faltam.
+
+    Os encontrados no banco voltam para o cache. SKUs inexistentes ficam fora
+    do resultado.
+    """
+    from feed.models import ProdutoMirror
+
+    skus = list(dict.fromkeys(skus))
+    keys = {product_key(sku): sku for sku in skus}
+    try:
+        cached = await cache.aget_many(list(keys))
+    except Exception:
+        logger.exception("Falha ao ler o cache; consultando o banco")
+        cached = {}
+
+    found = {keys[key]: value for key, value in cached.items() if value is not None}
+    CACHE_HITS.inc(len(cached))
+    missing = [sku for sku in skus if product_key(sku) not in cached]
+    if not missing:
+        return found
+
+    CACHE_MISSES.inc(len(missing))
+    loaded = {
+        sku: produto.to_dict()
+        for sku, produto in (await ProdutoMirror.objects.ain_bulk(missing)).items()
+    }
+    found.update(loaded)
+    try:
+        await cache.aset_many({product_key(sku): produto for sku, produto in loaded.items()})
+    except Exception:
+        logger.exception("Falha ao gravar produtos no cache")
+    return found
+
+
+def invalidate_products(skus):
+    """Remove do cache os SKUs gravados e invalida todas as páginas da listagem."""
+    try:
+        cache.delete_many([product_key(sku) for sku in skus])
+        # Trocar a geração torna as páginas antigas inalcançáveis; elas expiram pelo
+        # TIMEOUT do cache, com que o get_or_fill as gravou.
+        try:
+            cache.incr(LIST_GENERATION_KEY)
+        except ValueError:
+            cache.set(LIST_GENERATION_KEY, 1, timeout=None)
+    except Exception:
+        logger.exception("Falha ao invalidar o cache dos produtos %s", list(skus)[:10])
@@ -0,0 +1,158 @@
+import logging
+import time
+
+from kombu import Consumer
+
+from feed.deadletter import apply_isolating, is_transient, retry_delay
+from feed.metrics import BATCH_LATENCY_MS, BATCH_SIZE, TASK_RETRIES
+from feed.mirror import apply_products
+from feed.partitions import product_queues
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingConsumer:
+    """Consome eventos de produto da fila em micro-lotes.
+
+    Acumula mensagens até ``max_items`` produtos ou ``max_latency_ms``
+    desde a primeira mensagem pendente, aplica tudo com um único upsert em uma
+    transação e só então confirma (ack) as mensagens do lote. Se a aplicação
+    falhar com erro transitório, as mensagens voltam para a fila e o consumidor
+    espera um backoff exponencial; com erro permanente, as mensagens são
+    aplicadas uma a uma e só os produtos que falham vão para a dead-letter.
+
+    ``partitions`` restringe o consumo a essas partições (veja
+    ``feed.partitions``); por padrão consome todas.
+    """
+
+    def __init__(
+        self,
+        celery_app,
+        max_items: int,
+        max_latency_ms: float,
+        partitions: list[int] | None = None,
+    ):
+        self.celery_app = celery_app
+        self.queues = product_queues(partitions)
+        self.max_items = max_items
+        self.max_latency = max_latency_ms / 1000
+        self._messages = []
+        self._batches = []
+        self._pending = 0
+        self._deadline = None
+        self._running = False
+        self._failures = 0
+
+    def run(self, idle_timeout: float = 1.0, on_flush=None, on_idle=None):
+        """Executa o laço de consumo até ``stop()`` ser chamado.
+
+        ``on_flush`` recebe os produtos de cada lote aplicado e ``on_idle`` é
+        chamado quando a fila fica ``idle_timeout`` segundos sem mensagens.
+        """
+        self._running = True
+        with self.celery_app.connection_for_read() as connection:
+            consumer = Consumer(
+                connection,
+                queues=self.queues,
+                callbacks=[self._on_message],
+                accept=self.celery_app.conf.accept_content or ["json"],
+                prefetch_count=self.max_items,
+            )
+            with consumer:
+                try:
+                    while self._running:
+                        timeout = idle_timeout
+                        if self._deadline is not None:
+                            timeout = max(self._deadline - time.monotonic(), 0)
+
+                        try:
+                            connection.drain_events(timeout=timeout)
+                        except TimeoutError:
+                            if not self._messages and on_idle is not None:
+                                on_idle()
+
+                        if self._should_flush():
+                            products = self.flush()
+                            if on_flush is not None:
+                                on_flush(products)
+                finally:
+                    # Aplica o que ficou pendente antes de fechar o canal.
+                    self.flush()
+
+    def stop(self):
+        self._running = False
+
+    def flush(self) -> list[dict]:
+        """Aplica os produtos pendentes, confirma as mensagens e devolve o lote."""
+        if not self._messages:
+            return []
+
+        messages, batches = self._messages, self._batches
+        self._messages, self._batches, self._pending, self._deadline = [], [], 0, None
+        products = [product for batch in batches for product in batch]
+
+        start = time.perf_counter()
+        try:
+            apply_products(products)
+        except Exception as e:
+            if is_transient(e):
+                self._back_off(messages, e)
+                return []
+            logger.warning("Lote falhou (%s); aplicando mensagem a mensagem", e, exc_info=True)
+            if not self._apply_each(messages, batches):
+                return []
+        else:
+            for message in messages:
+                message.ack()
+
+        self._failures = 0
+        BATCH_LATENCY_MS.observe((time.perf_counter() - start) * 1000)
+        BATCH_SIZE.observe(len(products))
+        return products
+
+    def _back_off(self, messages, exc: Exception):
+        """Devolve as mensagens para a fila e espera antes de tentar de novo."""
+        for message in messages:
+            message.requeue()
+        delay = retry_delay(self._failures)
+        self._failures += 1
+        TASK_RETRIES.inc()
+        logger.warning(
+            "Erro transitório ao aplicar lote (%s); nova tentativa em %.1fs", exc, delay
+        )
+        time.sleep(delay)
+
+    def _apply_each(self, messages, batches: list[list[dict]]) -> bool:
+        """Isola os produtos envenenados de um lote que falhou com erro permanente."""
+        for index, (message, batch) in enumerate(zip(messages, batches, strict=True)):
+            try:
+                apply_isolating(batch, "consume_products")
+            except Exception as e:
+                self._back_off(messages[index:], e)
+                return False
+            message.ack()
+        return True
+
+    def _should_flush(self) -> bool:
+        if not self._messages:
+            return False
+        return self._pending >= self.max_items or time.monotonic() >= self._deadline
+
+    def _on_message(self, body, message):
+        task_name = message.headers.get("task")
+        args = body[0] if isinstance(body, (list, tuple)) else body.get("args", [])
+
+        if task_name == "process_product_data":
+            self._batches.append([args[0]])
+            self._pending += 1
+        elif task_name == "process_product_batch":
+            self._batches.append(args[0])
+            self._pending += len(args[0])
+        else:
+            logger.warning("Mensagem ignorada pelo consumidor em lotes: %s", task_name)
+            message.reject()
+            return
+
+        if self._deadline is None:
+            self._deadline = time.monotonic() + self.max_latency
+        self._messages.append(message)
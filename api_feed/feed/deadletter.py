@@ -0,0 +1,94 @@
+"""Retentativas com backoff e fila de mensagens mortas (dead-letter) do feed.
+
+Erros transitórios (banco travado ou fora do ar) são tentados de novo com
+backoff exponencial e jitter. Os demais, ou os transitórios que esgotaram as
+tentativas, são erros permanentes: os produtos vão para a fila
+``product_dead_letter`` com o erro anexado e a mensagem original é
+confirmada, para um evento envenenado não ficar voltando para a fila. O
+comando ``replay_dead_letters`` inspeciona essa fila e reaplica tudo em lote.
+"""
+
+import logging
+import random
+import traceback
+from datetime import UTC, datetime
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError
+from kombu import Exchange, Queue
+
+from feed.codec import SERIALIZER_NAME
+from feed.metrics import DEAD_LETTERS
+from feed.partitions import EXCHANGE_NAME
+
+logger = logging.getLogger(__name__)
+
+DEAD_LETTER_QUEUE = Queue(
+    "product_dead_letter",
+    Exchange(EXCHANGE_NAME, type="direct"),
+    routing_key="product_dead_letter",
+)
+
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, ConnectionError, TimeoutError)
+
+
+def is_transient(exc: BaseException) -> bool:
+    return isinstance(exc, TRANSIENT_ERRORS)
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff exponencial com jitter completo: entre 0 e ``base * 2**attempt`` (limitado)."""
+    ceiling = min(settings.FEED_RETRY_MAX_DELAY, settings.FEED_RETRY_BASE_DELAY * 2**attempt)
+    return random.uniform(0, ceiling)  # noqa: S311
+
+
+def send_to_dead_letter(products: list[dict], exc: BaseException, origem: str):
+    """Publica os produtos na fila de mensagens mortas com o erro que os derrubou."""
+    from core.celery import celery_app
+
+    body = {
+        "produtos": products,
+        "erro": {
+            "tipo": type(exc).__name__,
+            "mensagem": str(exc),
+            "traceback": "".join(traceback.format_exception(exc))[-4000:],
+        },
+        "origem": origem,
+        "falhou_em": datetime.now(UTC),
+    }
+    with celery_app.producer_or_acquire() as producer:
+        producer.publish(
+            body,
+            exchange=DEAD_LETTER_QUEUE.exchange,
+            routing_key=DEAD_LETTER_QUEUE.routing_key,
+            declare=[DEAD_LETTER_QUEUE],
+            serializer=SERIALIZER_NAME,
+            retry=True,
+        )
+    DEAD_LETTERS.inc(len(products))
+    logger.error(
+        "%d produtos enviados para %s (%s: %s)",
+        len(products),
+        DEAD_LETTER_QUEUE.name,
+        type(exc).__name__,
+        exc,
+    )
+
+
+def apply_isolating(products: list[dict], origem: str) -> int:
+    """Aplica produto a produto, mandando para a dead-letter só os que falham de vez.
+
+    Usado depois que um lote inteiro falhou com erro permanente, para que um
+    evento envenenado não derrube os demais do lote. Erros transitórios sobem.
+    """
+    from feed.mirror import apply_products
+
+    applied = 0
+    for product_data in products:
+        try:
+            applied += apply_products([product_data])
+        except Exception as exc:
+            if is_transient(exc):
+                raise
+            send_to_dead_letter([product_data], exc, origem)
+    return applied
@@ -0,0 +1,188 @@
+"""Janela de deduplicação de eventos de produto.
+
+Cada evento publicado pelo outbox carrega um ``evento_id``. Depois de um crash
+do worker ou de um timeout de ack o broker reentrega as mensagens, e sem esta
+janela cada reentrega viraria um upsert no banco. Os IDs já aplicados ficam em
+uma janela limitada (por tamanho ou TTL), consultada antes de qualquer acesso
+ao banco e atualizada só depois do commit.
+
+Backends (``FEED_DEDUP_BACKEND``):
+
+- ``"cache"``: uma chave com TTL por evento no cache do Django (Redis),
+  compartilhada entre todos os workers;
+- ``"memory"``: LRU em memória, por processo;
+- ``"bloom"``: par de filtros de Bloom rotativos em memória, com taxa de falso
+  positivo configurável e poucos bytes por evento;
+- ``None``: desligado.
+
+Nos backends exatos (cache e memória) só é descartado um evento cujo
+``evento_id`` já foi aplicado. No Bloom um evento novo pode ser descartado com
+probabilidade ``FEED_DEDUP_ERROR_RATE``; o próximo evento do mesmo SKU ou a
+reconciliação corrigem a divergência.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from feed.metrics import DEDUP_CHECKS, DEDUP_HITS
+
+logger = logging.getLogger(__name__)
+
+EVENT_KEY = "evento:{evento_id}"
+
+
+class MemoryDedup:
+    """LRU em memória com os últimos ``max_items`` IDs aplicados."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, evento_ids: list[str]) -> set[str]:
+        with self._lock:
+            found = {evento_id for evento_id in evento_ids if evento_id in self._ids}
+            for evento_id in found:
+                self._ids.move_to_end(evento_id)
+        return found
+
+    def mark(self, evento_ids: list[str]):
+        with self._lock:
+            for evento_id in evento_ids:
+                self._ids[evento_id] = None
+                self._ids.move_to_end(evento_id)
+            while len(self._ids) > self.max_items:
+                self._ids.popitem(last=False)
+
+
+class BloomDedup:
+    """Dois filtros de Bloom rotativos que juntos lembram de ``max_items`` a ``2 * max_items`` IDs.
+
+    Quando o filtro corrente atinge ``max_items`` inserções ele passa a ser o
+    anterior e um filtro vazio assume, então a memória fica limitada e a
+    taxa de falso positivo de cada filtro não passa de ``error_rate``.
+    """
+
+    def __init__(self, max_items: int, error_rate: float):
+        self.max_items = max_items
+        self.bits = max(8, math.ceil(-max_items * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / max_items * math.log(2)))
+        self._current = bytearray(math.ceil(self.bits / 8))
+        self._previous = bytearray(len(self._current))
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def seen(self, evento_ids: list[str]) -> set[str]:
+        with self._lock:
+            return {
+                evento_id
+                for evento_id in evento_ids
+                if self._contains(self._current, positions := self._positions(evento_id))
+                or self._contains(self._previous, positions)
+            }
+
+    def mark(self, evento_ids: list[str]):
+        with self._lock:
+            for evento_id in evento_ids:
+                if self._count >= self.max_items:
+                    self._previous, self._current = self._current, bytearray(len(self._current))
+                    self._count = 0
+                for position in self._positions(evento_id):
+                    self._current[position >> 3] |= 1 << (position & 7)
+                self._count += 1
+
+    def _positions(self, evento_id: str) -> list[int]:
+        # Double hashing (Kirsch-Mitzenmacher) sobre um único blake2b de 128 bits.
+        digest = hashlib.blake2b(evento_id.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    @staticmethod
+    def _contains(bitmap: bytearray, positions: list[int]) -> bool:
+        return all(bitmap[position >> 3] & (1 << (position & 7)) for position in positions)
+
+
+class CacheDedup:
+    """Uma chave por evento no cache do Django, expirando em ``ttl`` segundos."""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+    def seen(self, evento_ids: list[str]) -> set[str]:
+        keys = {EVENT_KEY.format(evento_id=evento_id): evento_id for evento_id in evento_ids}
+        try:
+            found = cache.get_many(list(keys))
+        except Exception:
+            # Sem cache a janela fica vazia: o upsert por versão continua idempotente.
+            logger.exception("Falha ao consultar a janela de deduplicação")
+            return set()
+        return {keys[key] for key in found}
+
+    def mark(self, evento_ids: list[str]):
+        try:
+            cache.set_many(
+                {EVENT_KEY.format(evento_id=evento_id): 1 for evento_id in evento_ids},
+                self.ttl,
+            )
+        except Exception:
+            logger.exception("Falha ao registrar eventos na janela de deduplicação")
+
+
+_window = None
+_window_lock = threading.Lock()
+
+
+def get_window():
+    """Janela configurada em ``FEED_DEDUP_BACKEND``, criada uma vez por processo."""
+    global _window  # noqa: PLW0603
+    backend = getattr(settings, "FEED_DEDUP_BACKEND", None)
+    if backend is None:
+        return None
+    with _window_lock:
+        if _window is None:
+            if backend == "cache":
+                _window = CacheDedup(settings.FEED_DEDUP_TTL)
+            elif backend == "memory":
+                _window = MemoryDedup(settings.FEED_DEDUP_WINDOW)
+            elif backend == "bloom":
+                _window = BloomDedup(settings.FEED_DEDUP_WINDOW, settings.FEED_DEDUP_ERROR_RATE)
+            else:
+                msg = f"FEED_DEDUP_BACKEND inválido: {backend!r}"
+                raise ValueError(msg)
+    return _window
+
+
+def drop_duplicates(products: list[dict]) -> tuple[list[dict], list[str]]:
+    """Remove os eventos já aplicados dentro da janela.
+
+    Returns:
+        Os produtos ainda não vistos e os ``evento_id`` deles, a registrar com
+        ``mark_applied`` depois do commit. Eventos sem ``evento_id`` (de
+        produtores antigos ou da reconciliação) sempre passam.
+    """
+    window = get_window()
+    evento_ids = [p["evento_id"] for p in products if p.get("evento_id")]
+    if window is None or not evento_ids:
+        return products, evento_ids
+
+    seen = window.seen(evento_ids)
+    DEDUP_CHECKS.inc(len(evento_ids))
+    if not seen:
+        return products, evento_ids
+
+    DEDUP_HITS.inc(len(seen))
+    fresh = [p for p in products if p.get("evento_id") not in seen]
+    return fresh, [evento_id for evento_id in evento_ids if evento_id not in seen]
+
+
+def mark_applied(evento_ids: list[str]):
+    window = get_window()
+    if window is not None and evento_ids:
+        window.mark(evento_ids)
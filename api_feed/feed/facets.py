@@ -0,0 +1,238 @@
+"""Facetas do catálogo mantidas de forma incremental.
+
+Quantidade de produtos, produtos sem estoque, unidades em estoque e valor do
+estoque (``preco * estoque``) por faixa de preço (``FEED_FACET_PRICE_BANDS``)
+ficam em ``FacetaPreco``. ``apply_products`` lê as linhas do lote antes e
+depois da escrita, na mesma transação, e insere a diferença das faixas
+afetadas em ``FacetaDelta``. Nenhum lote atualiza as linhas de ``FacetaPreco``:
+elas seriam uma trava global disputada por todas as partições. O endpoint de
+facetas soma as poucas linhas das duas tabelas, sem varrer o ProdutoMirror.
+
+``recompute_facets`` recalcula tudo com um ``GROUP BY``, grava em
+``FacetaPreco`` e apaga os deltas incorporados; rode-o periodicamente com
+``recompute_facets --interval``, que também mantém ``FacetaDelta`` pequena.
+Deltas podem divergir (faixas alteradas no settings, corrida entre dois
+consumidores inserindo o mesmo SKU novo, escrita fora de ``apply_products``) e
+o recálculo corrige.
+"""
+
+from bisect import bisect_right
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import (
+    Case,
+    Count,
+    DecimalField,
+    F,
+    IntegerField,
+    Q,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from feed.models import FacetaDelta, FacetaPreco, ProdutoMirror
+
+FACET_FIELDS = ("produtos", "sem_estoque", "estoque", "valor_estoque")
+
+
+def price_bands() -> tuple:
+    """Limites inferiores das faixas de preço, em ordem crescente."""
+    return tuple(settings.FEED_FACET_PRICE_BANDS)
+
+
+def band_for(preco) -> int:
+    return max(bisect_right(price_bands(), preco) - 1, 0)
+
+
+@contextmanager
+def track_changes(skus, using: str):
+    """Registra em ``FacetaDelta`` a diferença das linhas ``skus`` antes e depois do bloco.
+
+    Deve rodar dentro da transação que escreve no ProdutoMirror.
+    """
+    skus = list(skus)
+    before = _read_rows(skus, using, lock=True)
+    yield
+    apply_deltas(row_deltas(before, _read_rows(skus, using)), using)
+
+
+def row_deltas(before: dict, after: dict) -> dict[int, list]:
+    """Diferença por faixa entre dois estados ``{sku: (preco, estoque)}``."""
+    deltas = {}
+    for sku in before.keys() | after.keys():
+        old, new = before.get(sku), after.get(sku)
+        if old == new:
+            continue
+        for row, sign in ((old, -1), (new, 1)):
+            if row is None:
+                continue
+            band, values = _contribution(*row)
+            totals = deltas.setdefault(band, [0, 0, 0, Decimal(0)])
+            for index, value in enumerate(values):
+                totals[index] += sign * value
+    return {band: totals for band, totals in deltas.items() if any(totals)}
+
+
+def apply_deltas(deltas: dict[int, list], using: str):
+    """Registra os deltas por faixa em ``FacetaDelta``, só com inserções."""
+    if not deltas:
+        return
+    FacetaDelta.objects.using(using).bulk_create(
+        [
+            FacetaDelta(faixa=band, **dict(zip(FACET_FIELDS, totals, strict=True)))
+            for band, totals in sorted(deltas.items())
+        ]
+    )
+
+
+def recompute_facets() -> dict:
+    """Recalcula todas as faixas a partir do ProdutoMirror e incorpora os deltas.
+
+    O agregado e os deltas apagados são lidos no mesmo instantâneo do banco
+    (``REPEATABLE READ`` no PostgreSQL): um lote que confirme durante o cálculo
+    fica de fora dos dois e o delta dele continua em ``FacetaDelta``. Rode um
+    recálculo por vez.
+
+    Returns:
+        Quantidade de faixas e quantas estavam divergentes.
+    """
+    bands = price_bands()
+    using = router.db_for_write(FacetaPreco)
+    with _snapshot_transaction(using):
+        current = _stored_totals(using)
+        delta_ids = list(FacetaDelta.objects.using(using).values_list("id", flat=True))
+        computed = _aggregate(bands, using)
+
+        now = timezone.now()
+        drifted = 0
+        FacetaPreco.objects.using(using).bulk_create(
+            [FacetaPreco(faixa=band) for band in range(len(bands))], ignore_conflicts=True
+        )
+        for band in range(len(bands)):
+            values = computed.get(band, (0, 0, 0, Decimal(0)))
+            if current.get(band, (0, 0, 0, Decimal(0))) != values:
+                drifted += 1
+            FacetaPreco.objects.using(using).filter(faixa=band).update(
+                **dict(zip(FACET_FIELDS, values, strict=True)), recalculado_em=now
+            )
+        FacetaPreco.objects.using(using).filter(faixa__gte=len(bands)).delete()
+        for start in range(0, len(delta_ids), 500):
+            FacetaDelta.objects.using(using).filter(id__in=delta_ids[start : start + 500]).delete()
+    return {"faixas": len(bands), "divergentes": drifted}
+
+
+def facets_summary() -> dict:
+    """Facetas por faixa de preço e os totais do catálogo."""
+    bands = price_bands()
+    totals = _stored_totals(router.db_for_read(FacetaPreco))
+    recalculado = [
+        faceta.recalculado_em
+        for faceta in FacetaPreco.objects.filter(faixa__lt=len(bands), recalculado_em__isnull=False)
+    ]
+    faixas = []
+    for band, preco_min in enumerate(bands):
+        values = totals.get(band, (0, 0, 0, Decimal(0)))
+        faixas.append(
+            {
+                "faixa": band,
+                "preco_min": preco_min,
+                "preco_max": bands[band + 1] if band + 1 < len(bands) else None,
+                **dict(zip(FACET_FIELDS, values, strict=True)),
+            }
+        )
+    return {
+        "faixas": faixas,
+        "total": {field: sum(faixa[field] for faixa in faixas) for field in FACET_FIELDS},
+        "recalculado_em": min(recalculado) if recalculado else None,
+    }
+
+
+def _stored_totals(using: str) -> dict[int, tuple]:
+    """Valores de ``FacetaPreco`` somados aos deltas ainda não incorporados."""
+    totals = {
+        faceta.faixa: [getattr(faceta, field) for field in FACET_FIELDS]
+        for faceta in FacetaPreco.objects.using(using)
+    }
+    pending = (
+        FacetaDelta.objects.using(using)
+        .values("faixa")
+        .annotate(**{f"total_{field}": Sum(field) for field in FACET_FIELDS})
+        .order_by()
+    )
+    for row in pending:
+        values = totals.setdefault(row["faixa"], [0, 0, 0, Decimal(0)])
+        for index, field in enumerate(FACET_FIELDS):
+            values[index] += row[f"total_{field}"]
+    return {
+        band: (*values[:3], Decimal(values[3]).quantize(Decimal("0.01")))
+        for band, values in totals.items()
+    }
+
+
+@contextmanager
+def _snapshot_transaction(using: str):
+    connection = connections[using]
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(using=using):
+        if outermost and connection.vendor == "postgresql":
+            # Precisa ser o primeiro comando da transação.
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
+
+
+def _contribution(preco, estoque) -> tuple[int, tuple]:
+    if estoque > 0:
+        return band_for(preco), (1, 0, estoque, preco * estoque)
+    return band_for(preco), (1, 1, 0, Decimal(0))
+
+
+def _read_rows(skus: list[int], using: str, lock: bool = False) -> dict:
+    queryset = ProdutoMirror.objects.using(using).filter(sku__in=skus)
+    if lock:
+        # PostgreSQL: trava as linhas existentes até o fim da transação, para
+        # o estado "antes" não mudar entre a leitura e a escrita.
+        queryset = queryset.select_for_update()
+    rows = queryset.values_list("sku", "preco", "estoque")
+    return {sku: (preco, estoque) for sku, preco, estoque in rows}
+
+
+def _aggregate(bands: tuple, using: str) -> dict[int, tuple]:
+    # A primeira condição verdadeira vence: do maior limite inferior para o menor.
+    band = Case(
+        *[When(preco__gte=bands[i], then=Value(i)) for i in reversed(range(len(bands)))],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    in_stock = Q(estoque__gt=0)
+    rows = (
+        ProdutoMirror.objects.using(using)
+        .annotate(faixa=band)
+        .values("faixa")
+        .annotate(
+            produtos=Count("sku"),
+            sem_estoque=Count("sku", filter=~in_stock),
+            total_estoque=Coalesce(Sum("estoque", filter=in_stock), 0),
+            valor=Coalesce(
+                Sum(F("preco") * F("estoque"), filter=in_stock),
+                Value(Decimal(0)),
+                output_field=DecimalField(max_digits=20, decimal_places=2),
+            ),
+        )
+        .order_by()
+    )
+    return {
+        row["faixa"]: (
+            row["produtos"],
+            row["sem_estoque"],
+            row["total_estoque"],
+            Decimal(row["valor"]).quantize(Decimal("0.01")),
+        )
+        for row in rows
+    }
@@ -0,0 +1,134 @@
+"""Verificação de saúde concorrente das dependências do serviço.
+
+Broker, Redis, banco e workers são sondados em paralelo sob um único prazo
+total; quem não responde a tempo é reportado como ``timeout``. O resultado
+fica em cache no processo por ``HEALTH_CACHE_TTL`` segundos, então o endpoint
+``/health`` pode ser consultado em alta frequência sem tocar as dependências.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.utils import timezone
+
+# Falha numa dependência crítica deixa o serviço "fail"; nas demais, "degraded".
+CRITICAL_CHECKS = {"database", "broker"}
+
+_lock = threading.Lock()
+_cached = {"report": None, "expires_at": 0.0}
+
+
+def get_health(force: bool = False) -> dict:
+    """Relatório de saúde, reaproveitando o último enquanto estiver fresco.
+
+    Só uma thread por processo executa as sondagens; as demais esperam e
+    recebem o mesmo relatório.
+    """
+    if not force and _cached["report"] and time.monotonic() < _cached["expires_at"]:
+        return _cached["report"]
+
+    with _lock:
+        if not force and _cached["report"] and time.monotonic() < _cached["expires_at"]:
+            return _cached["report"]
+        report = run_checks(settings.HEALTH_DEADLINE)
+        _cached["report"] = report
+        _cached["expires_at"] = time.monotonic() + settings.HEALTH_CACHE_TTL
+        return report
+
+
+def run_checks(deadline: float) -> dict:
+    """Executa todas as sondagens em paralelo, com ``deadline`` segundos no total."""
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=len(CHECKS), thread_name_prefix="health")
+    futures = {
+        executor.submit(_timed, check, deadline): name for name, check in CHECKS.items()
+    }
+    done, _ = wait(futures, timeout=deadline)
+    # Não espera sondagens travadas: elas terminam sozinhas pelo próprio timeout.
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    checks = {}
+    for future, name in futures.items():
+        if future in done:
+            checks[name] = future.result()
+        else:
+            checks[name] = {"ok": False, "latency_ms": deadline * 1000, "error": "timeout"}
+
+    failed = {name for name, check in checks.items() if not check["ok"]}
+    if not failed:
+        status = "ok"
+    elif failed & CRITICAL_CHECKS:
+        status = "fail"
+    else:
+        status = "degraded"
+
+    return {
+        "status": status,
+        "checked_at": timezone.now().isoformat(),
+        "duration_ms": (time.perf_counter() - start) * 1000,
+        "checks": checks,
+    }
+
+
+def _timed(check, deadline: float) -> dict:
+    start = time.perf_counter()
+    try:
+        detail = check(deadline)
+    except Exception as e:
+        return {
+            "ok": False,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "error": f"{type(e).__name__}: {e}",
+        }
+    result = {"ok": True, "latency_ms": (time.perf_counter() - start) * 1000}
+    if detail is not None:
+        result["detail"] = detail
+    return result
+
+
+def check_database(deadline: float):  # noqa: ARG001
+    from django.db import connection
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    finally:
+        # A conexão é desta thread do pool; não deve ficar aberta.
+        connection.close()
+
+
+def check_redis(deadline: float):  # noqa: ARG001
+    from django.core.cache import cache
+
+    cache.set("health:ping", 1, timeout=10)
+    if cache.get("health:ping") != 1:
+        msg = "valor gravado no cache não foi lido de volta"
+        raise RuntimeError(msg)
+
+
+def check_broker(deadline: float):
+    from core.celery import celery_app
+
+    with celery_app.connection_for_write() as connection:
+        connection.ensure_connection(max_retries=1, timeout=deadline)
+
+
+def check_workers(deadline: float):
+    from core.celery import celery_app
+
+    replies = celery_app.control.ping(timeout=max(deadline - 0.5, 0.5))
+    if not replies:
+        msg = "nenhum worker respondeu ao ping"
+        raise RuntimeError(msg)
+    return {"workers": sorted(name for reply in replies for name in reply)}
+
+
+CHECKS = {
+    "database": check_database,
+    "redis": check_redis,
+    "broker": check_broker,
+    "workers": check_workers,
+}
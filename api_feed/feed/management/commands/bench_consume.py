@@ -0,0 +1,98 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Consome eventos com o consumidor em lotes e mede latência de propagação (benchmark)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--expected", type=int, required=True, help="Eventos esperados antes de encerrar"
+        )
+        parser.add_argument(
+            "--idle-timeout",
+            type=float,
+            default=15.0,
+            help="Encerra após esse tempo sem eventos novos, em segundos (padrão: 15)",
+        )
+        parser.add_argument("--max-items", type=int, default=None)
+        parser.add_argument("--max-latency-ms", type=float, default=None)
+        parser.add_argument(
+            "--json", action="store_true", help="Emite o resultado em JSON"
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Mede do ``atualizado_em`` do produto até o commit do lote no ProdutoMirror."""
+        import json
+        import time
+        from datetime import UTC, datetime
+
+        from django.conf import settings
+
+        from core.celery import celery_app
+        from feed.consumer import BatchingConsumer
+
+        max_items = options["max_items"] or settings.FEED_BATCH_MAX_ITEMS
+        max_latency_ms = options["max_latency_ms"] or settings.FEED_BATCH_MAX_LATENCY_MS
+        consumer = BatchingConsumer(celery_app, max_items, max_latency_ms)
+
+        latencies, batches = [], 0
+        first_emitted = last_applied = None
+        last_flush = started = time.monotonic()
+
+        def on_flush(products):
+            nonlocal batches, first_emitted, last_applied, last_flush
+            now = datetime.now(UTC)
+            for product in products:
+                emitted = _as_datetime(product["atualizado_em"])
+                latencies.append((now - emitted).total_seconds())
+                first_emitted = min(first_emitted or emitted, emitted)
+            batches += 1
+            last_applied, last_flush = now, time.monotonic()
+            if len(latencies) >= options["expected"]:
+                consumer.stop()
+
+        def on_idle():
+            if time.monotonic() - max(last_flush, started) > options["idle_timeout"]:
+                consumer.stop()
+
+        consumer.run(idle_timeout=0.5, on_flush=on_flush, on_idle=on_idle)
+
+        # Vazão sustentada: da primeira gravação no produtor ao último commit no feed.
+        elapsed = (last_applied - first_emitted).total_seconds() if latencies else 0.0
+        result = {
+            "events": len(latencies),
+            "expected": options["expected"],
+            "batches": batches,
+            "events_per_second": len(latencies) / elapsed if elapsed else None,
+            "latency_ms": _percentiles(latencies),
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(result))
+        else:
+            self.stdout.write(json.dumps(result, indent=2))
+
+
+def _as_datetime(value):
+    from datetime import UTC, datetime
+
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value
+
+
+def _percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+        "max": ordered[-1] * 1000,
+    }
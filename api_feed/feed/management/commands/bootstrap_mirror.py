@@ -0,0 +1,130 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Carrega o ProdutoMirror de um feed novo com o snapshot da API de produtos e o catch-up"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", default=None, help="URL da API de produtos (padrão: settings.PRODUTOS_API_URL)"
+        )
+        parser.add_argument(
+            "--file",
+            default=None,
+            help="Carrega de um snapshot já baixado (.ndjson.gz) em vez de baixar da API",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Produtos por bulk_create (padrão: 5000)",
+        )
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Apaga o ProdutoMirror atual antes de carregar (sem isso ele precisa estar vazio)",
+        )
+        parser.add_argument(
+            "--skip-catchup",
+            action="store_true",
+            help="Só carrega o snapshot, sem reaplicar os eventos posteriores",
+        )
+        parser.add_argument(
+            "--timeout", type=int, default=60, help="Timeout das requisições em segundos"
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Carga em bloco, recriação dos índices, catch-up e recálculo dos derivados."""
+        import time
+        import zlib
+
+        import requests
+        from django.conf import settings
+        from django.core.exceptions import ValidationError
+
+        from feed.bootstrap import catch_up, load_snapshot, read_snapshot
+        from feed.facets import recompute_facets
+        from feed.snapshot import rebuild_dirty, reset_segments
+
+        base_url = (options["url"] or settings.PRODUTOS_API_URL).rstrip("/")
+        session = requests.Session()
+
+        def fetch_events(depois_de):
+            try:
+                response = session.get(
+                    f"{base_url}/produtos/eventos",
+                    params={"depois_de": depois_de, "limit": 100},
+                    timeout=options["timeout"],
+                )
+                if response.status_code == 410:
+                    msg = f"{response.json().get('detail')}: rode bootstrap_mirror --replace"
+                    raise CommandError(msg)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                msg = f"Falha ao buscar eventos na API de produtos: {e}"
+                raise CommandError(msg) from e
+            return response.json()
+
+        start = time.perf_counter()
+        try:
+            if options["file"]:
+                self.stdout.write(f"📦 Carregando snapshot de {options['file']}...")
+                source = open(options["file"], "rb")  # noqa: SIM115
+                chunks = iter(lambda: source.read(1 << 20), b"")
+            else:
+                self.stdout.write(f"📦 Baixando snapshot de {base_url}/produtos/snapshot...")
+                source = session.get(
+                    f"{base_url}/produtos/snapshot", stream=True, timeout=options["timeout"]
+                )
+                source.raise_for_status()
+                chunks = source.iter_content(chunk_size=1 << 16)
+        except (OSError, requests.RequestException) as e:
+            msg = f"Falha ao abrir o snapshot: {e}"
+            raise CommandError(msg) from e
+
+        with source:
+            try:
+                header, products = read_snapshot(chunks)
+                self.stdout.write(
+                    f"  📍 posição {header['posicao']}, {header['produtos']} produtos "
+                    f"(gerado em {header['gerado_em']})"
+                )
+                loaded = load_snapshot(products, options["chunk_size"], options["replace"])
+            except (
+                ValueError,
+                KeyError,
+                ValidationError,
+                zlib.error,
+                requests.RequestException,
+            ) as e:
+                msg = f"Falha ao carregar o snapshot: {e}"
+                raise CommandError(msg) from e
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"  ✅ {loaded} produtos carregados e índices recriados em {elapsed:.1f}s "
+            f"({loaded / max(elapsed, 1e-9):.0f} produtos/s)"
+        )
+
+        if not options["skip_catchup"]:
+            stats = catch_up(fetch_events, header["posicao"])
+            self.stdout.write(
+                f"  🔁 catch-up: {stats['eventos']} eventos / {stats['produtos']} produtos "
+                f"reaplicados até a posição {stats['posicao']}"
+            )
+
+        facets = recompute_facets()
+        reset_segments()
+        # Os endpoints do snapshot não renderizam: sem isso responderiam 503 até o build_snapshot.
+        segments = rebuild_dirty()
+        self.stdout.write(
+            f"  🧮 {facets['faixas']} faixas de facetas recalculadas, "
+            f"{segments} segmentos do snapshot renderizados"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Espelho pronto em {time.perf_counter() - start:.1f}s; "
+                "já pode iniciar o consume_products"
+            )
+        )
+
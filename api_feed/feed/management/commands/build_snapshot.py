@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Renderiza os segmentos sujos do snapshot do catálogo"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Recria todos os segmentos a partir do ProdutoMirror "
+            "(carga inicial ou mudança de FEED_SNAPSHOT_SEGMENT_SIZE)",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Repete a cada N segundos em vez de rodar uma vez",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Renderiza os segmentos sujos uma vez ou em laço, com --interval."""
+        import time
+
+        from feed.snapshot import rebuild_dirty, reset_segments
+
+        if options["reset"]:
+            total = reset_segments()
+            self.stdout.write(f"🧱 {total} segmentos recriados")
+
+        try:
+            while True:
+                start = time.perf_counter()
+                built = rebuild_dirty()
+                if built:
+                    elapsed = (time.perf_counter() - start) * 1000
+                    self.stdout.write(f"  ✅ {built} segmentos renderizados em {elapsed:.0f} ms")
+                if options["interval"] is None:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Renderização interrompida")
+
+        self.stdout.write(self.style.SUCCESS("✅ Snapshot do catálogo atualizado"))
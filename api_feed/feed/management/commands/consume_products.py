@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Consome eventos de produto em micro-lotes com upsert em massa no ProdutoMirror"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-items",
+            type=int,
+            default=None,
+            help="Produtos por lote (padrão: settings.FEED_BATCH_MAX_ITEMS)",
+        )
+        parser.add_argument(
+            "--max-latency-ms",
+            type=float,
+            default=None,
+            help="Espera máxima pelo lote em ms (padrão: settings.FEED_BATCH_MAX_LATENCY_MS)",
+        )
+        parser.add_argument(
+            "--partition",
+            type=int,
+            action="append",
+            default=None,
+            help="Partição a consumir; repita para várias (padrão: todas)",
+        )
+        parser.add_argument(
+            "--report-interval",
+            type=float,
+            default=30.0,
+            help="Intervalo em segundos entre relatórios dos histogramas (padrão: 30)",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Executa o consumidor em lotes até ser interrompido."""
+        import time
+
+        from django.conf import settings
+
+        from core.celery import celery_app
+        from feed.consumer import BatchingConsumer
+        from feed.metrics import BATCH_LATENCY_MS, BATCH_SIZE
+
+        max_items = options["max_items"] or settings.FEED_BATCH_MAX_ITEMS
+        max_latency_ms = options["max_latency_ms"] or settings.FEED_BATCH_MAX_LATENCY_MS
+        report_interval = options["report_interval"]
+        consumer = BatchingConsumer(
+            celery_app, max_items, max_latency_ms, partitions=options["partition"]
+        )
+
+        last_report = time.monotonic()
+
+        def report(_products):
+            nonlocal last_report
+            if time.monotonic() - last_report >= report_interval:
+                self._report(BATCH_SIZE, BATCH_LATENCY_MS)
+                last_report = time.monotonic()
+
+        queues = ", ".join(queue.name for queue in consumer.queues)
+        self.stdout.write(
+            f"📥 Consumindo {queues} em lotes de até {max_items} produtos / "
+            f"{max_latency_ms:g} ms..."
+        )
+        try:
+            consumer.run(on_flush=report)
+        except KeyboardInterrupt:
+            self.stdout.write("Consumidor interrompido")
+
+        self._report(BATCH_SIZE, BATCH_LATENCY_MS)
+
+    def _report(self, *histograms):
+        for histogram in histograms:
+            self.stdout.write(f"  📊 {histogram.summary()}")
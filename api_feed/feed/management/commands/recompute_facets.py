@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Recalcula as facetas do catálogo a partir do ProdutoMirror, corrigindo divergências"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Repete a cada N segundos em vez de rodar uma vez",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Recalcula as facetas uma vez ou em laço, com --interval."""
+        import time
+
+        from feed.facets import recompute_facets
+
+        try:
+            while True:
+                start = time.perf_counter()
+                result = recompute_facets()
+                elapsed = (time.perf_counter() - start) * 1000
+                self.stdout.write(
+                    f"  ✅ {result['faixas']} faixas recalculadas em {elapsed:.0f} ms "
+                    f"({result['divergentes']} divergentes)"
+                )
+                if options["interval"] is None:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Recálculo interrompido")
@@ -0,0 +1,111 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Reconcilia o ProdutoMirror com a API de produtos comparando digests por faixa de SKU"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", default=None, help="URL da API de produtos (padrão: settings.PRODUTOS_API_URL)"
+        )
+        parser.add_argument(
+            "--fanout",
+            type=int,
+            default=None,
+            help="Subfaixas comparadas por nível (padrão: settings.RECONCILE_FANOUT)",
+        )
+        parser.add_argument(
+            "--leaf-size",
+            type=int,
+            default=None,
+            help="Tamanho de faixa reparada diretamente (padrão: settings.RECONCILE_LEAF_SIZE)",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Só lista as faixas divergentes, sem reparar"
+        )
+        parser.add_argument(
+            "--timeout", type=int, default=30, help="Timeout das requisições em segundos"
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Desce pelas faixas divergentes e repara só as linhas dessas faixas."""
+        import time
+
+        import requests
+        from django.conf import settings
+
+        from core.db_router import replica_reads
+        from feed.reconcile import mirror_digests, repair_range, sku_bounds
+
+        base_url = (options["url"] or settings.PRODUTOS_API_URL).rstrip("/")
+        fanout = options["fanout"] or settings.RECONCILE_FANOUT
+        leaf_size = options["leaf_size"] or settings.RECONCILE_LEAF_SIZE
+        session = requests.Session()
+        stats = {"bytes": 0, "requisicoes": 0, "faixas": 0, "gravados": 0, "removidos": 0}
+
+        def fetch(path, **params):
+            try:
+                response = session.get(
+                    f"{base_url}/produtos/{path}", params=params, timeout=options["timeout"]
+                )
+                response.raise_for_status()
+            except requests.RequestException as e:
+                msg = f"Falha ao consultar a API de produtos: {e}"
+                raise CommandError(msg) from e
+            stats["bytes"] += len(response.content)
+            stats["requisicoes"] += 1
+            return response.json()
+
+        start = time.perf_counter()
+        self.stdout.write("🔍 Iniciando reconciliação com a API de produtos...")
+
+        # Digests e leituras do espelho na réplica; o reparo grava no primário.
+        with replica_reads():
+            remote = fetch("digests", parts=1)
+            bounds = [
+                b for b in (sku_bounds(), (remote["lo"], remote["hi"])) if b and b[0] is not None
+            ]
+            if not bounds:
+                self.stdout.write(self.style.SUCCESS("✅ Nenhum produto em nenhum dos lados"))
+                return
+            pending = [(min(b[0] for b in bounds), max(b[1] for b in bounds))]
+
+            while pending:
+                lo, hi = pending.pop()
+                remote_ranges = fetch("digests", lo=lo, hi=hi, parts=fanout)["ranges"]
+                local_ranges = mirror_digests(lo, hi, fanout)
+
+                for remote_range, local_range in zip(remote_ranges, local_ranges, strict=True):
+                    if (remote_range["digest"], remote_range["count"]) == (
+                        local_range["digest"],
+                        local_range["count"],
+                    ):
+                        continue
+
+                    sub_lo, sub_hi = remote_range["lo"], remote_range["hi"]
+                    size = max(remote_range["count"], local_range["count"])
+                    if size > leaf_size and sub_hi - sub_lo > 1:
+                        pending.append((sub_lo, sub_hi))
+                        continue
+
+                    stats["faixas"] += 1
+                    self.stdout.write(
+                        f"  ⚠️ Faixa [{sub_lo}, {sub_hi}) diverge "
+                        f"(origem: {remote_range['count']}, espelho: {local_range['count']})"
+                    )
+                    if options["dry_run"]:
+                        continue
+                    rows = fetch("range", lo=sub_lo, hi=sub_hi)["items"]
+                    result = repair_range(sub_lo, sub_hi, rows)
+                    stats["gravados"] += result["gravados"]
+                    stats["removidos"] += result["removidos"]
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Reconciliação concluída em {elapsed:.1f}s: {stats['faixas']} faixas divergentes, "
+                f"{stats['gravados']} linhas regravadas, {stats['removidos']} removidas, "
+                f"{stats['requisicoes']} requisições / {stats['bytes'] / 1024:.1f} KiB trocados"
+            )
+        )
@@ -0,0 +1,108 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Inspeciona a fila product_dead_letter e reaplica os produtos em lote"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--inspect",
+            action="store_true",
+            help="Só lista as mensagens (agrupadas por erro), sem reaplicar nem remover",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Máximo de mensagens lidas (padrão: as que estão na fila ao iniciar)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Produtos por upsert em massa (padrão: settings.FEED_BATCH_MAX_ITEMS)",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Lê a dead-letter e reaplica os produtos pelo mesmo upsert em massa do consumidor."""
+        from collections import Counter
+
+        from django.conf import settings
+
+        from core.celery import celery_app
+        from feed.deadletter import DEAD_LETTER_QUEUE
+
+        batch_size = options["batch_size"] or settings.FEED_BATCH_MAX_ITEMS
+        accept = celery_app.conf.accept_content or ["json"]
+
+        with celery_app.connection_for_read() as connection:
+            queue = DEAD_LETTER_QUEUE(connection.default_channel)
+            queue.declare()
+            # Só as mensagens que já estavam na fila: o que falhar de novo volta
+            # para o fim dela e não é relido nesta execução.
+            _, total, _ = queue.queue_declare(passive=True)
+            if options["limit"] is not None:
+                total = min(total, options["limit"])
+            self.stdout.write(f"📬 {total} mensagens em {queue.name}")
+
+            if options["inspect"]:
+                errors = Counter()
+                messages = []
+                for _ in range(total):
+                    message = queue.get(no_ack=False, accept=accept)
+                    if message is None:
+                        break
+                    messages.append(message)
+                    body = message.decode()
+                    erro = body["erro"]
+                    errors[(body["origem"], erro["tipo"], erro["mensagem"])] += len(
+                        body["produtos"]
+                    )
+                for (origem, tipo, mensagem), produtos in errors.most_common():
+                    self.stdout.write(f"  {produtos:>6} produtos | {origem} | {tipo}: {mensagem}")
+                # Devolve tudo para a fila: a inspeção não consome nada.
+                for message in messages:
+                    message.requeue()
+                return
+
+            stats = {"mensagens": 0, "produtos": 0}
+            messages, products = [], []
+            for _ in range(total):
+                message = queue.get(no_ack=False, accept=accept)
+                if message is None:
+                    break
+                messages.append(message)
+                products.extend(message.decode()["produtos"])
+                if len(products) >= batch_size:
+                    self._replay(messages, products, stats)
+                    messages, products = [], []
+            self._replay(messages, products, stats)
+
+        self.stdout.write(
+            f"✅ {stats['produtos']} produtos de {stats['mensagens']} mensagens reprocessados"
+        )
+
+    def _replay(self, messages, products, stats):
+        """Aplica o lote; se falhar de novo, isola e devolve à dead-letter só os culpados."""
+        from feed.deadletter import apply_isolating
+        from feed.mirror import apply_products
+
+        if not messages:
+            return
+        try:
+            apply_products(products)
+        except Exception as e:
+            self.stdout.write(f"  ⚠️ Lote falhou ({e!s}); reaplicando produto a produto")
+            try:
+                apply_isolating(products, "replay_dead_letters")
+            except Exception:
+                # Erro transitório: nada é removido da dead-letter.
+                for message in messages:
+                    message.requeue()
+                raise
+
+        for message in messages:
+            message.ack()
+        stats["mensagens"] += len(messages)
+        stats["produtos"] += len(products)
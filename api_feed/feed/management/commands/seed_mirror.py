@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+# Vocabulário dos nomes sintéticos, para a busca textual ter o que ranquear.
+TIPOS = ("Cadeira", "Mesa", "Luminária", "Sofá", "Estante", "Tapete", "Poltrona", "Cômoda")
+MATERIAIS = ("madeira", "metal", "vidro", "couro", "bambu", "linho", "mármore", "veludo")
+CORES = ("preta", "branca", "azul", "verde", "cinza", "natural", "vermelha", "amarela")
+
+
+class Command(BaseCommand):
+    help = "Popula o ProdutoMirror com produtos sintéticos (desenvolvimento e benchmarks)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count", type=int, default=10_000, help="Quantidade de produtos (padrão: 10000)"
+        )
+        parser.add_argument("--first-sku", type=int, default=1, help="Primeiro SKU (padrão: 1)")
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000, help="Produtos por upsert (padrão: 5000)"
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Grava os produtos em blocos pelo mesmo upsert do consumidor."""
+        import random
+        from decimal import Decimal
+
+        from feed.mirror import apply_products
+
+        first, count = options["first_sku"], options["count"]
+        for start in range(first, first + count, options["chunk_size"]):
+            end = min(start + options["chunk_size"], first + count)
+            apply_products(
+                [
+                    {
+                        "sku": sku,
+                        "nome": f"{random.choice(TIPOS)} de {random.choice(MATERIAIS)} {sku}",
+                        "descricao": f"Acabamento {random.choice(CORES)}, produto {sku}",
+                        "preco": Decimal(random.randint(1000, 100000)) / 100,
+                        "estoque": random.randint(0, 500),
+                        "versao": 1,
+                    }
+                    for sku in range(start, end)
+                ]
+            )
+        self.stdout.write(self.style.SUCCESS(f"✅ {count} produtos gravados no ProdutoMirror"))
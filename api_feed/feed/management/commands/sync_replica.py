@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Copia o banco primário SQLite para a réplica, simulando a replicação localmente"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Repete a cada N segundos (o atraso simulado da réplica) em vez de copiar uma vez",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Copia o arquivo do primário sobre o da réplica com a API de backup do SQLite."""
+        import sqlite3
+        import time
+        from contextlib import closing
+
+        from django.conf import settings
+
+        from core.db_router import REPLICA_ALIAS, has_replica
+
+        if not has_replica():
+            msg = "Réplica não configurada: defina DATABASE_REPLICA_NAME"
+            raise CommandError(msg)
+        primary = settings.DATABASES["default"]
+        replica = settings.DATABASES[REPLICA_ALIAS]
+        if "sqlite3" not in primary["ENGINE"] or "sqlite3" not in replica["ENGINE"]:
+            msg = "sync_replica só simula réplicas SQLite; em produção use a replicação do banco"
+            raise CommandError(msg)
+
+        try:
+            while True:
+                start = time.perf_counter()
+                with (
+                    closing(sqlite3.connect(primary["NAME"])) as source,
+                    closing(sqlite3.connect(replica["NAME"])) as target,
+                ):
+                    source.backup(target)
+                elapsed = (time.perf_counter() - start) * 1000
+                self.stdout.write(f"  🔁 {primary['NAME']} → {replica['NAME']} em {elapsed:.0f} ms")
+                if options["interval"] is None:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Sincronização interrompida")
@@ -0,0 +1,336 @@
+"""Métricas em memória (contadores, gauges e histogramas) expostas no formato Prometheus.
+
+Gravar uma métrica custa um lock e uma soma: nada é logado por evento. Como
+workers e a API rodam em processos diferentes, cada processo exporta um
+snapshot para ``settings.METRICS_DIR`` a cada ``METRICS_EXPORT_INTERVAL``
+(uma thread o regrava mesmo com o processo ocioso, e ele é gravado de novo na
+saída). O endpoint ``/metrics`` soma contadores e histogramas de todos os
+processos com os valores vivos do seu próprio; gauges saem um por processo,
+com o label ``pid``. Arquivos não regravados há ``STALE_EXPORTS`` intervalos
+são de processos que morreram e são apagados.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+STALE_EXPORTS = 3  # intervalos sem regravar até o arquivo ser de um processo morto
+
+
+class Counter:
+    """Contador monotônico agregado em memória no próprio processo."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self._value += amount
+        REGISTRY.maybe_export()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def snapshot(self) -> dict:
+        return {"value": self._value}
+
+
+class Gauge:
+    """Valor instantâneo (ex.: profundidade de uma fila) do próprio processo."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._value = 0
+
+    def set(self, value: float):
+        self._value = value
+        REGISTRY.maybe_export()
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> dict:
+        return {"value": self._value}
+
+
+class Histogram:
+    """Histograma com buckets fixos, agregado em memória no próprio processo."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: tuple[float, ...]):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+        REGISTRY.maybe_export()
+
+    def observe_many(self, values):
+        """Registra vários valores com um único lock (ex.: idade de cada evento do lote)."""
+        indexes = [bisect_left(self.buckets, value) for value in values]
+        with self._lock:
+            for index in indexes:
+                self._counts[index] += 1
+            self._sum += sum(values)
+            self._count += len(indexes)
+        REGISTRY.maybe_export()
+
+    def snapshot(self) -> dict:
+        """Contagens cumulativas por limite superior (``+Inf`` por último), soma e total."""
+        with self._lock:
+            counts = list(self._counts)
+            total, soma = self._count, self._sum
+
+        cumulative, running = [], 0
+        for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+            running += count
+            cumulative.append([bound, running])
+        return {"buckets": cumulative, "sum": soma, "count": total}
+
+    def summary(self) -> str:
+        snapshot = self.snapshot()
+        if not snapshot["count"]:
+            return f"{self.name}: sem observações"
+
+        media = snapshot["sum"] / snapshot["count"]
+        buckets = " ".join(f"≤{bound}:{count}" for bound, count in snapshot["buckets"])
+        return f"{self.name}: n={snapshot['count']} média={media:.2f} [{buckets}]"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._last_export = 0.0
+        # Zero até a primeira exportação, que lê o intervalo configurado.
+        self._export_interval = 0.0
+        # Processo dono do arquivo e da thread de exportação; muda depois de um fork.
+        self._exporter_pid = None
+        self._export_name = None
+        self._export_lock = threading.Lock()
+        atexit.register(self._export_at_exit)
+
+    def counter(self, name: str, description: str) -> Counter:
+        return self._register(Counter(name, description))
+
+    def gauge(self, name: str, description: str) -> Gauge:
+        return self._register(Gauge(name, description))
+
+    def histogram(self, name: str, description: str, buckets: tuple[float, ...]) -> Histogram:
+        return self._register(Histogram(name, description, buckets))
+
+    def snapshot(self) -> dict:
+        return {
+            name: {"type": metric.kind, "help": metric.description, **metric.snapshot()}
+            for name, metric in self._metrics.items()
+        }
+
+    @property
+    def export_name(self) -> str | None:
+        """Nome do arquivo exportado por este processo, se ele já exportou."""
+        return self._export_name if self._exporter_pid == os.getpid() else None
+
+    def maybe_export(self, force: bool = False):
+        """Grava o snapshot deste processo em ``METRICS_DIR`` no máximo a cada intervalo."""
+        now = time.monotonic()
+        if not force and now - self._last_export < self._export_interval:
+            return
+        self._last_export = now
+
+        directory, self._export_interval = _metrics_settings()
+        if directory is None:
+            return
+        self._start_exporter()
+        try:
+            with self._export_lock:
+                directory.mkdir(parents=True, exist_ok=True)
+                target = directory / self._export_name
+                temporary = target.with_suffix(".tmp")
+                temporary.write_text(json.dumps(self.snapshot()))
+                os.replace(temporary, target)
+        except OSError:
+            logger.exception("Falha ao exportar métricas para %s", directory)
+
+    def _start_exporter(self):
+        """Inicia, uma vez por processo, a thread que regrava o snapshot a cada intervalo.
+
+        Sem ela o arquivo de um processo ocioso envelheceria como o de um morto.
+        """
+        pid = os.getpid()
+        if self._exporter_pid == pid:
+            return
+        with self._export_lock:
+            if self._exporter_pid == pid:
+                return
+            # Nome único por processo: um PID reutilizado não sobrescreve (nem faz
+            # voltar os contadores de) o arquivo do processo anterior.
+            self._export_name = f"{pid}-{time.time_ns()}.json"
+            self._exporter_pid = pid
+        threading.Thread(target=self._export_loop, name="metrics-export", daemon=True).start()
+
+    def _export_loop(self):
+        while True:
+            time.sleep(max(self._export_interval, 0.1))
+            self.maybe_export(force=True)
+
+    def _export_at_exit(self):
+        # Sem isso o processo perderia até um intervalo de dados ao sair.
+        if self._exporter_pid == os.getpid():
+            self.maybe_export(force=True)
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+
+REGISTRY = Registry()
+
+
+def _metrics_settings() -> tuple[Path | None, float]:
+    from django.conf import settings
+
+    directory = getattr(settings, "METRICS_DIR", None)
+    interval = getattr(settings, "METRICS_EXPORT_INTERVAL", 5.0)
+    return (Path(directory) if directory else None), interval
+
+
+def collect() -> list[tuple[str, dict]]:
+    """Snapshots dos outros processos vivos (lidos do disco) mais o deste, ao vivo.
+
+    Arquivos não regravados há ``STALE_EXPORTS`` intervalos são apagados.
+
+    Returns:
+        Pares ``(pid, snapshot)``, um por processo.
+    """
+    directory, interval = _metrics_settings()
+    snapshots = [(str(os.getpid()), REGISTRY.snapshot())]
+    if directory is None or not directory.is_dir():
+        return snapshots
+
+    own = REGISTRY.export_name
+    stale_before = time.time() - STALE_EXPORTS * interval
+    for path in directory.glob("*.json"):
+        if path.name == own:
+            continue
+        try:
+            if path.stat().st_mtime < stale_before:
+                path.unlink(missing_ok=True)
+                continue
+            snapshots.append((path.stem.split("-")[0], json.loads(path.read_text())))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def render_prometheus(snapshots: list[tuple[str, dict]]) -> str:
+    """Renderiza os snapshots no formato texto do Prometheus (0.0.4).
+
+    Contadores e histogramas são somados entre os processos. Gauges não: a
+    soma das profundidades de fila de vários processos não significa nada, então
+    cada processo sai numa série própria, com o label ``pid``.
+    """
+    merged = {}
+    for pid, snapshot in snapshots:
+        for name, metric in snapshot.items():
+            current = merged.get(name)
+            if metric["type"] == "gauge":
+                if current is None:
+                    current = merged[name] = {**metric, "values": []}
+                current["values"].append((pid, metric["value"]))
+            elif current is None:
+                merged[name] = json.loads(json.dumps(metric))
+            elif metric["type"] == "counter":
+                current["value"] += metric["value"]
+            elif [b for b, _ in metric["buckets"]] == [b for b, _ in current["buckets"]]:
+                for pair, (_, count) in zip(current["buckets"], metric["buckets"], strict=True):
+                    pair[1] += count
+                current["sum"] += metric["sum"]
+                current["count"] += metric["count"]
+
+    lines = []
+    for name, metric in sorted(merged.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        if metric["type"] == "gauge":
+            for pid, value in sorted(metric["values"], key=lambda item: int(item[0])):
+                lines.append(f'{name}{{pid="{pid}"}} {value}')
+            continue
+        if metric["type"] == "counter":
+            lines.append(f"{name} {metric['value']}")
+            continue
+        for bound, count in metric["buckets"]:
+            le = bound if bound == "+Inf" else f"{bound:g}"
+            lines.append(f'{name}_bucket{{le="{le}"}} {count}')
+        lines.append(f"{name}_sum {metric['sum']}")
+        lines.append(f"{name}_count {metric['count']}")
+    return "\n".join(lines) + "\n"
+
+
+_MS_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+BATCH_SIZE = REGISTRY.histogram(
+    "feed_batch_size",
+    "Produtos aplicados por lote no consumidor em lotes",
+    (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+BATCH_LATENCY_MS = REGISTRY.histogram(
+    "feed_batch_latency_ms",
+    "Tempo (ms) para aplicar e confirmar um lote no consumidor em lotes",
+    _MS_BUCKETS,
+)
+CACHE_HITS = REGISTRY.counter("feed_cache_hits_total", "Leituras do feed atendidas pelo cache")
+CACHE_MISSES = REGISTRY.counter("feed_cache_misses_total", "Leituras do feed que foram ao banco")
+TASK_DURATION_MS = REGISTRY.histogram(
+    "feed_task_duration_ms",
+    "Tempo (ms) de execução das tasks process_product_data/process_product_batch",
+    _MS_BUCKETS,
+)
+TASK_FAILURES = REGISTRY.counter(
+    "feed_task_failures_total", "Execuções de tasks de produto que terminaram em erro"
+)
+EVENTS_APPLIED = REGISTRY.counter(
+    "feed_events_total", "Eventos de produto recebidos para aplicação no ProdutoMirror"
+)
+EVENT_AGE_MS = REGISTRY.histogram(
+    "feed_event_age_ms",
+    "Idade (ms) do evento entre a gravação no produtor (atualizado_em) e o consumo",
+    (*_MS_BUCKETS, 30000, 60000, 300000),
+)
+DEDUP_CHECKS = REGISTRY.counter(
+    "feed_dedup_checked_total", "Eventos com evento_id consultados na janela de deduplicação"
+)
+DEDUP_HITS = REGISTRY.counter(
+    "feed_dedup_hits_total", "Eventos reentregues descartados pela janela de deduplicação"
+)
+TASK_RETRIES = REGISTRY.counter(
+    "feed_task_retries_total", "Novas tentativas agendadas após erros transitórios"
+)
+DEAD_LETTERS = REGISTRY.counter(
+    "feed_dead_letters_total", "Produtos enviados para a fila product_dead_letter"
+)
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("feed", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="produtomirror",
+            name="versao",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+from feed.search import (
+    POSTGRESQL_DROP_SEARCH_INDEX,
+    POSTGRESQL_SEARCH_INDEX,
+    SQLITE_DROP_FTS_TABLE,
+    SQLITE_DROP_FTS_TRIGGERS,
+    SQLITE_FTS_REBUILD,
+    SQLITE_FTS_TABLE,
+    SQLITE_FTS_TRIGGERS,
+)
+
+# Índice de busca textual mantido pelo próprio banco; o SQL fica em feed.search,
+# compartilhado com o bootstrap_mirror. Outros bancos usam o fallback com
+# icontains de feed.search.
+SQLITE_FORWARD = [SQLITE_FTS_TABLE, *SQLITE_FTS_TRIGGERS, SQLITE_FTS_REBUILD]
+SQLITE_BACKWARD = [*SQLITE_DROP_FTS_TRIGGERS, SQLITE_DROP_FTS_TABLE]
+POSTGRESQL_FORWARD = [POSTGRESQL_SEARCH_INDEX]
+POSTGRESQL_BACKWARD = [POSTGRESQL_DROP_SEARCH_INDEX]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):  # noqa: ARG001
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("feed", "0002_produtomirror_versao"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRESQL_FORWARD}),
+            _run({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRESQL_BACKWARD}),
+        ),
+    ]
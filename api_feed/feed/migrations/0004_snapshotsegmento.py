@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("feed", "0003_produtomirror_busca"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SnapshotSegmento",
+            fields=[
+                ("segmento", models.IntegerField(primary_key=True, serialize=False)),
+                ("mudancas", models.PositiveBigIntegerField(default=0)),
+                ("construido", models.PositiveBigIntegerField(default=0)),
+                ("conteudo", models.BinaryField(null=True)),
+                ("etag", models.CharField(blank=True, max_length=64)),
+                ("produtos", models.IntegerField(default=0)),
+                ("construido_em", models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("feed", "0004_snapshotsegmento"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FacetaPreco",
+            fields=[
+                ("faixa", models.IntegerField(primary_key=True, serialize=False)),
+                ("produtos", models.BigIntegerField(default=0)),
+                ("sem_estoque", models.BigIntegerField(default=0)),
+                ("estoque", models.BigIntegerField(default=0)),
+                (
+                    "valor_estoque",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("recalculado_em", models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="produtomirror",
+            index=models.Index(fields=["preco", "estoque"], name="feed_mirror_preco_estoque"),
+        ),
+        migrations.AddIndex(
+            model_name="produtomirror",
+            index=models.Index(fields=["estoque", "preco"], name="feed_mirror_estoque_preco"),
+        ),
+    ]
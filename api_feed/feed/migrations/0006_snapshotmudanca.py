@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("feed", "0005_facetapreco_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SnapshotMudanca",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("segmento", models.IntegerField()),
+            ],
+        ),
+    ]
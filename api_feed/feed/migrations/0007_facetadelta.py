@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("feed", "0006_snapshotmudanca"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FacetaDelta",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("faixa", models.IntegerField()),
+                ("produtos", models.BigIntegerField(default=0)),
+                ("sem_estoque", models.BigIntegerField(default=0)),
+                ("estoque", models.BigIntegerField(default=0)),
+                (
+                    "valor_estoque",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,164 @@
+from datetime import UTC, datetime
+from functools import partial
+
+from django.db import connections, router, transaction
+
+from feed.cache import invalidate_products
+from feed.dedup import drop_duplicates, mark_applied
+from feed.facets import track_changes
+from feed.metrics import EVENT_AGE_MS, EVENTS_APPLIED
+from feed.models import ProdutoMirror
+from feed.snapshot import mark_dirty
+
+MIRROR_FIELDS = ("nome", "descricao", "preco", "estoque")
+UPSERT_COLUMNS = ("sku", *MIRROR_FIELDS, "versao")
+STOCK_EVENT = "estoque"
+
+
+def apply_products(products: list[dict], overwrite_same_version: bool = False) -> int:
+    """Aplica um lote de produtos no ProdutoMirror com last-writer-wins por versão.
+
+    Um evento só é aplicado se a sua ``versao`` for maior que a gravada (ou
+    igual, com ``overwrite_same_version``, usado pela reconciliação), então
+    eventos fora de ordem ou reentregues nunca sobrescrevem dados mais novos.
+    O cache dos SKUs e a janela de deduplicação são atualizados só depois do
+    commit. Retorna a quantidade de linhas inseridas ou atualizadas.
+    """
+    # Reentregas já vistas na janela de deduplicação saem antes de tocar o banco.
+    products, evento_ids = drop_duplicates(products)
+    _record_event_age(products)
+
+    # Eventos completos e ajustes de estoque (``tipo == "estoque"``), o mais
+    # novo de cada SKU. Os completos são aplicados antes dos ajustes.
+    latest, stock = {}, {}
+    for product_data in products:
+        target = stock if product_data.get("tipo") == STOCK_EVENT else latest
+        current = target.get(product_data["sku"])
+        if current is None or _version(product_data) >= _version(current):
+            target[product_data["sku"]] = product_data
+    if not latest and not stock:
+        return 0
+
+    using = router.db_for_write(ProdutoMirror)
+    connection = connections[using]
+    skus = list({**latest, **stock})
+
+    with transaction.atomic(using=using):
+        # Só depois do commit, para um leitor não recolocar no cache o valor antigo.
+        transaction.on_commit(partial(invalidate_products, skus), using=using)
+        # Só depois do commit: se a transação falhar, a reentrega precisa passar.
+        transaction.on_commit(partial(mark_applied, evento_ids), using=using)
+        # Só insere em SnapshotMudanca; o build_snapshot renderiza os segmentos.
+        mark_dirty(skus, using)
+
+        applied = 0
+        # Registra em FacetaDelta a diferença das linhas antes e depois da escrita.
+        with track_changes(skus, using):
+            if latest:
+                # Um INSERT ... ON CONFLICT DO UPDATE ... WHERE por bloco, sem ler antes.
+                rows = [_row(product_data, connection) for product_data in latest.values()]
+                applied += _upsert_rows(rows, connection, using, overwrite_same_version)
+            # Ajustes de estoque: UPDATE condicional só do estoque e da versão.
+            for product_data in stock.values():
+                applied += _apply_stock(product_data, using, overwrite_same_version)
+    return applied
+
+
+def _upsert_rows(rows: list[list], connection, using: str, overwrite_same_version: bool) -> int:
+    if not connection.features.supports_update_conflicts_with_target:
+        return _apply_rows_one_by_one(rows, using, overwrite_same_version)
+
+    fields = [ProdutoMirror._meta.get_field(column) for column in UPSERT_COLUMNS]
+    batch_size = connection.ops.bulk_batch_size(fields, rows) or len(rows)
+
+    applied = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start : start + batch_size]
+            cursor.execute(
+                _upsert_sql(connection, len(chunk), overwrite_same_version),
+                [value for row in chunk for value in row],
+            )
+            applied += cursor.rowcount
+    return applied
+
+
+def _apply_stock(product_data: dict, using: str, overwrite_same_version: bool) -> int:
+    """Ajuste de estoque: um único UPDATE condicional, sem tocar nome/descrição.
+
+    SKU ainda ausente no espelho é ignorado; o próximo evento completo ou a
+    reconciliação traz o produto.
+    """
+    lookup = "versao__lte" if overwrite_same_version else "versao__lt"
+    versao = _version(product_data)
+    return (
+        ProdutoMirror.objects.using(using)
+        .filter(sku=product_data["sku"], **{lookup: versao})
+        .update(estoque=product_data["estoque"], versao=versao)
+    )
+
+
+def _record_event_age(products: list[dict]):
+    """Idade de cada evento desde a gravação no produtor (``atualizado_em``)."""
+    EVENTS_APPLIED.inc(len(products))
+    now = datetime.now(UTC)
+    ages = []
+    for product_data in products:
+        emitted = product_data.get("atualizado_em")
+        if isinstance(emitted, str):
+            emitted = datetime.fromisoformat(emitted)
+        if isinstance(emitted, datetime):
+            if emitted.tzinfo is None:
+                emitted = emitted.replace(tzinfo=UTC)
+            ages.append((now - emitted).total_seconds() * 1000)
+    if ages:
+        EVENT_AGE_MS.observe_many(ages)
+
+
+def _version(product_data: dict) -> int:
+    # Eventos anteriores ao versionamento não têm versão e nunca sobrescrevem.
+    return int(product_data.get("versao") or 0)
+
+
+def _row(product_data: dict, connection) -> list:
+    values = {**product_data, "versao": _version(product_data)}
+    row = []
+    for column in UPSERT_COLUMNS:
+        field = ProdutoMirror._meta.get_field(column)
+        row.append(field.get_db_prep_save(field.to_python(values[column]), connection))
+    return row
+
+
+def _upsert_sql(connection, row_count: int, overwrite_same_version: bool) -> str:
+    qn = connection.ops.quote_name
+    table = qn(ProdutoMirror._meta.db_table)
+    columns = ", ".join(qn(column) for column in UPSERT_COLUMNS)
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(UPSERT_COLUMNS)) + ")"] * row_count)
+    comparison = "<=" if overwrite_same_version else "<"
+    updates = ", ".join(
+        f"{qn(column)} = excluded.{qn(column)}" for column in UPSERT_COLUMNS[1:]
+    )
+    return (
+        f"INSERT INTO {table} ({columns}) VALUES {placeholders} "
+        f"ON CONFLICT ({qn('sku')}) DO UPDATE SET {updates} "
+        f"WHERE {table}.{qn('versao')} {comparison} excluded.{qn('versao')}"
+    )
+
+
+def _apply_rows_one_by_one(rows: list[list], using: str, overwrite_same_version: bool) -> int:
+    """Alternativa para bancos sem upsert condicional: UPDATE condicional + INSERT."""
+    lookup = "versao__lte" if overwrite_same_version else "versao__lt"
+    applied = 0
+    for row in rows:
+        values = dict(zip(UPSERT_COLUMNS, row, strict=True))
+        sku = values.pop("sku")
+        updated = (
+            ProdutoMirror.objects.using(using)
+            .filter(sku=sku, **{lookup: values["versao"]})
+            .update(**values)
+        )
+        if not updated and not ProdutoMirror.objects.using(using).filter(sku=sku).exists():
+            ProdutoMirror.objects.using(using).create(sku=sku, **values)
+            updated = 1
+        applied += updated
+    return applied
@@ -9,9 +9,18 @@ class ProdutoMirror(models.Model):
     descricao = models.TextField()
     preco = models.DecimalField(max_digits=10, decimal_places=2)
     estoque = models.IntegerField()
+    versao = models.PositiveBigIntegerField(default=0)
 
     objects = Manager()
 
+    class Meta:
+        indexes = [
+            # Filtros por faixa de preço com estoque (busca, facetas) e listagens
+            # de itens sem estoque por preço; ambos atendidos só pelo índice.
+            models.Index(fields=["preco", "estoque"], name="feed_mirror_preco_estoque"),
+            models.Index(fields=["estoque", "preco"], name="feed_mirror_estoque_preco"),
+        ]
+
     def __str__(self):
         return f"{self.nome} - {self.preco}"
 
@@ -22,4 +31,85 @@ class ProdutoMirror(models.Model):
             "descricao": self.descricao,
             "preco": self.preco,
             "estoque": self.estoque,
+            "versao": self.versao,
         }
+
+
+class SnapshotSegmento(models.Model):
+    """Faixa de SKUs do catálogo pré-renderizada em JSON comprimido (gzip).
+
+    ``mudancas`` soma os lotes aplicados no ProdutoMirror que tocaram a faixa
+    (incorporados de ``SnapshotMudanca``); ``construido`` guarda o valor de
+    ``mudancas`` da última renderização. O segmento está sujo enquanto
+    ``mudancas > construido`` ou houver ``SnapshotMudanca`` da faixa.
+    """
+
+    segmento = models.IntegerField(primary_key=True)
+    mudancas = models.PositiveBigIntegerField(default=0)
+    construido = models.PositiveBigIntegerField(default=0)
+    conteudo = models.BinaryField(null=True)
+    etag = models.CharField(max_length=64, blank=True)
+    produtos = models.IntegerField(default=0)
+    construido_em = models.DateTimeField(null=True)
+
+    objects = Manager()
+
+    def __str__(self):
+        return f"Segmento {self.segmento} ({self.produtos} produtos)"
+
+
+class SnapshotMudanca(models.Model):
+    """Registro, só de inserção, de que um lote aplicado mudou a faixa ``segmento``.
+
+    ``apply_products`` grava aqui em vez de incrementar ``SnapshotSegmento.mudancas``,
+    sem travar a linha do segmento até o commit; ``build_snapshot`` soma os
+    registros em ``mudancas`` e os apaga.
+    """
+
+    segmento = models.IntegerField()
+
+    objects = Manager()
+
+    def __str__(self):
+        return f"Mudança no segmento {self.segmento}"
+
+
+class FacetaPreco(models.Model):
+    """Agregados do catálogo em uma faixa de preço, mantidos por deltas.
+
+    ``faixa`` é o índice em ``FEED_FACET_PRICE_BANDS``. Os valores valem até o
+    último ``recompute_facets``; os lotes aplicados depois ficam em
+    ``FacetaDelta`` e são somados na leitura. ``estoque`` e ``valor_estoque`` só
+    consideram produtos com estoque positivo.
+    """
+
+    faixa = models.IntegerField(primary_key=True)
+    produtos = models.BigIntegerField(default=0)
+    sem_estoque = models.BigIntegerField(default=0)
+    estoque = models.BigIntegerField(default=0)
+    valor_estoque = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    recalculado_em = models.DateTimeField(null=True)
+
+    objects = Manager()
+
+    def __str__(self):
+        return f"Faixa {self.faixa} ({self.produtos} produtos)"
+
+
+class FacetaDelta(models.Model):
+    """Diferença que um lote aplicado no ProdutoMirror causou em uma faixa de preço.
+
+    Só recebe inserções, na transação do lote, sem travar as linhas de
+    ``FacetaPreco``; ``recompute_facets`` incorpora e apaga os registros.
+    """
+
+    faixa = models.IntegerField()
+    produtos = models.BigIntegerField(default=0)
+    sem_estoque = models.BigIntegerField(default=0)
+    estoque = models.BigIntegerField(default=0)
+    valor_estoque = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    objects = Manager()
+
+    def __str__(self):
+        return f"Delta da faixa {self.faixa} ({self.produtos:+} produtos)"
@@ -0,0 +1,53 @@
+"""Particionamento dos eventos de produto por SKU.
+
+Os eventos são distribuídos entre ``PRODUCT_PARTITIONS`` filas com jump
+consistent hash (Lamping & Veach), então todos os eventos de um SKU caem
+sempre na mesma fila e saem em ordem, enquanto cada partição pode ter o seu
+consumidor. Ao mudar a quantidade de partições de N para N+1, só ~1/(N+1)
+dos SKUs trocam de fila. ``PRODUCT_PARTITIONS`` tem que ser igual nos dois
+serviços; com 1 partição a fila continua sendo ``product_reply``.
+"""
+
+from django.conf import settings
+
+EXCHANGE_NAME = "product_events"
+QUEUE_PREFIX = "product_reply"
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash: partição em ``[0, buckets)`` para ``key``."""
+    key &= 0xFFFFFFFFFFFFFFFF
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def partition_count() -> int:
+    return getattr(settings, "PRODUCT_PARTITIONS", 1)
+
+
+def partition_for(sku: int, partitions: int | None = None) -> int:
+    return jump_hash(int(sku), partitions or partition_count())
+
+
+def queue_name(partition: int, partitions: int | None = None) -> str:
+    if (partitions or partition_count()) == 1:
+        return QUEUE_PREFIX
+    return f"{QUEUE_PREFIX}.{partition}"
+
+
+def product_queues(partitions: list[int] | None = None) -> list:
+    """Filas das ``partitions`` informadas (todas, por padrão) ligadas ao exchange."""
+    from kombu import Exchange, Queue
+
+    total = partition_count()
+    exchange = Exchange(EXCHANGE_NAME, type="direct")
+    if partitions is None:
+        partitions = range(total)
+    return [
+        Queue(queue_name(p, total), exchange, routing_key=queue_name(p, total))
+        for p in partitions
+    ]
@@ -0,0 +1,91 @@
+"""Digests por faixa de SKU para a reconciliação (anti-entropia) com a API de produtos.
+
+O algoritmo precisa ser idêntico ao de ``produto/reconcile.py`` em api_produtos:
+cada linha vira um hash de 64 bits sobre ``sku, nome, preco, estoque`` e o
+digest de uma faixa é a soma módulo 2^64 dos hashes das linhas. Por ser independente de ordem, o
+digest de uma faixa é a soma dos digests das subfaixas, o que permite descer
+como numa árvore de Merkle trocando só os digests das faixas divergentes.
+"""
+
+from hashlib import blake2b
+
+from feed.models import ProdutoMirror
+
+DIGEST_FIELDS = ("sku", "nome", "preco", "estoque")
+_MASK = (1 << 64) - 1
+
+
+def row_digest(sku: int, nome: str, preco, estoque: int) -> int:
+    data = f"{sku}|{nome}|{preco:.2f}|{estoque}".encode()
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "big")
+
+
+def split_range(lo: int, hi: int, parts: int) -> list[tuple[int, int]]:
+    """Divide ``[lo, hi)`` em até ``parts`` subfaixas contíguas de mesma largura."""
+    width = max(-(-(hi - lo) // parts), 1)
+    return [(start, min(start + width, hi)) for start in range(lo, hi, width)]
+
+
+def range_digests(rows, lo: int, hi: int, parts: int) -> list[dict]:
+    """Calcula contagem e digest de cada subfaixa de ``[lo, hi)`` em uma passada."""
+    ranges = split_range(lo, hi, parts)
+    if not ranges:
+        return []
+
+    width = ranges[0][1] - ranges[0][0]
+    counts = [0] * len(ranges)
+    digests = [0] * len(ranges)
+    for sku, nome, preco, estoque in rows:
+        index = (sku - lo) // width
+        counts[index] += 1
+        digests[index] = (digests[index] + row_digest(sku, nome, preco, estoque)) & _MASK
+
+    return [
+        {"lo": start, "hi": end, "count": count, "digest": f"{digest:016x}"}
+        for (start, end), count, digest in zip(ranges, counts, digests, strict=True)
+    ]
+
+
+def sku_bounds() -> tuple[int, int] | None:
+    """Retorna ``(menor sku, maior sku + 1)`` do catálogo, ou ``None`` se vazio."""
+    first = ProdutoMirror.objects.order_by("sku").values_list("sku", flat=True).first()
+    if first is None:
+        return None
+    last = ProdutoMirror.objects.order_by("-sku").values_list("sku", flat=True).first()
+    return first, last + 1
+
+
+def mirror_digests(lo: int, hi: int, parts: int) -> list[dict]:
+    rows = (
+        ProdutoMirror.objects.filter(sku__gte=lo, sku__lt=hi)
+        .values_list(*DIGEST_FIELDS)
+        .iterator(chunk_size=5000)
+    )
+    return range_digests(rows, lo, hi, parts)
+
+
+def repair_range(lo: int, hi: int, rows: list[dict]) -> dict:
+    """Alinha ``[lo, hi)`` do espelho com as linhas vindas da API de produtos.
+
+    SKUs ausentes na origem são removidos e as demais linhas são regravadas,
+    exceto quando o espelho já tem uma versão mais nova (evento que chegou
+    depois da leitura da origem).
+    """
+    from django.db import router, transaction
+
+    from feed.cache import invalidate_products
+    from feed.facets import track_changes
+    from feed.mirror import apply_products
+    from feed.snapshot import mark_dirty
+
+    remote_skus = {row["sku"] for row in rows}
+    with transaction.atomic():
+        stale = ProdutoMirror.objects.filter(sku__gte=lo, sku__lt=hi).exclude(sku__in=remote_skus)
+        removed_skus = list(stale.values_list("sku", flat=True))
+        if removed_skus:
+            with track_changes(removed_skus, router.db_for_write(ProdutoMirror)):
+                ProdutoMirror.objects.filter(sku__in=removed_skus).delete()
+            mark_dirty(removed_skus)
+            transaction.on_commit(lambda: invalidate_products(removed_skus))
+        written = apply_products(rows, overwrite_same_version=True)
+    return {"gravados": written, "removidos": len(removed_skus)}
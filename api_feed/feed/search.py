@@ -0,0 +1,177 @@
+"""Busca textual no ProdutoMirror.
+
+Usa o índice mantido pelo banco (criado pela migração ``0003_produtomirror_busca``
+com o SQL das constantes abaixo): FTS5
+com ranking bm25 no SQLite e ``tsvector``/``ts_rank`` com índice GIN no
+PostgreSQL. Como os triggers/índices acompanham cada INSERT/UPDATE/DELETE,
+o upsert de ``apply_products`` mantém a busca atualizada sem passo extra. Em
+outros bancos cai para ``icontains`` (varredura da tabela).
+
+Cada termo da consulta casa por prefixo (``cade`` encontra ``cadeira``) e
+todos os termos precisam aparecer no nome ou na descrição.
+"""
+
+import re
+
+from django.db import connections, router
+
+from feed.models import ProdutoMirror
+
+MAX_TERMS = 8
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+# Peso do nome em relação à descrição no ranking bm25 (SQLite).
+NOME_WEIGHT = 5.0
+DESCRICAO_WEIGHT = 1.0
+
+# SQL do índice de busca, usado pela migração 0003 e pelo bootstrap_mirror (que
+# desliga os triggers durante a carga). No SQLite uma tabela FTS5 de conteúdo
+# externo sincronizada por triggers; no PostgreSQL um índice GIN sobre o
+# tsvector de nome + descrição.
+SQLITE_FTS_TABLE = """
+    CREATE VIRTUAL TABLE feed_produtomirror_fts USING fts5(
+        nome, descricao,
+        content='feed_produtomirror', content_rowid='sku',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+"""
+SQLITE_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER feed_produtomirror_fts_ai AFTER INSERT ON feed_produtomirror BEGIN
+        INSERT INTO feed_produtomirror_fts(rowid, nome, descricao)
+        VALUES (new.sku, new.nome, new.descricao);
+    END
+    """,
+    """
+    CREATE TRIGGER feed_produtomirror_fts_ad AFTER DELETE ON feed_produtomirror BEGIN
+        INSERT INTO feed_produtomirror_fts(feed_produtomirror_fts, rowid, nome, descricao)
+        VALUES ('delete', old.sku, old.nome, old.descricao);
+    END
+    """,
+    """
+    CREATE TRIGGER feed_produtomirror_fts_au AFTER UPDATE OF nome, descricao
+    ON feed_produtomirror BEGIN
+        INSERT INTO feed_produtomirror_fts(feed_produtomirror_fts, rowid, nome, descricao)
+        VALUES ('delete', old.sku, old.nome, old.descricao);
+        INSERT INTO feed_produtomirror_fts(rowid, nome, descricao)
+        VALUES (new.sku, new.nome, new.descricao);
+    END
+    """,
+)
+# A tabela é de conteúdo externo: o 'rebuild' a refaz a partir do espelho.
+SQLITE_FTS_REBUILD = (
+    "INSERT INTO feed_produtomirror_fts(feed_produtomirror_fts) VALUES ('rebuild')"
+)
+SQLITE_DROP_FTS_TRIGGERS = (
+    "DROP TRIGGER IF EXISTS feed_produtomirror_fts_au",
+    "DROP TRIGGER IF EXISTS feed_produtomirror_fts_ad",
+    "DROP TRIGGER IF EXISTS feed_produtomirror_fts_ai",
+)
+SQLITE_DROP_FTS_TABLE = "DROP TABLE IF EXISTS feed_produtomirror_fts"
+POSTGRESQL_SEARCH_INDEX = """
+    CREATE INDEX IF NOT EXISTS feed_produtomirror_busca_idx ON feed_produtomirror
+    USING GIN (to_tsvector('simple', nome || ' ' || descricao))
+"""
+POSTGRESQL_DROP_SEARCH_INDEX = "DROP INDEX IF EXISTS feed_produtomirror_busca_idx"
+
+
+def parse_terms(query: str) -> list[str]:
+    """Termos da consulta sem pontuação nem operadores da sintaxe do FTS."""
+    return [term.lower() for term in _TERM_RE.findall(query)][:MAX_TERMS]
+
+
+def search_products(
+    query: str,
+    limit: int = 20,
+    preco_min=None,
+    preco_max=None,
+    em_estoque: bool = False,
+) -> list[dict]:
+    """Produtos mais relevantes para ``query``, com filtros opcionais de preço e estoque.
+
+    Returns:
+        Até ``limit`` produtos (``to_dict`` + ``rank``), do mais relevante para o menos.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return []
+
+    using = router.db_for_read(ProdutoMirror)
+    vendor = connections[using].vendor
+    if vendor == "sqlite":
+        return _search_sqlite(using, terms, limit, preco_min, preco_max, em_estoque)
+    if vendor == "postgresql":
+        return _search_postgresql(using, terms, limit, preco_min, preco_max, em_estoque)
+    return _search_fallback(using, terms, limit, preco_min, preco_max, em_estoque)
+
+
+def _filters(preco_min, preco_max, em_estoque) -> tuple[list[str], list]:
+    clauses, params = [], []
+    if preco_min is not None:
+        clauses.append("m.preco >= %s")
+        params.append(preco_min)
+    if preco_max is not None:
+        clauses.append("m.preco <= %s")
+        params.append(preco_max)
+    if em_estoque:
+        clauses.append("m.estoque > 0")
+    return clauses, params
+
+
+def _search_sqlite(using, terms, limit, preco_min, preco_max, em_estoque) -> list[dict]:
+    match = " ".join(f'"{term}"*' for term in terms)
+    clauses, params = _filters(preco_min, preco_max, em_estoque)
+    where = "".join(f" AND {clause}" for clause in clauses)
+    sql = (
+        "SELECT m.sku, bm25(feed_produtomirror_fts, %s, %s) AS rank "
+        "FROM feed_produtomirror_fts "
+        "JOIN feed_produtomirror AS m ON m.sku = feed_produtomirror_fts.rowid "
+        f"WHERE feed_produtomirror_fts MATCH %s{where} "
+        "ORDER BY rank LIMIT %s"
+    )
+    # bm25 do FTS5 é negativo: quanto menor, mais relevante.
+    ranked = _fetch(using, sql, [NOME_WEIGHT, DESCRICAO_WEIGHT, match, *params, limit])
+    return _load(using, [(sku, -rank) for sku, rank in ranked])
+
+
+def _search_postgresql(using, terms, limit, preco_min, preco_max, em_estoque) -> list[dict]:
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    clauses, params = _filters(preco_min, preco_max, em_estoque)
+    where = "".join(f" AND {clause}" for clause in clauses)
+    sql = (
+        "SELECT m.sku, ts_rank(to_tsvector('simple', m.nome || ' ' || m.descricao), q) AS rank "
+        "FROM feed_produtomirror AS m, to_tsquery('simple', %s) AS q "
+        f"WHERE to_tsvector('simple', m.nome || ' ' || m.descricao) @@ q{where} "
+        "ORDER BY rank DESC LIMIT %s"
+    )
+    return _load(using, _fetch(using, sql, [tsquery, *params, limit]))
+
+
+def _search_fallback(using, terms, limit, preco_min, preco_max, em_estoque) -> list[dict]:
+    from django.db.models import Q
+
+    queryset = ProdutoMirror.objects.using(using)
+    for term in terms:
+        queryset = queryset.filter(Q(nome__icontains=term) | Q(descricao__icontains=term))
+    if preco_min is not None:
+        queryset = queryset.filter(preco__gte=preco_min)
+    if preco_max is not None:
+        queryset = queryset.filter(preco__lte=preco_max)
+    if em_estoque:
+        queryset = queryset.filter(estoque__gt=0)
+    return [{**produto.to_dict(), "rank": None} for produto in queryset.order_by("sku")[:limit]]
+
+
+def _fetch(using: str, sql: str, params: list) -> list[tuple]:
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _load(using: str, ranked: list[tuple]) -> list[dict]:
+    produtos = ProdutoMirror.objects.using(using).in_bulk([sku for sku, _ in ranked])
+    return [
+        {**produtos[sku].to_dict(), "rank": float(rank)}
+        for sku, rank in ranked
+        if sku in produtos
+    ]
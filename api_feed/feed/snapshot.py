@@ -0,0 +1,193 @@
+"""Snapshot do catálogo pré-renderizado em segmentos comprimidos.
+
+O catálogo é dividido em faixas de ``FEED_SNAPSHOT_SEGMENT_SIZE`` SKUs. Cada
+faixa é guardada em ``SnapshotSegmento`` já serializada em JSON e comprimida
+com gzip, com um ETag calculado sobre o conteúdo. ``apply_products`` registra
+em ``SnapshotMudanca`` (só inserções, sem travar a linha do segmento) as faixas
+cujos SKUs mudaram; ``build_snapshot`` incorpora esses registros e renderiza
+de novo apenas os segmentos sujos. Os endpoints só leem o que está gravado: um
+segmento sujo continua servindo a última renderização (e o ETag dela) até o
+``build_snapshot`` passar. Um consumidor que baixa o catálogo com
+``If-None-Match`` recebe 304 nos segmentos que não mudaram, e os que mudaram
+saem prontos do banco, sem reserialização.
+"""
+
+import gzip
+import hashlib
+import json
+from collections import Counter
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from feed.models import ProdutoMirror, SnapshotMudanca, SnapshotSegmento
+
+SNAPSHOT_FIELDS = ("sku", "nome", "descricao", "preco", "estoque", "versao")
+
+
+def segment_size() -> int:
+    return settings.FEED_SNAPSHOT_SEGMENT_SIZE
+
+
+def segment_for(sku: int) -> int:
+    return sku // segment_size()
+
+
+def mark_dirty(skus, using: str | None = None):
+    """Registra os segmentos dos ``skus`` como sujos, na transação corrente.
+
+    Só insere em ``SnapshotMudanca``: lotes de partições diferentes que tocam a
+    mesma faixa não disputam a linha do segmento até o commit.
+    """
+    segments = {segment_for(sku) for sku in skus}
+    if segments:
+        SnapshotMudanca.objects.using(using or router.db_for_write(SnapshotMudanca)).bulk_create(
+            [SnapshotMudanca(segmento=segment) for segment in sorted(segments)]
+        )
+
+
+def fold_changes() -> int:
+    """Soma os registros de ``SnapshotMudanca`` em ``mudancas`` e os apaga.
+
+    Os registros lidos ficam travados (``SKIP LOCKED``): dois ``build_snapshot``
+    em paralelo não contam o mesmo registro. Retorna quantos foram incorporados.
+    """
+    with transaction.atomic():
+        rows = list(
+            SnapshotMudanca.objects.select_for_update(skip_locked=True).values_list(
+                "id", "segmento"
+            )
+        )
+        if not rows:
+            return 0
+        counts = Counter(segment for _, segment in rows)
+        SnapshotSegmento.objects.bulk_create(
+            [SnapshotSegmento(segmento=segment) for segment in sorted(counts)],
+            ignore_conflicts=True,
+        )
+        for segment, count in sorted(counts.items()):
+            SnapshotSegmento.objects.filter(segmento=segment).update(
+                mudancas=F("mudancas") + count
+            )
+        ids = [row_id for row_id, _ in rows]
+        for start in range(0, len(ids), 500):
+            SnapshotMudanca.objects.filter(id__in=ids[start : start + 500]).delete()
+    return len(rows)
+
+
+def build_segment(segmento: int) -> SnapshotSegmento | None:
+    """Renderiza um segmento se estiver sujo e devolve a versão gravada.
+
+    ``mudancas`` é lido antes das linhas; se um lote mudar a faixa durante a
+    renderização, o segmento continua sujo e é renderizado de novo depois.
+    """
+    current = SnapshotSegmento.objects.filter(segmento=segmento).first()
+    if current is None:
+        return None
+    if current.construido >= current.mudancas and current.conteudo is not None:
+        return current
+
+    lo = segmento * segment_size()
+    rows = list(
+        ProdutoMirror.objects.filter(sku__gte=lo, sku__lt=lo + segment_size())
+        .order_by("sku")
+        .values(*SNAPSHOT_FIELDS)
+    )
+    document = json.dumps(rows, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+
+    current.conteudo = gzip.compress(document, settings.FEED_SNAPSHOT_COMPRESS_LEVEL, mtime=0)
+    current.etag = f'"{hashlib.blake2b(document, digest_size=16).hexdigest()}"'
+    current.produtos = len(rows)
+    current.construido = current.mudancas
+    current.construido_em = timezone.now()
+    # Não sobrescreve uma renderização concorrente que já viu mais mudanças.
+    SnapshotSegmento.objects.filter(
+        segmento=segmento, construido__lt=current.construido
+    ).update(
+        conteudo=current.conteudo,
+        etag=current.etag,
+        produtos=current.produtos,
+        construido=current.construido,
+        construido_em=current.construido_em,
+    )
+    return current
+
+
+def rebuild_dirty() -> int:
+    """Incorpora as mudanças registradas e renderiza todos os segmentos sujos.
+
+    Retorna quantos segmentos foram renderizados.
+    """
+    fold_changes()
+    dirty = SnapshotSegmento.objects.filter(mudancas__gt=F("construido")).values_list(
+        "segmento", flat=True
+    )
+    built = 0
+    for segmento in list(dirty):
+        build_segment(segmento)
+        built += 1
+    return built
+
+
+def reset_segments() -> int:
+    """Recria os segmentos a partir do ProdutoMirror, todos sujos.
+
+    Para a carga inicial de um espelho já populado ou depois de mudar
+    ``FEED_SNAPSHOT_SEGMENT_SIZE``. Retorna a quantidade de segmentos.
+    """
+    segments = set(
+        ProdutoMirror.objects.annotate(segmento=F("sku") / segment_size())
+        .values_list("segmento", flat=True)
+        .distinct()
+    )
+    with transaction.atomic():
+        # As mudanças registradas já estão cobertas pela renderização completa.
+        SnapshotMudanca.objects.all().delete()
+        SnapshotSegmento.objects.all().delete()
+        SnapshotSegmento.objects.bulk_create(
+            [SnapshotSegmento(segmento=segment, mudancas=1) for segment in sorted(segments)]
+        )
+    return len(segments)
+
+
+def stored_segment(segmento: int) -> SnapshotSegmento | None:
+    """Última renderização gravada do segmento, sem renderizar (``None`` se não existe).
+
+    Uma faixa nova, com mudanças ainda não incorporadas, volta sem ``conteudo``.
+    """
+    segment = SnapshotSegmento.objects.filter(segmento=segmento).first()
+    if segment is None and SnapshotMudanca.objects.filter(segmento=segmento).exists():
+        return SnapshotSegmento(segmento=segmento)
+    return segment
+
+
+def snapshot_index() -> list[dict]:
+    """Segmentos com produtos e o ETag da última renderização, sem renderizar.
+
+    ``pendente`` indica mudanças ainda não renderizadas; um segmento que nunca
+    foi renderizado aparece com ``etag`` nulo.
+    """
+    size = segment_size()
+    changed = set(SnapshotMudanca.objects.values_list("segmento", flat=True).distinct())
+    segments = {
+        segment.segmento: segment
+        for segment in SnapshotSegmento.objects.filter(
+            Q(produtos__gt=0) | Q(conteudo__isnull=True) | Q(segmento__in=changed)
+        ).only("segmento", "produtos", "etag", "mudancas", "construido")
+    }
+    for segmento in changed - segments.keys():
+        segments[segmento] = SnapshotSegmento(segmento=segmento)
+    return [
+        {
+            "segmento": segmento,
+            "primeiro_sku": segmento * size,
+            "ultimo_sku": (segmento + 1) * size - 1,
+            "produtos": segment.produtos,
+            "etag": segment.etag or None,
+            "pendente": segment.mudancas > segment.construido or segmento in changed,
+        }
+        for segmento, segment in sorted(segments.items())
+    ]
@@ -1,27 +1,77 @@
+import logging
+import time
+
 from celery import shared_task
 
+logger = logging.getLogger(__name__)
+
 
-@shared_task(name="process_product_data")
-def process_product_data(product_data: dict):
+@shared_task(name="process_product_data", bind=True)
+def process_product_data(self, product_data: dict):
     """Processa os dados do produto recebidos da fila."""
-    print(f"Processando dados do produto: {product_data}")
-    from feed.models import ProdutoMirror
+    logger.debug("Processando dados do produto: %s", product_data)
+    from feed.metrics import TASK_DURATION_MS
+    from feed.mirror import apply_products
 
+    start = time.perf_counter()
     try:
-        # Cria ou atualiza o ProdutoMirror
-        produto_mirror, created = ProdutoMirror.objects.update_or_create(
-            sku=product_data["sku"],
-            defaults={
-                "nome": product_data["nome"],
-                "descricao": product_data["descricao"],
-                "preco": product_data["preco"],
-                "estoque": product_data["estoque"],
-            },
-        )
-
-        action = "criado" if created else "atualizado"
-        print(f"ProdutoMirror {action}: {produto_mirror}")
+        # Cria ou atualiza o ProdutoMirror, só se o evento for mais novo
+        applied = apply_products([product_data])
+
+        action = "aplicado" if applied else "ignorado (versão antiga)"
+        logger.debug("ProdutoMirror %s %s", product_data["sku"], action)
 
     except Exception as e:
-        print(f"Erro ao processar produto: {e!s}")
-        raise
+        logger.exception("Erro ao processar o produto %s", product_data.get("sku"))
+        _retry_or_dead_letter(self, [product_data], e)
+    finally:
+        TASK_DURATION_MS.observe((time.perf_counter() - start) * 1000)
+
+
+@shared_task(name="process_product_batch", bind=True)
+def process_product_batch(self, products: list[dict]):
+    """Processa um lote de produtos publicado pelo relay do outbox."""
+    logger.debug("Processando lote de %d produtos", len(products))
+    from feed.metrics import TASK_DURATION_MS
+    from feed.mirror import apply_products
+
+    start = time.perf_counter()
+    try:
+        apply_products(products)
+
+    except Exception as e:
+        logger.exception("Erro ao processar lote de %d produtos", len(products))
+        _retry_or_dead_letter(self, products, e)
+    finally:
+        TASK_DURATION_MS.observe((time.perf_counter() - start) * 1000)
+
+
+def _retry_or_dead_letter(task, products: list[dict], exc: Exception):
+    """Erro transitório: nova tentativa com backoff. Permanente: dead-letter e ack."""
+    from django.conf import settings
+
+    from feed.codec import SERIALIZER_NAME
+    from feed.deadletter import (
+        apply_isolating,
+        is_transient,
+        retry_delay,
+        send_to_dead_letter,
+    )
+    from feed.metrics import TASK_FAILURES, TASK_RETRIES
+
+    TASK_FAILURES.inc()
+    if is_transient(exc):
+        if task.request.retries < settings.FEED_RETRY_MAX_ATTEMPTS:
+            TASK_RETRIES.inc()
+            raise task.retry(
+                exc=exc,
+                countdown=retry_delay(task.request.retries),
+                max_retries=settings.FEED_RETRY_MAX_ATTEMPTS,
+                serializer=SERIALIZER_NAME,
+            )
+        send_to_dead_letter(products, exc, task.name)
+    elif len(products) > 1:
+        # Isola o evento envenenado: o resto do lote é aplicado normalmente.
+        apply_isolating(products, task.name)
+    else:
+        send_to_dead_letter(products, exc, task.name)
@@ -1,3 +1,367 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from feed import dedup, metrics
+from feed.bootstrap import load_snapshot
+from feed.cache import LIST_GENERATION_KEY, list_key, product_key
+from feed.deadletter import is_transient, retry_delay
+from feed.facets import FACET_FIELDS, facets_summary, recompute_facets
+from feed.mirror import apply_products
+from feed.models import (
+    FacetaDelta,
+    FacetaPreco,
+    ProdutoMirror,
+    SnapshotMudanca,
+    SnapshotSegmento,
+)
+from feed.partitions import jump_hash, partition_for, product_queues, queue_name
+from feed.reconcile import mirror_digests, range_digests, repair_range, row_digest
+from feed.search import search_products
+from feed.snapshot import fold_changes, rebuild_dirty
+from feed.task import process_product_batch
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def produto(sku: int, versao: int = 1, **campos) -> dict:
+    valores = {"nome": f"Produto {sku}", "descricao": "d", "preco": "10.00", "estoque": 5}
+    return {"sku": sku, **valores, **campos, "versao": versao}
+
+
+class ParticaoTests(SimpleTestCase):
+    def test_particao_de_cada_sku_e_fixa(self):
+        # Mesmos valores em produto/tests.py (api_produtos): produtor e consumidor concordam.
+        particoes = [partition_for(sku, 8) for sku in range(10)]
+        self.assertEqual(particoes, [0, 6, 6, 3, 1, 4, 5, 0, 4, 7])
+
+    def test_nova_particao_so_recebe_skus_sem_mover_os_demais(self):
+        movidos = [sku for sku in range(10_000) if jump_hash(sku, 8) != jump_hash(sku, 9)]
+
+        self.assertTrue(all(jump_hash(sku, 9) == 8 for sku in movidos))
+        self.assertLess(abs(len(movidos) - 10_000 / 9), 200)
+
+    def test_uma_particao_usa_a_fila_original(self):
+        self.assertEqual(queue_name(0, 1), "product_reply")
+        self.assertEqual(queue_name(3, 4), "product_reply.3")
+
+    @override_settings(PRODUCT_PARTITIONS=4)
+    def test_uma_fila_por_particao_no_exchange(self):
+        filas = product_queues()
+
+        self.assertEqual([fila.name for fila in filas], [f"product_reply.{p}" for p in range(4)])
+        self.assertEqual({fila.exchange.name for fila in filas}, {"product_events"})
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        override = override_settings(METRICS_DIR=str(self.directory), METRICS_EXPORT_INTERVAL=5.0)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write_snapshot(self, name: str, snapshot: dict, age: float = 0.0):
+        path = self.directory / name
+        path.write_text(json.dumps(snapshot))
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_gauges_saem_por_processo_e_contadores_somam(self):
+        snapshot = {
+            "fila": {"type": "gauge", "help": "h", "value": 7},
+            "eventos": {"type": "counter", "help": "h", "value": 3},
+        }
+        texto = metrics.render_prometheus([("10", snapshot), ("2", snapshot)])
+
+        self.assertIn('fila{pid="2"} 7\nfila{pid="10"} 7', texto)
+        self.assertIn("eventos 6", texto)
+
+    def test_arquivo_de_processo_morto_e_apagado(self):
+        snapshot = {"fila": {"type": "gauge", "help": "h", "value": 7}}
+        vivo = self.write_snapshot("101-1.json", snapshot)
+        morto = self.write_snapshot("102-1.json", snapshot, age=60)
+
+        processos = [pid for pid, _ in metrics.collect()]
+
+        self.assertIn("101", processos)
+        self.assertNotIn("102", processos)
+        self.assertTrue(vivo.exists())
+        self.assertFalse(morto.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MirrorTests(TestCase):
+    def test_versao_mais_nova_vence_em_qualquer_ordem(self):
+        apply_products([produto(1, versao=3, nome="Terceira"), produto(1, versao=2, nome="Velha")])
+        self.assertEqual(ProdutoMirror.objects.get(sku=1).nome, "Terceira")
+
+        self.assertEqual(apply_products([produto(1, versao=2, nome="Atrasada")]), 0)
+        self.assertEqual(apply_products([produto(1, versao=3, nome="Reentregue")]), 0)
+        self.assertEqual(apply_products([produto(1, versao=4, nome="Quarta")]), 1)
+
+        mirror = ProdutoMirror.objects.get(sku=1)
+        self.assertEqual((mirror.nome, mirror.versao), ("Quarta", 4))
+
+    def test_reconciliacao_sobrescreve_a_mesma_versao(self):
+        apply_products([produto(1, versao=2, nome="Divergente")])
+
+        apply_products([produto(1, versao=2, nome="Origem")], overwrite_same_version=True)
+
+        self.assertEqual(ProdutoMirror.objects.get(sku=1).nome, "Origem")
+
+    def test_evento_de_estoque_so_muda_estoque_e_versao(self):
+        apply_products([produto(1, versao=2, nome="Completo")])
+        estoque = {"sku": 1, "estoque": 40, "tipo": "estoque"}
+
+        self.assertEqual(apply_products([{**estoque, "versao": 3}]), 1)
+        self.assertEqual(apply_products([{**estoque, "estoque": 7, "versao": 2}]), 0)
+        self.assertEqual(apply_products([{**estoque, "sku": 9, "versao": 1}]), 0)
+
+        mirror = ProdutoMirror.objects.get(sku=1)
+        self.assertEqual((mirror.nome, mirror.estoque, mirror.versao), ("Completo", 40, 3))
+        self.assertFalse(ProdutoMirror.objects.filter(sku=9).exists())
+
+    def test_evento_completo_e_de_estoque_no_mesmo_lote(self):
+        apply_products(
+            [
+                produto(1, versao=1, estoque=5),
+                {"sku": 1, "estoque": 2, "versao": 2, "tipo": "estoque"},
+            ]
+        )
+
+        mirror = ProdutoMirror.objects.get(sku=1)
+        self.assertEqual((mirror.estoque, mirror.versao), (2, 2))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BatchTests(TestCase):
+    def test_itens_na_ordem_pedida_com_null_e_missing(self):
+        apply_products([produto(1), produto(2)])
+        # Com o SKU 1 no cache o lote mistura hits do cache e o in_bulk.
+        self.client.get("/produtos/1")
+
+        response = self.client.post(
+            "/produtos/batch", {"skus": [2, 9, 1, 9]}, content_type="application/json"
+        )
+
+        body = response.json()
+        self.assertEqual([item and item["sku"] for item in body["items"]], [2, None, 1, None])
+        self.assertEqual(body["missing"], [9])
+
+
+@override_settings(CACHES={"default": {**LOCMEM_CACHE["default"], "TIMEOUT": 60}})
+class CacheTests(TestCase):
+    def expira_em(self, key: str) -> float | None:
+        return cache._expire_info.get(cache.make_key(key))
+
+    def test_preenchimento_expira_pelo_timeout_do_cache(self):
+        apply_products([produto(1)])
+        cache.clear()
+
+        self.client.get("/produtos/1")
+        self.client.get("/produtos/", {"limit": 10})
+
+        self.assertAlmostEqual(self.expira_em(product_key(1)), time.time() + 60, delta=5)
+        pagina = async_to_sync(list_key)(None, 10)
+        self.assertAlmostEqual(self.expira_em(pagina), time.time() + 60, delta=5)
+        self.assertIsNone(self.expira_em(LIST_GENERATION_KEY))
+
+
+@override_settings(CACHES=LOCMEM_CACHE, FEED_DEDUP_BACKEND="cache")
+class DedupTests(TestCase):
+    def setUp(self):
+        # A janela é criada uma vez por processo, com o backend do settings.
+        patcher = patch.object(dedup, "_window", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reentrega_e_descartada_sem_tocar_o_banco(self):
+        evento = produto(1, evento_id="a" * 32)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(apply_products([evento]), 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(apply_products([evento]), 0)
+
+    def test_evento_so_entra_na_janela_depois_do_commit(self):
+        evento = produto(1, evento_id="b" * 32)
+        with self.captureOnCommitCallbacks(execute=False):
+            apply_products([evento])
+
+        self.assertEqual(dedup.drop_duplicates([evento]), ([evento], [evento["evento_id"]]))
+
+    def test_memoria_esquece_os_mais_antigos(self):
+        janela = dedup.MemoryDedup(max_items=2)
+        janela.mark(["a", "b"])
+        janela.seen(["a"])
+        janela.mark(["c"])
+
+        self.assertEqual(janela.seen(["a", "b", "c"]), {"a", "c"})
+
+    def test_bloom_lembra_de_todos_os_ids_da_janela(self):
+        janela = dedup.BloomDedup(max_items=100, error_rate=0.01)
+        ids = [f"{numero:032x}" for numero in range(150)]
+        janela.mark(ids)
+
+        self.assertEqual(janela.seen(ids[50:]), set(ids[50:]))
+
+
+@override_settings(CACHES=LOCMEM_CACHE, FEED_FACET_PRICE_BANDS=(0, 50, 100))
+class FacetTests(TestCase):
+    def facetas(self) -> dict:
+        return {
+            faixa["faixa"]: tuple(faixa[field] for field in FACET_FIELDS)
+            for faixa in facets_summary()["faixas"]
+        }
+
+    def test_deltas_batem_com_o_recalculo(self):
+        apply_products([produto(1, preco="10.00"), produto(2, preco="60.00", estoque=2)])
+        apply_products([produto(1, versao=2, preco="120.00", estoque=3)])
+        apply_products([{"sku": 2, "estoque": 0, "versao": 2, "tipo": "estoque"}])
+        apply_products([produto(3, preco="75.50", estoque=4)])
+        repair_range(3, 4, [])
+        incrementais = self.facetas()
+
+        self.assertEqual(recompute_facets(), {"faixas": 3, "divergentes": 0})
+        self.assertEqual(self.facetas(), incrementais)
+        self.assertEqual(incrementais[1], (1, 1, 0, Decimal("0.00")))
+        self.assertEqual(incrementais[2], (1, 0, 3, Decimal("360.00")))
+        self.assertFalse(FacetaDelta.objects.exists())
+
+    def test_lote_so_insere_deltas_sem_tocar_as_faixas(self):
+        apply_products([produto(1, preco="10.00")])
+        recompute_facets()
+        faixas = list(FacetaPreco.objects.order_by("faixa").values())
+
+        apply_products([produto(1, versao=2, preco="60.00"), produto(2, preco="70.00")])
+
+        self.assertEqual(list(FacetaPreco.objects.order_by("faixa").values()), faixas)
+        self.assertEqual(FacetaDelta.objects.count(), 2)
+        self.assertEqual(self.facetas()[1], (2, 0, 10, Decimal("650.00")))
+
+    def test_recalculo_corrige_escrita_fora_do_apply_products(self):
+        apply_products([produto(1, preco="10.00")])
+        ProdutoMirror.objects.filter(sku=1).update(preco=Decimal("70.00"))
+
+        self.assertEqual(recompute_facets()["divergentes"], 2)
+        self.assertEqual(self.facetas()[1], (1, 0, 5, Decimal("350.00")))
+
+        response = self.client.get("/produtos/facetas").json()
+        self.assertEqual(response["total"]["produtos"], 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ReconcileTests(TestCase):
+    def test_digest_da_linha_e_o_mesmo_da_api_de_produtos(self):
+        # Mesmo valor fixado em produto/tests.py (api_produtos).
+        self.assertEqual(row_digest(1, "Caneca", Decimal("19.90"), 3), 0x342635B4CDE05AEB)
+
+    def test_digests_do_espelho_batem_com_as_linhas_da_origem(self):
+        apply_products([produto(sku) for sku in range(1, 9)])
+        origem = [(sku, f"Produto {sku}", Decimal("10.00"), 5) for sku in range(1, 9)]
+
+        self.assertEqual(mirror_digests(1, 9, 4), range_digests(origem, 1, 9, 4))
+
+    def test_reparo_remove_sobras_regrava_divergentes_e_preserva_os_mais_novos(self):
+        apply_products([produto(1, nome="Errado"), produto(2), produto(3, versao=5, nome="Novo")])
+        origem = [produto(1, nome="Certo"), produto(3, versao=4, nome="Velho")]
+
+        result = repair_range(1, 4, origem)
+
+        self.assertEqual(result, {"gravados": 1, "removidos": 1})
+        self.assertEqual(
+            dict(ProdutoMirror.objects.values_list("sku", "nome")), {1: "Certo", 3: "Novo"}
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BootstrapTests(TransactionTestCase):
+    def test_carga_recria_o_indice_de_busca(self):
+        carregados = load_snapshot(iter([produto(1, nome="Caneca azul")]), chunk_size=1)
+        apply_products([produto(2, nome="Caneca verde")])
+
+        self.assertEqual(carregados, 1)
+        self.assertEqual([item["sku"] for item in search_products("caneca")], [1, 2])
+
+
+@override_settings(CACHES=LOCMEM_CACHE, FEED_SNAPSHOT_SEGMENT_SIZE=100)
+class SnapshotTests(TestCase):
+    def test_endpoints_servem_o_gravado_sem_renderizar(self):
+        apply_products([produto(1), produto(2)])
+
+        response = self.client.get("/produtos/snapshot/0")
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response)
+
+        rebuild_dirty()
+        response = self.client.get("/produtos/snapshot/0")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["sku"] for item in response.json()], [1, 2])
+        etag = response["ETag"]
+
+        apply_products([produto(1, versao=2, nome="Novo")])
+        response = self.client.get("/produtos/snapshot/0", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertTrue(self.client.get("/produtos/snapshot").json()["segmentos"][0]["pendente"])
+
+        rebuild_dirty()
+        response = self.client.get("/produtos/snapshot/0", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["nome"], "Novo")
+
+    def test_lote_so_registra_mudancas_sem_tocar_os_segmentos(self):
+        apply_products([produto(1)])
+        rebuild_dirty()
+        antes = SnapshotSegmento.objects.get(segmento=0)
+
+        apply_products([produto(1, versao=2), produto(150)])
+        apply_products([produto(2)])
+
+        self.assertEqual(SnapshotSegmento.objects.get(segmento=0).mudancas, antes.mudancas)
+        self.assertFalse(SnapshotSegmento.objects.filter(segmento=1).exists())
+        self.assertEqual(fold_changes(), 3)
+        self.assertEqual(SnapshotSegmento.objects.get(segmento=0).mudancas, antes.mudancas + 2)
+        self.assertEqual(SnapshotSegmento.objects.get(segmento=1).mudancas, 1)
+        self.assertFalse(SnapshotMudanca.objects.exists())
+
+    def test_segmento_inexistente_devolve_404(self):
+        self.assertEqual(self.client.get("/produtos/snapshot/7").status_code, 404)
+
+
+@override_settings(FEED_RETRY_MAX_ATTEMPTS=2, FEED_RETRY_BASE_DELAY=0.01, FEED_RETRY_MAX_DELAY=0.02)
+class RetryTests(SimpleTestCase):
+    def test_classificacao_de_erros(self):
+        self.assertTrue(is_transient(OperationalError("database is locked")))
+        self.assertTrue(is_transient(ConnectionError()))
+        self.assertFalse(is_transient(ValueError("preco inválido")))
+
+    def test_atraso_respeita_o_teto(self):
+        self.assertTrue(all(0 <= retry_delay(attempt) <= 0.02 for attempt in range(10)))
+
+    @patch("feed.deadletter.send_to_dead_letter")
+    @patch("feed.mirror.apply_products", side_effect=OperationalError("database is locked"))
+    def test_transitorio_tenta_de_novo_e_depois_vai_para_a_dead_letter(self, apply, dead):
+        with self.assertLogs("feed.task", "ERROR"):
+            process_product_batch.apply(args=[[produto(1)]])
+
+        self.assertEqual(apply.call_count, 3)
+        dead.assert_called_once()
+
+    @patch("feed.deadletter.send_to_dead_letter")
+    @patch("feed.mirror.apply_products", side_effect=ValueError("preco inválido"))
+    def test_permanente_vai_direto_para_a_dead_letter(self, apply, dead):
+        with self.assertLogs("feed.task", "ERROR"):
+            process_product_batch.apply(args=[[produto(1)]])
+
+        self.assertEqual(apply.call_count, 1)
+        dead.assert_called_once()
@@ -1,3 +1,12 @@
-from .celery import celery_app
-
 __all__ = ("celery_app",)
+
+
+def __getattr__(name):
+    # Carregar o settings (core.settings) importa este pacote; o app do Celery
+    # só é montado quando alguém o usa, para não pesar em todo processo.
+    if name == "celery_app":
+        from .celery import celery_app
+
+        return celery_app
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
@@ -1,8 +1,32 @@
+from django.http import HttpResponse
 from ninja import NinjaAPI
 
+from produto.api import router as produto_router
+
 api = NinjaAPI(title="API de produtos", version="1.0.0", description="API de produtos")
 
+api.add_router("/produtos", produto_router)
+
 
 @api.get("/")
 def get_root(request):
     return {"message": "Hello, World!"}
+
+
+@api.get("/metrics", include_in_schema=False)
+def get_metrics(request):
+    from produto.metrics import collect, render_prometheus
+
+    return HttpResponse(
+        render_prometheus(collect()), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@api.get("/health", include_in_schema=False)
+def get_health(request, response: HttpResponse):
+    from produto.health import get_health as health_report
+
+    report = health_report()
+    if report["status"] == "fail":
+        response.status_code = 503
+    return report
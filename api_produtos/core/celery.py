@@ -1,5 +1,15 @@
+import os
+
 import celery
 
+from produto.kiwi.codec import register_codec
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+# O worker roda o django.setup() pelo fixup do Celery; os system checks
+# importariam a URLconf e o Ninja, que ele não usa. Rode-os no deploy.
+os.environ.setdefault("CELERY_SKIP_CHECKS", "1")
+register_codec()
+
 celery_app = celery.Celery("produtos")
 
 celery_app.config_from_object("django.conf:settings", namespace="CELERY")
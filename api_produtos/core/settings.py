@@ -1,5 +1,6 @@
 """Django settings for core project."""
 
+import os
 from pathlib import Path
 
 from django_tools.settings import DjangoSettings
@@ -14,7 +15,6 @@ base_settings = DjangoSettings(env_file=ENV_FILE)
 # === Security Settings ===
 SECRET_KEY = base_settings.secret_key
 DEBUG = base_settings.debug
-print(f"ALLOWED_HOSTS: {base_settings.allowed_hosts}\nAPI_NAME: {base_settings.api_name}")
 ALLOWED_HOSTS = base_settings.allowed_hosts
 
 # === Application Definition ===
@@ -36,6 +36,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.db_router.PrimaryPinningMiddleware",
 ]
 ROOT_URLCONF = "core.urls"
 WSGI_APPLICATION = "core.wsgi.application"
@@ -43,6 +44,20 @@ WSGI_APPLICATION = "core.wsgi.application"
 # === Database ===
 DATABASES = base_settings.databases
 
+# === Database Routing ===
+# Réplica de leitura: a configuração do default com outro NAME (banco ou arquivo
+# SQLite) e/ou HOST. Sem as variáveis tudo vai para o default. Só leituras
+# marcadas (core.db_router.read_replica/replica_reads) usam a réplica.
+_replica = {
+    key: os.environ[f"DATABASE_REPLICA_{key}"]
+    for key in ("NAME", "HOST", "PORT")
+    if os.environ.get(f"DATABASE_REPLICA_{key}")
+}
+if _replica:
+    DATABASES["replica"] = {**DATABASES["default"], **_replica}
+DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+DATABASE_PRIMARY_STICKY_SECONDS = 2.0  # leituras no primário depois de uma escrita
+
 # === Authentication & Password Validation ===
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -101,14 +116,78 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
         "LOCATION": base_settings.redis_url,
-        "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
-        },
         "KEY_PREFIX": "feed_cache",
         "TIMEOUT": 300,  # 5 minutos
     }
 }
 
+# === Outbox Configuration ===
+OUTBOX_BATCH_SIZE = 500  # eventos por mensagem publicada
+OUTBOX_RELAY_INTERVAL = 1.0  # segundos entre varreduras com o outbox vazio
+OUTBOX_RETENTION_HOURS = 24  # eventos publicados mantidos antes da limpeza
+# Relay de longa duração: guarda só o estado mais recente de cada SKU por
+# essa janela antes de publicar (0 desliga o agrupamento).
+OUTBOX_COALESCE_WINDOW_MS = 250
+OUTBOX_COALESCE_MAX_SKUS = 10_000  # limite de SKUs e eventos em memória por janela
+# Fila em memória entre a leitura do outbox e o broker (relay_outbox). Cheia,
+# aplica a política: "block", "drop_oldest" ou "spill" (deixa no outbox).
+OUTBOX_BUFFER_MAX_ITEMS = 10_000  # produtos
+OUTBOX_BUFFER_POLICY = "block"
+# Snapshot para réplicas novas do feed: a posição de catch-up recua até o
+# último evento anterior a essa janela, cobrindo transações ainda abertas.
+SNAPSHOT_CATCHUP_OVERLAP_SECONDS = 60
+SNAPSHOT_CHUNK_SIZE = 5000  # produtos por bloco comprimido
+
+CELERY_BEAT_SCHEDULE = {
+    "relay-product-outbox": {
+        "task": "relay_product_outbox",
+        "schedule": OUTBOX_RELAY_INTERVAL,
+    },
+}
+
+# === Product Partitions ===
+# Filas product_reply.N entre as quais os eventos são divididos por SKU. Tem
+# que ser igual em api_produtos e api_feed; veja o README antes de mudar.
+PRODUCT_PARTITIONS = int(os.environ.get("PRODUCT_PARTITIONS", "1"))
+
+# === Metrics ===
+# Cada processo (API, relay, workers) exporta suas métricas para este
+# diretório; o endpoint /metrics soma os snapshots dos processos vivos (gauges
+# saem por pid) e apaga os não regravados há 3 intervalos.
+METRICS_DIR = os.environ.get("METRICS_DIR", f"{BASE_DIR}/.metrics")
+METRICS_EXPORT_INTERVAL = 5.0  # segundos entre exportações de cada processo
+
+# === Health Check ===
+HEALTH_DEADLINE = 2.0  # prazo total (s) para sondar broker, Redis, banco e workers
+HEALTH_CACHE_TTL = 5.0  # segundos em que o último relatório é reaproveitado
+
+# === Benchmark Overrides ===
+# Com ECOSSISTEM_BENCH_DIR definido o serviço roda isolado numa máquina: SQLite,
+# broker em arquivos (kombu filesystem) e cache em memória. Usado por
+# benchmarks/pipeline.py.
+BENCH_DIR = os.environ.get("ECOSSISTEM_BENCH_DIR")
+if BENCH_DIR:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": f"{BENCH_DIR}/produtos.sqlite3",
+            "OPTIONS": {
+                "timeout": 30,
+                "transaction_mode": "IMMEDIATE",
+                "init_command": "PRAGMA journal_mode=WAL;",
+            },
+        }
+    }
+    CELERY_BROKER_URL = "filesystem://"
+    CELERY_BROKER_TRANSPORT_OPTIONS = {
+        "data_folder_in": f"{BENCH_DIR}/broker/data",
+        "data_folder_out": f"{BENCH_DIR}/broker/data",
+        "control_folder": f"{BENCH_DIR}/broker/control",
+    }
+    CELERY_RESULT_BACKEND = None
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    METRICS_DIR = f"{BENCH_DIR}/metrics"
+
 # === Internationalization ===
 LANGUAGE_CODE = base_settings.language_code
 TIME_ZONE = base_settings.time_zone
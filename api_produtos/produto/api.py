@@ -0,0 +1,244 @@
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router as db_router
+from django.http import StreamingHttpResponse
+from ninja import File, Router, Schema
+from ninja.errors import HttpError
+from ninja.files import UploadedFile
+
+from core.db_router import read_replica
+from produto.models import Produto
+
+router = Router(tags=["produtos"])
+
+PRODUTO_FIELDS = (
+    "sku",
+    "nome",
+    "descricao",
+    "preco",
+    "estoque",
+    "criado_em",
+    "atualizado_em",
+    "versao",
+)
+MAX_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+MAX_DIGEST_PARTS = 256
+MAX_RANGE_ROWS = 10_000
+MAX_BATCH_SKUS = 5000
+MAX_EVENT_PAGE = 500
+
+
+class AjusteEstoqueIn(Schema):
+    delta: int
+
+
+class BatchIn(Schema):
+    skus: list[int]
+
+
+def _parse_fields(fields: str | None) -> list[str]:
+    """Converte ``fields=sku,nome`` na projeção de colunas (o ``sku`` sempre vem)."""
+    if not fields:
+        return list(PRODUTO_FIELDS)
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - set(PRODUTO_FIELDS))
+    if unknown:
+        raise HttpError(400, f"Campos desconhecidos: {', '.join(unknown)}")
+    return ["sku", *(field for field in requested if field != "sku")]
+
+
+@router.get("/")
+@read_replica
+def list_produtos(request, cursor: int | None = None, limit: int = 100, fields: str | None = None):
+    """Lista produtos paginando por cursor no ``sku`` (keyset), sem OFFSET."""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HttpError(400, f"limit deve estar entre 1 e {MAX_PAGE_SIZE}")
+
+    queryset = Produto.objects.order_by("sku").values(*_parse_fields(fields))
+    if cursor is not None:
+        queryset = queryset.filter(sku__gt=cursor)
+
+    items = list(queryset[:limit])
+    next_cursor = items[-1]["sku"] if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/export")
+@read_replica
+def export_produtos(request, fields: str | None = None, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Exporta o catálogo inteiro em NDJSON, em streaming e com memória constante."""
+    if not 1 <= chunk_size <= 10 * EXPORT_CHUNK_SIZE:
+        raise HttpError(400, f"chunk_size deve estar entre 1 e {10 * EXPORT_CHUNK_SIZE}")
+
+    # O streaming roda depois que a view retorna: fixa agora o banco de leitura.
+    using = db_router.db_for_read(Produto)
+    queryset = Produto.objects.using(using).order_by("sku").values(*_parse_fields(fields))
+    response = StreamingHttpResponse(
+        _ndjson_lines(queryset, chunk_size), content_type="application/x-ndjson"
+    )
+    response["Content-Disposition"] = 'attachment; filename="produtos.ndjson"'
+    return response
+
+
+@router.get("/digests")
+@read_replica
+def digest_produtos(request, lo: int | None = None, hi: int | None = None, parts: int = 16):
+    """Digests por faixa de SKU usados pela reconciliação do feed.
+
+    Sem ``lo``/``hi`` cobre o catálogo inteiro e devolve também os limites.
+    """
+    from produto.reconcile import produto_digests, sku_bounds
+
+    if not 1 <= parts <= MAX_DIGEST_PARTS:
+        raise HttpError(400, f"parts deve estar entre 1 e {MAX_DIGEST_PARTS}")
+    if lo is None or hi is None:
+        bounds = sku_bounds()
+        if bounds is None:
+            return {"lo": None, "hi": None, "ranges": []}
+        lo, hi = bounds
+    if lo >= hi:
+        raise HttpError(400, "lo deve ser menor que hi")
+
+    return {"lo": lo, "hi": hi, "ranges": produto_digests(lo, hi, parts)}
+
+
+@router.get("/range")
+@read_replica
+def range_produtos(request, lo: int, hi: int):
+    """Linhas com ``lo <= sku < hi``, para reparar uma faixa divergente."""
+    queryset = (
+        Produto.objects.filter(sku__gte=lo, sku__lt=hi)
+        .order_by("sku")
+        .values("sku", "nome", "descricao", "preco", "estoque", "versao")
+    )
+    items = list(queryset[: MAX_RANGE_ROWS + 1])
+    if len(items) > MAX_RANGE_ROWS:
+        raise HttpError(400, f"Faixa com mais de {MAX_RANGE_ROWS} produtos; subdivida")
+    return {"items": items}
+
+
+@router.post("/batch")
+@read_replica
+def batch_produtos(request, payload: BatchIn, fields: str | None = None):
+    """Vários produtos por SKU com um único ``in_bulk``, na ordem pedida.
+
+    ``items`` tem uma posição por SKU pedido, ``null`` para os inexistentes,
+    que também são listados em ``missing``.
+    """
+    if len(payload.skus) > MAX_BATCH_SKUS:
+        raise HttpError(400, f"No máximo {MAX_BATCH_SKUS} SKUs por requisição")
+
+    selected = _parse_fields(fields)
+    skus = list(dict.fromkeys(payload.skus))
+    produtos = Produto.objects.only(*selected).in_bulk(skus, field_name="sku")
+    found = {
+        sku: {field: getattr(produto, field) for field in selected}
+        for sku, produto in produtos.items()
+    }
+    return {
+        "items": [found.get(sku) for sku in payload.skus],
+        "missing": [sku for sku in skus if sku not in found],
+    }
+
+
+@router.get("/snapshot")
+@read_replica
+def snapshot_produtos(request, chunk_size: int | None = None):
+    """Catálogo inteiro em NDJSON comprimido com gzip, para subir uma réplica nova do feed.
+
+    A primeira linha é ``{"snapshot": {"posicao": ...}}`` (também no cabeçalho
+    ``X-Snapshot-Posicao``): depois de carregar os produtos, o feed reaplica os
+    eventos de ``/produtos/eventos`` posteriores a essa posição.
+    """
+    from django.conf import settings
+
+    from produto.bootstrap import iter_snapshot, snapshot_position
+
+    chunk_size = chunk_size or settings.SNAPSHOT_CHUNK_SIZE
+    if not 1 <= chunk_size <= 10 * settings.SNAPSHOT_CHUNK_SIZE:
+        raise HttpError(400, f"chunk_size deve estar entre 1 e {10 * settings.SNAPSHOT_CHUNK_SIZE}")
+
+    # Posição e catálogo lidos no mesmo banco, fixado antes do streaming.
+    using = db_router.db_for_read(Produto)
+    posicao = snapshot_position(using)
+    response = StreamingHttpResponse(
+        iter_snapshot(posicao, using, chunk_size), content_type="application/gzip"
+    )
+    response["Content-Disposition"] = 'attachment; filename="produtos-snapshot.ndjson.gz"'
+    response["X-Snapshot-Posicao"] = str(posicao)
+    return response
+
+
+@router.get("/eventos")
+def eventos_produtos(request, depois_de: int, limit: int = 100):
+    """Eventos do outbox posteriores a ``depois_de``, para o catch-up de um feed novo.
+
+    Fica no primário: na réplica o catch-up poderia terminar antes do fim do
+    outbox. Responde 410 se a limpeza já removeu eventos depois da posição.
+    """
+    from produto.bootstrap import PosicaoExpiradaError, events_after
+
+    if not 1 <= limit <= MAX_EVENT_PAGE:
+        raise HttpError(400, f"limit deve estar entre 1 e {MAX_EVENT_PAGE}")
+    try:
+        eventos = events_after(depois_de, limit)
+    except PosicaoExpiradaError as e:
+        raise HttpError(410, f"{e}; baixe um snapshot novo") from e
+    return {
+        "eventos": eventos,
+        "proxima_posicao": eventos[-1]["id"] if eventos else depois_de,
+    }
+
+
+@router.post("/import")
+def import_produtos(request, file: UploadedFile = File(...), chunk_size: int | None = None):
+    """Importa um catálogo CSV/JSONL enviado, em blocos com ``bulk_create``."""
+    from produto.importer import (
+        DEFAULT_CHUNK_SIZE,
+        detect_format,
+        import_products,
+        iter_records,
+    )
+
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    if not 1 <= chunk_size <= 10 * DEFAULT_CHUNK_SIZE:
+        raise HttpError(400, f"chunk_size deve estar entre 1 e {10 * DEFAULT_CHUNK_SIZE}")
+    try:
+        file_format = detect_format(file.name)
+    except ValueError as e:
+        raise HttpError(400, str(e)) from e
+
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return import_products(iter_records(stream, file_format), chunk_size)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HttpError(400, f"Arquivo inválido: {e}") from e
+
+
+@router.post("/{sku}/estoque")
+def adjust_produto_stock(request, sku: int, payload: AjusteEstoqueIn):
+    """Soma ``delta`` ao estoque com um UPDATE atômico e publica um evento só de estoque."""
+    from produto.stock import EstoqueInsuficienteError, adjust_stock
+
+    try:
+        event = adjust_stock(sku, payload.delta)
+    except EstoqueInsuficienteError as e:
+        raise HttpError(409, str(e)) from e
+    if event is None:
+        raise HttpError(404, f"Produto {sku} não encontrado")
+    return {key: value for key, value in event.items() if key != "tipo"}
+
+
+def _ndjson_lines(queryset, chunk_size: int):
+    encoder = DjangoJSONEncoder()
+    lines = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        lines.append(encoder.encode(row))
+        if len(lines) >= chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,100 @@
+"""Snapshot do catálogo para subir uma réplica nova do feed.
+
+Um feed novo baixa o catálogo inteiro de ``/produtos/snapshot`` (NDJSON em
+gzip, em blocos) e depois busca em ``/produtos/eventos`` só os eventos do
+outbox posteriores à ``posicao`` informada na primeira linha do snapshot.
+
+A leitura do catálogo não é um instantâneo único: ela pagina por ``sku`` e
+pode ver escritas que aconteceram durante o download. Por isso a posição é
+calculada antes da leitura e recuada até o último evento gravado antes de
+``SNAPSHOT_CATCHUP_OVERLAP_SECONDS``: o evento de uma transação ainda aberta
+pode ter id menor que o de eventos já visíveis, e o recuo o deixa depois da
+posição. Reaplicar um evento que o snapshot já contém é inofensivo, o feed
+aplica last-writer-wins por ``versao``.
+
+Se a limpeza do outbox já removeu algum evento depois da posição (a marca
+d'água ``OutboxLimpeza``), o catch-up não é possível e o feed precisa de um
+snapshot novo.
+"""
+
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from produto.kiwi.outbox import pruned_until
+from produto.models import Produto, ProdutoEvento
+
+SNAPSHOT_FIELDS = ("sku", "nome", "descricao", "preco", "estoque", "versao")
+
+
+class PosicaoExpiradaError(Exception):
+    """Eventos posteriores à posição pedida já foram removidos do outbox."""
+
+
+def snapshot_position(using: str | None = None) -> int:
+    """Posição do outbox a partir da qual o catch-up precisa reaplicar eventos."""
+    eventos = ProdutoEvento.objects.using(using)
+    limite = timezone.now() - timedelta(seconds=settings.SNAPSHOT_CATCHUP_OVERLAP_SECONDS)
+    # Ids crescem com ``criado_em``: varre de trás para frente só a janela de sobreposição.
+    anterior = (
+        eventos.filter(criado_em__lt=limite).order_by("-id").values_list("id", flat=True).first()
+    )
+    if anterior is None:
+        # Nenhum evento antes da janela (outbox vazio ou já limpo): reaplica tudo que restou.
+        primeiro = eventos.order_by("id").values_list("id", flat=True).first()
+        anterior = primeiro - 1 if primeiro is not None else 0
+    # Eventos já removidos foram publicados há mais que a retenção: o snapshot,
+    # lido depois daqui, já os contém. A posição nunca fica atrás da marca d'água.
+    return max(anterior, pruned_until(using))
+
+
+def iter_snapshot(posicao: int, using: str | None = None, chunk_size: int | None = None):
+    """Gera o snapshot em gzip: a linha de cabeçalho e um produto por linha.
+
+    Cada bloco de ``chunk_size`` produtos sai comprimido e com ``Z_SYNC_FLUSH``,
+    para o cliente descomprimir e gravar enquanto o download continua.
+    """
+    chunk_size = chunk_size or settings.SNAPSHOT_CHUNK_SIZE
+    encoder = DjangoJSONEncoder()
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: cabeçalho gzip
+    queryset = Produto.objects.using(using)
+    header = {"posicao": posicao, "produtos": queryset.count(), "gerado_em": timezone.now()}
+    yield compressor.compress(encoder.encode({"snapshot": header}).encode() + b"\n")
+
+    cursor = None
+    while True:
+        page = queryset.order_by("sku").values(*SNAPSHOT_FIELDS)
+        if cursor is not None:
+            page = page.filter(sku__gt=cursor)
+        rows = list(page[:chunk_size])
+        if not rows:
+            break
+        lines = "\n".join(encoder.encode(row) for row in rows) + "\n"
+        yield compressor.compress(lines.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        cursor = rows[-1]["sku"]
+    yield compressor.flush()
+
+
+def events_after(posicao: int, limit: int, using: str | None = None) -> list[dict]:
+    """Eventos do outbox com ``id > posicao``, em ordem, publicados ou não.
+
+    Raises:
+        PosicaoExpiradaError: a limpeza do outbox já removeu eventos
+            posteriores a ``posicao``; o feed precisa de um snapshot novo.
+    """
+    rows = list(
+        ProdutoEvento.objects.using(using)
+        .filter(id__gt=posicao)
+        .order_by("id")
+        .values_list("id", "payload")[:limit]
+    )
+    # A marca é lida depois dos eventos: uma limpeza que termine entre as duas
+    # leituras já aparece nela, e a página incompleta não é devolvida.
+    if pruned_until(using) > posicao:
+        msg = f"Eventos depois da posição {posicao} já foram removidos do outbox"
+        raise PosicaoExpiradaError(msg)
+    return [{"id": evento_id, "produtos": payload} for evento_id, payload in rows]
+
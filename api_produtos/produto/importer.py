@@ -0,0 +1,109 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+
+from produto.kiwi.outbox import enqueue_products
+from produto.models import Produto
+
+DEFAULT_CHUNK_SIZE = 5000
+IMPORT_FORMATS = ("csv", "jsonl")
+UPDATE_FIELDS = ["nome", "descricao", "preco", "estoque", "atualizado_em", "versao"]
+
+
+def detect_format(filename: str) -> str:
+    """Deduz o formato pela extensão do arquivo (``.csv`` ou ``.jsonl``/``.ndjson``)."""
+    lowered = filename.lower()
+    if lowered.endswith(".csv"):
+        return "csv"
+    if lowered.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    msg = f"Formato não reconhecido para {filename}; use .csv ou .jsonl"
+    raise ValueError(msg)
+
+
+def iter_records(stream, file_format: str):
+    """Lê registros de um stream de texto sem carregar o arquivo inteiro.
+
+    Uma linha JSONL malformada sai como ``None``, um registro inválido.
+    """
+    if file_format == "csv":
+        yield from csv.DictReader(stream)
+    elif file_format == "jsonl":
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Como uma linha CSV incompleta: vira um registro inválido,
+                # descartado e contado em import_products, sem abortar a importação.
+                yield None
+    else:
+        msg = f"Formato de importação desconhecido: {file_format}"
+        raise ValueError(msg)
+
+
+def import_products(records, chunk_size: int = DEFAULT_CHUNK_SIZE, on_chunk=None) -> dict:
+    """Importa registros em blocos de ``chunk_size`` com ``bulk_create``.
+
+    Cada bloco é gravado em uma transação junto com um único evento no outbox
+    com todos os seus produtos, já que ``bulk_create`` não dispara o
+    ``post_save``. SKUs existentes são atualizados e têm a versão incrementada.
+    Registros inválidos são descartados e contados.
+    """
+    result = {"importados": 0, "invalidos": 0, "lotes": 0}
+    records = iter(records)
+    while chunk := list(islice(records, chunk_size)):
+        produtos = {}
+        for record in chunk:
+            try:
+                produto = _to_produto(record)
+            except (KeyError, TypeError, ValueError, InvalidOperation):
+                result["invalidos"] += 1
+                continue
+            produtos[produto.sku] = produto
+
+        if produtos:
+            import_chunk(list(produtos.values()))
+            result["importados"] += len(produtos)
+            result["lotes"] += 1
+            if on_chunk is not None:
+                on_chunk(result)
+    return result
+
+
+def import_chunk(produtos: list[Produto]):
+    """Grava um bloco de produtos e o evento do bloco na mesma transação."""
+    with transaction.atomic():
+        # Trava as linhas existentes até o commit: um save() ou adjust_stock
+        # concorrente espera e incrementa a partir da versão gravada aqui. Em
+        # ordem de SKU, para dois blocos concorrentes travarem na mesma ordem.
+        versoes = dict(
+            Produto.objects.select_for_update()
+            .filter(sku__in=[produto.sku for produto in produtos])
+            .order_by("sku")
+            .values_list("sku", "versao")
+        )
+        for produto in produtos:
+            produto.versao = versoes.get(produto.sku, 0) + 1
+
+        Produto.objects.bulk_create(
+            produtos,
+            update_conflicts=True,
+            unique_fields=["sku"],
+            update_fields=UPDATE_FIELDS,
+        )
+        enqueue_products([produto.to_dict() for produto in produtos])
+
+
+def _to_produto(record: dict) -> Produto:
+    return Produto(
+        sku=int(record["sku"]),
+        nome=str(record["nome"])[:255],
+        descricao=str(record.get("descricao") or ""),
+        preco=Decimal(str(record["preco"])).quantize(Decimal("0.01")),
+        estoque=int(record["estoque"]),
+    )
@@ -0,0 +1,185 @@
+"""Publicação em segundo plano com fila limitada e política de contrapressão.
+
+O relay lê o outbox e entrega os lotes a um ``BufferedPublisher``; um thread
+publica no broker, tentando de novo com backoff exponencial enquanto o broker
+estiver fora, e só então marca os eventos como publicados. Assim a leitura do
+outbox não fica parada esperando o broker, e nenhuma transação do banco fica
+aberta durante um ``send_task`` lento.
+
+O próprio outbox é o buffer durável: o que não cabe na fila em memória
+continua pendente no banco e é publicado depois, na ordem dos ``id``. Com a
+fila cheia, ``policy`` decide o que o relay faz:
+
+- ``"block"``: espera abrir espaço (até ``block_timeout``);
+- ``"drop_oldest"``: tira da memória o lote mais antigo ainda não enviado (os
+  eventos dele voltam a ficar pendentes no outbox e são relidos quando a fila
+  esvaziar, fora de ordem, o que o last-writer-wins por ``versao`` do feed
+  tolera);
+- ``"spill"``: não aceita o lote, que fica no outbox até a fila esvaziar.
+
+Descartar ou recusar um lote liga ``backpressure``: o relay espera o
+intervalo antes de ler mais, em vez de girar sobre o outbox enquanto o broker
+estiver fora. Os saves dos produtos nunca esperam pelo broker: só gravam no
+outbox.
+"""
+
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connections
+
+from produto.metrics import (
+    PUBLISH_BUFFER_DEPTH,
+    PUBLISH_DROPPED,
+    PUBLISH_SPILLED,
+    REGISTRY,
+    RELAY_BATCH_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+SPILL = "spill"
+POLICIES = (BLOCK, DROP_OLDEST, SPILL)
+
+RETRY_INITIAL_DELAY = 0.5  # segundos
+RETRY_MAX_DELAY = 30.0
+
+
+class BufferedPublisher:
+    """Fila limitada (em produtos) de lotes do outbox com um thread publicador.
+
+    ``cursor`` é o maior ``id`` do outbox já entregue à fila: o relay lê só
+    eventos acima dele para não publicar duas vezes o que ainda está em voo.
+    Quando a fila esvazia ele volta a zero, e eventos confirmados fora de ordem
+    (``id`` menor, commit depois) ou descartados também são lidos.
+    ``backpressure`` fica ligado do primeiro lote descartado ou recusado até o
+    próximo envio ao broker.
+    """
+
+    def __init__(
+        self,
+        max_items: int | None = None,
+        policy: str | None = None,
+        block_timeout: float | None = None,
+    ):
+        self.max_items = max_items or settings.OUTBOX_BUFFER_MAX_ITEMS
+        self.policy = policy or settings.OUTBOX_BUFFER_POLICY
+        if self.policy not in POLICIES:
+            msg = f"Política de buffer inválida: {self.policy!r} (use {', '.join(POLICIES)})"
+            raise ValueError(msg)
+        self.block_timeout = block_timeout
+        self.cursor = 0
+        self.backpressure = False
+        self._queue = deque()
+        self._depth = 0
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    @property
+    def depth(self) -> int:
+        """Produtos na fila ou sendo publicados."""
+        return self._depth
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="outbox-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        """Espera a fila esvaziar (até ``timeout``) e encerra o thread.
+
+        O que não foi publicado continua pendente no outbox.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: not self._depth, timeout)
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def submit(self, chunks: list[list[dict]], evento_ids: list[int]) -> bool:
+        """Enfileira mensagens que cobrem ``evento_ids``; são marcadas juntas no fim.
+
+        Returns:
+            ``False`` se o lote não foi aceito e continua pendente no outbox.
+        """
+        size = sum(len(chunk) for chunk in chunks)
+        with self._condition:
+            # Um lote maior que a fila inteira entra sozinho, com a fila vazia.
+            while self._queue_full(size):
+                if self.policy == DROP_OLDEST and self._queue:
+                    self._drop_oldest()
+                elif self.policy == BLOCK and self._condition.wait(self.block_timeout):
+                    continue
+                else:
+                    self.backpressure = True
+                    PUBLISH_SPILLED.inc(size)
+                    return False
+
+            self._queue.append((chunks, evento_ids, size))
+            self._depth += size
+            self.cursor = max(self.cursor, evento_ids[-1])
+            PUBLISH_BUFFER_DEPTH.set(self._depth)
+            self._condition.notify_all()
+        return True
+
+    def _queue_full(self, size: int) -> bool:
+        return self._depth > 0 and self._depth + size > self.max_items
+
+    def _drop_oldest(self):
+        _, _, size = self._queue.popleft()
+        self._depth -= size
+        # O cursor não recua: os lotes mais novos continuam na fila, e os eventos
+        # descartados são relidos do outbox quando ela esvaziar (cursor em zero).
+        self.backpressure = True
+        PUBLISH_DROPPED.inc(size)
+        PUBLISH_BUFFER_DEPTH.set(self._depth)
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._queue or self._stopping)
+                    if self._stopping:
+                        return
+                    chunks, evento_ids, size = self._queue.popleft()
+
+                self._send(chunks, evento_ids)
+
+                with self._condition:
+                    self._depth -= size
+                    self.backpressure = False
+                    if not self._depth:
+                        self.cursor = 0
+                    PUBLISH_BUFFER_DEPTH.set(self._depth)
+                    self._condition.notify_all()
+        finally:
+            # O que sobrou na fila volta a ser só pendência no outbox: a fila deste
+            # processo deixa de existir e o /metrics não deve mostrar a última profundidade.
+            PUBLISH_BUFFER_DEPTH.set(0)
+            REGISTRY.maybe_export(force=True)
+            connections.close_all()
+
+    def _send(self, chunks: list[list[dict]], evento_ids: list[int]) -> bool:
+        from produto.kiwi.outbox import mark_published
+        from produto.kiwi.publisher import send_products
+
+        delay, sent = RETRY_INITIAL_DELAY, 0
+        while True:
+            try:
+                for chunk in chunks[sent:]:
+                    send_products(chunk)
+                    RELAY_BATCH_SIZE.observe(len(chunk))
+                    sent += 1
+                mark_published(evento_ids)
+                return True
+            except Exception:
+                logger.exception("Falha ao publicar lote do outbox; nova tentativa em %.1fs", delay)
+                with self._condition:
+                    if self._condition.wait_for(lambda: self._stopping, delay):
+                        return False
+                delay = min(delay * 2, RETRY_MAX_DELAY)
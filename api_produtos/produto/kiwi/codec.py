@@ -0,0 +1,184 @@
+"""Codec binário e versionado para eventos de produto.
+
+O corpo da mensagem do Celery é serializado com msgpack, e todo dicionário que
+corresponde a um schema de produto conhecido vira uma tupla posicional com
+tipos compactos (preço em centavos, datas em microssegundos, ``evento_id``
+em 16 bytes). Assim os nomes dos campos não se repetem em cada produto.
+Corpos acima de ``COMPRESS_THRESHOLD`` bytes são comprimidos com zlib.
+
+Formato no fio: ``[versão do formato][flags][dados msgpack]``.
+"""
+
+import zlib
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import msgpack
+from kombu.serialization import register
+
+SERIALIZER_NAME = "produto-msgpack"
+CONTENT_TYPE = "application/x-produto-msgpack"
+
+FORMAT_VERSION = 1
+COMPRESS_THRESHOLD = 1024  # bytes
+COMPRESS_LEVEL = 1
+
+_FLAG_ZLIB = 0x01
+
+_EXT_DECIMAL = 1
+_EXT_DATETIME = 2
+_EXT_PRODUCT = 3
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+# Layouts por versão de schema. Versões antigas continuam decodificáveis;
+# a codificação usa a versão mais nova cujo conjunto de campos coincide.
+PRODUCT_SCHEMAS: dict[int, tuple[tuple[str, str], ...]] = {
+    1: (
+        ("sku", "int"),
+        ("nome", "str"),
+        ("descricao", "str"),
+        ("preco", "cents"),
+        ("estoque", "int"),
+        ("criado_em", "datetime"),
+        ("atualizado_em", "datetime"),
+        ("versao", "int"),
+    ),
+    2: (
+        ("sku", "int"),
+        ("nome", "str"),
+        ("descricao", "str"),
+        ("preco", "cents"),
+        ("estoque", "int"),
+        ("criado_em", "datetime"),
+        ("atualizado_em", "datetime"),
+        ("versao", "int"),
+        ("evento_id", "uuid"),
+    ),
+    # Evento compacto de ajuste de estoque (produto.stock).
+    3: (
+        ("sku", "int"),
+        ("estoque", "int"),
+        ("versao", "int"),
+        ("atualizado_em", "datetime"),
+        ("evento_id", "uuid"),
+        ("tipo", "str"),
+    ),
+}
+_SCHEMA_BY_FIELDS = {
+    frozenset(name for name, _ in layout): (schema_id, layout)
+    for schema_id, layout in sorted(PRODUCT_SCHEMAS.items())
+}
+
+
+def encode(body) -> bytes:
+    data = msgpack.packb(_compact(body), default=_default, use_bin_type=True)
+    flags = 0
+    if len(data) > COMPRESS_THRESHOLD:
+        data = zlib.compress(data, COMPRESS_LEVEL)
+        flags |= _FLAG_ZLIB
+    return bytes((FORMAT_VERSION, flags)) + data
+
+
+def decode(payload: bytes):
+    if isinstance(payload, str):
+        payload = payload.encode("latin-1")
+    version, flags, data = payload[0], payload[1], payload[2:]
+    if version != FORMAT_VERSION:
+        msg = f"Versão de formato de evento não suportada: {version}"
+        raise ValueError(msg)
+    if flags & _FLAG_ZLIB:
+        data = zlib.decompress(data)
+    return msgpack.unpackb(data, ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+
+def register_codec():
+    """Registra o codec no kombu com o nome ``SERIALIZER_NAME``."""
+    register(
+        SERIALIZER_NAME,
+        encode,
+        decode,
+        content_type=CONTENT_TYPE,
+        content_encoding="binary",
+    )
+
+
+def _compact(obj):
+    if isinstance(obj, dict):
+        schema = _SCHEMA_BY_FIELDS.get(frozenset(obj))
+        if schema is not None:
+            packed = _pack_product(obj, *schema)
+            if packed is not None:
+                return packed
+        return {key: _compact(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_compact(value) for value in obj]
+    return obj
+
+
+def _pack_product(product: dict, schema_id: int, layout) -> msgpack.ExtType | None:
+    try:
+        values = [schema_id]
+        values.extend(
+            None if product[name] is None else _TO_WIRE[kind](product[name])
+            for name, kind in layout
+        )
+    except (TypeError, ValueError, ArithmeticError):
+        # Valor fora do layout esperado: segue pelo caminho genérico.
+        return None
+    return msgpack.ExtType(_EXT_PRODUCT, msgpack.packb(values, use_bin_type=True))
+
+
+def _cents_to_wire(value) -> int:
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return int(value.scaleb(2).to_integral_exact())
+
+
+def _datetime_to_wire(value) -> int:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    delta = value - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+_TO_WIRE = {
+    "int": int,
+    "str": str,
+    "cents": _cents_to_wire,
+    "datetime": _datetime_to_wire,
+    "uuid": bytes.fromhex,
+}
+_FROM_WIRE = {
+    "int": int,
+    "str": str,
+    "cents": lambda value: Decimal(value).scaleb(-2),
+    "datetime": lambda value: _EPOCH + timedelta(microseconds=value),
+    "uuid": bytes.hex,
+}
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(obj).encode())
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode())
+    msg = f"Tipo não serializável no codec de produtos: {type(obj)!r}"
+    raise TypeError(msg)
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == _EXT_PRODUCT:
+        schema_id, *values = msgpack.unpackb(data, raw=False)
+        layout = PRODUCT_SCHEMAS[schema_id]
+        return {
+            name: None if value is None else _FROM_WIRE[kind](value)
+            for (name, kind), value in zip(layout, values, strict=True)
+        }
+    if code == _EXT_DECIMAL:
+        return Decimal(data.decode())
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
@@ -0,0 +1,253 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from produto.metrics import COALESCED_EVENTS, COALESCED_PER_FLUSH, RELAY_BATCH_SIZE
+from produto.models import OutboxLimpeza, ProdutoEvento
+
+
+def enqueue_products(payloads: list[dict], using: str | None = None) -> ProdutoEvento:
+    """Registra produtos no outbox, na transação corrente do chamador.
+
+    Cada produto recebe um ``evento_id`` único, que acompanha o evento até o
+    feed e permite descartar reentregas do broker sem tocar o banco.
+    """
+    payloads = [{**payload, "evento_id": uuid.uuid4().hex} for payload in payloads]
+    return ProdutoEvento.objects.using(using).create(payload=payloads)
+
+
+def relay_outbox(batch_size: int | None = None, publisher=None) -> int:
+    """Publica um lote de eventos pendentes do outbox.
+
+    Os eventos são travados com ``SKIP LOCKED`` para que vários relays possam
+    rodar em paralelo, e o lote sai em uma única mensagem com até
+    ``batch_size`` produtos (um evento de importação em bloco sai sempre
+    inteiro). Se a publicação falhar, a transação é desfeita e os eventos
+    continuam pendentes.
+
+    Com um ``BufferedPublisher`` o lote só é entregue à fila dele, sem travar
+    linhas nem esperar o broker; os eventos são marcados depois do envio.
+
+    Returns:
+        Quantidade de produtos publicados (ou enfileirados no ``publisher``).
+    """
+    from produto.kiwi.publisher import send_products
+
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    if publisher is not None:
+        return _submit_pending(batch_size, publisher)
+
+    with transaction.atomic():
+        eventos = list(
+            ProdutoEvento.objects.select_for_update(skip_locked=True)
+            .filter(publicado_em__isnull=True)
+            .order_by("id")[:batch_size]
+        )
+        if not eventos:
+            return 0
+
+        payloads, publicados = [], []
+        for evento in eventos:
+            if publicados and len(payloads) + len(evento.payload) > batch_size:
+                break
+            payloads.extend(evento.payload)
+            publicados.append(evento.id)
+        send_products(payloads)
+        RELAY_BATCH_SIZE.observe(len(payloads))
+
+        ProdutoEvento.objects.filter(id__in=publicados).update(
+            publicado_em=timezone.now()
+        )
+
+    return len(payloads)
+
+
+def _submit_pending(batch_size: int, publisher) -> int:
+    eventos = list(
+        ProdutoEvento.objects.filter(publicado_em__isnull=True, id__gt=publisher.cursor)
+        .order_by("id")[:batch_size]
+    )
+    payloads, lidos = [], []
+    for evento in eventos:
+        if lidos and len(payloads) + len(evento.payload) > batch_size:
+            break
+        payloads.extend(evento.payload)
+        lidos.append(evento.id)
+    if not lidos or not publisher.submit([payloads], lidos):
+        return 0
+    return len(payloads)
+
+
+def mark_published(evento_ids: list[int]):
+    """Marca eventos do outbox como publicados, em blocos de 500 ``id``."""
+    now = timezone.now()
+    for start in range(0, len(evento_ids), 500):
+        ProdutoEvento.objects.filter(
+            id__in=evento_ids[start : start + 500], publicado_em__isnull=True
+        ).update(publicado_em=now)
+
+
+class CoalescingRelay:
+    """Relay que publica só o estado mais recente de cada SKU dentro de uma janela.
+
+    SKUs quentes (promoções, contadores de estoque) chegam a ser gravados várias
+    vezes por segundo, e cada gravação vira um evento no outbox. Este relay lê
+    os eventos pendentes sem publicá-los, guarda por SKU só o de maior
+    ``versao`` e, quando a janela de ``window_ms`` vence, publica os
+    sobreviventes em lotes de até ``batch_size`` produtos e marca todos os
+    eventos lidos como publicados.
+
+    A memória fica limitada a ``max_skus`` SKUs e eventos: ao atingir esse
+    limite a janela é publicada antes do prazo. Como os eventos só são marcados
+    no ``flush``, um relay que morre sem publicar não perde nada; os eventos
+    continuam pendentes e a próxima execução os publica. Deve rodar um único
+    relay com agrupamento por vez; vários relays em paralelo devem usar
+    ``relay_outbox``. Com ``publisher`` (``BufferedPublisher``) a janela é
+    entregue à fila dele em vez de publicada na hora.
+    """
+
+    def __init__(
+        self,
+        window_ms: float | None = None,
+        max_skus: int | None = None,
+        batch_size: int | None = None,
+        publisher=None,
+    ):
+        if window_ms is None:
+            window_ms = settings.OUTBOX_COALESCE_WINDOW_MS
+        self.window = window_ms / 1000
+        self.max_skus = max_skus or settings.OUTBOX_COALESCE_MAX_SKUS
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.publisher = publisher
+        self._latest = {}
+        self._held = []
+        self._received = 0
+        self._cursor = 0
+        self._deadline = None
+
+    def poll(self) -> int:
+        """Lê eventos pendentes ainda não vistos nesta janela.
+
+        Returns:
+            Quantidade de eventos lidos do outbox.
+        """
+        limit = min(self.batch_size, self.max_skus - len(self._held))
+        if limit <= 0:
+            return 0
+        # Não relê o que já está na fila do publisher aguardando o broker.
+        if self.publisher is not None:
+            self._cursor = max(self._cursor, self.publisher.cursor)
+        eventos = list(
+            ProdutoEvento.objects.filter(publicado_em__isnull=True, id__gt=self._cursor)
+            .order_by("id")[:limit]
+        )
+        for evento in eventos:
+            for payload in evento.payload:
+                self._merge(payload)
+            self._received += len(evento.payload)
+            self._held.append(evento.id)
+            self._cursor = evento.id
+        if eventos and self._deadline is None:
+            self._deadline = time.monotonic() + self.window
+        return len(eventos)
+
+    def _merge(self, payload: dict):
+        from produto.stock import is_stock_event
+
+        current = self._latest.get(payload["sku"])
+        if current is not None and payload.get("versao", 0) < current.get("versao", 0):
+            return
+        if current is not None and is_stock_event(payload) and not is_stock_event(current):
+            # Ajuste de estoque sobre um evento completo: publica o completo com o
+            # estoque novo, senão a mudança de nome/preço da janela se perderia.
+            payload = {**current, **{k: v for k, v in payload.items() if k != "tipo"}}
+        self._latest[payload["sku"]] = payload
+
+    def due(self) -> bool:
+        if not self._held:
+            return False
+        return (
+            time.monotonic() >= self._deadline
+            or len(self._latest) >= self.max_skus
+            or len(self._held) >= self.max_skus
+        )
+
+    def time_left(self) -> float | None:
+        """Segundos até a janela aberta vencer (``None`` sem janela aberta)."""
+        if self._deadline is None:
+            return None
+        return max(self._deadline - time.monotonic(), 0)
+
+    def flush(self) -> tuple[int, int]:
+        """Publica os sobreviventes da janela e marca os eventos lidos.
+
+        Returns:
+            Produtos publicados e eventos colapsados (lidos menos publicados).
+        """
+        from produto.kiwi.publisher import send_products
+
+        if not self._held:
+            return 0, 0
+
+        payloads = list(self._latest.values())
+        chunks = [
+            payloads[start : start + self.batch_size]
+            for start in range(0, len(payloads), self.batch_size)
+        ]
+        if self.publisher is not None:
+            if not self.publisher.submit(chunks, self._held):
+                # Fila cheia: a janela continua aberta e os eventos, pendentes.
+                return 0, 0
+        else:
+            with transaction.atomic():
+                for chunk in chunks:
+                    send_products(chunk)
+                    RELAY_BATCH_SIZE.observe(len(chunk))
+                mark_published(self._held)
+
+        collapsed = self._received - len(payloads)
+        COALESCED_EVENTS.inc(collapsed)
+        COALESCED_PER_FLUSH.observe(collapsed)
+
+        # Volta ao início: eventos com id menor confirmados depois da leitura
+        # continuam pendentes e entram na próxima janela.
+        self._latest, self._held, self._received = {}, [], 0
+        self._cursor, self._deadline = 0, None
+        return len(payloads), collapsed
+
+
+def prune_outbox(retention_hours: int | None = None) -> int:
+    """Remove eventos já publicados mais antigos que a retenção configurada.
+
+    Avança, na mesma transação, a marca d'água ``OutboxLimpeza`` até o maior
+    ``id`` removido; o catch-up de ``/produtos/eventos`` se baseia nela.
+    """
+    retention_hours = retention_hours or settings.OUTBOX_RETENTION_HOURS
+    limite = timezone.now() - timedelta(hours=retention_hours)
+    with transaction.atomic():
+        antigos = ProdutoEvento.objects.filter(publicado_em__lt=limite)
+        maior_id = antigos.aggregate(maior=Max("id"))["maior"]
+        if maior_id is None:
+            return 0
+        deleted, _ = antigos.filter(id__lte=maior_id).delete()
+        OutboxLimpeza.objects.get_or_create(id=1)
+        OutboxLimpeza.objects.filter(id=1, removidos_ate__lt=maior_id).update(
+            removidos_ate=maior_id, atualizado_em=timezone.now()
+        )
+    return deleted
+
+
+def pruned_until(using: str | None = None) -> int:
+    """Maior ``id`` do outbox já removido por ``prune_outbox`` (0 se nenhum)."""
+    return (
+        OutboxLimpeza.objects.using(using)
+        .filter(id=1)
+        .values_list("removidos_ate", flat=True)
+        .first()
+        or 0
+    )
@@ -1,13 +1,51 @@
-from core.celery import celery_app
+import time
 
+from core.celery import celery_app
+from produto.kiwi.codec import SERIALIZER_NAME
+from produto.kiwi.partitions import (
+    EXCHANGE_NAME,
+    partition_count,
+    partition_for,
+    queue_name,
+)
+from produto.metrics import PUBLISH_FAILURES, PUBLISH_LATENCY_MS, PUBLISHED_EVENTS
 from produto.models import Produto
 
 
 def send_product(product: Produto):
-    celery_app.send_task(
-        "process_product_data",
-        args=[product.to_dict()],
-        exchange="product_events",
-        queue="product_reply",
-    )
+    _publish("process_product_data", product.to_dict(), partition_for(product.sku), events=1)
     print(f"\n\nProduto enviado para a fila: {product}")
+
+
+def send_products(payloads: list[dict]):
+    """Publica um lote de produtos como uma única mensagem por partição.
+
+    A ordem dos produtos de cada SKU é mantida dentro da mensagem da sua partição.
+    """
+    partitions = partition_count()
+    if partitions == 1:
+        _publish("process_product_batch", payloads, 0, events=len(payloads))
+    else:
+        grouped = {}
+        for payload in payloads:
+            grouped.setdefault(partition_for(payload["sku"], partitions), []).append(payload)
+        for partition, group in grouped.items():
+            _publish("process_product_batch", group, partition, events=len(group))
+    print(f"\n\nLote de {len(payloads)} produtos enviado para a fila")
+
+
+def _publish(task_name: str, payload, partition: int, events: int):
+    start = time.perf_counter()
+    try:
+        celery_app.send_task(
+            task_name,
+            args=[payload],
+            exchange=EXCHANGE_NAME,
+            queue=queue_name(partition),
+            serializer=SERIALIZER_NAME,
+        )
+    except Exception:
+        PUBLISH_FAILURES.inc()
+        raise
+    PUBLISH_LATENCY_MS.observe((time.perf_counter() - start) * 1000)
+    PUBLISHED_EVENTS.inc(events)
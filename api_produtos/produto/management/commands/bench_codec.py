@@ -0,0 +1,114 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Compara o codec binário de eventos de produto com o JSON padrão do Celery"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--messages", type=int, default=2000, help="Mensagens por cenário (padrão: 2000)"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Produtos por mensagem no cenário em lote (padrão: 100)",
+        )
+        parser.add_argument(
+            "--descricao-size",
+            type=int,
+            default=200,
+            help="Tamanho da descrição gerada, em caracteres (padrão: 200)",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Emite o resultado em JSON"
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Mede bytes no fio e vazão de encode/decode dos dois serializadores."""
+        import json
+        import random
+        import string
+        from datetime import UTC, datetime
+        from decimal import Decimal
+
+        from kombu.serialization import registry
+
+        from produto.kiwi.codec import SERIALIZER_NAME, register_codec
+
+        register_codec()
+
+        def random_product(sku):
+            agora = datetime.now(UTC)
+            palavras = "".join(
+                random.choices(string.ascii_lowercase + " ", k=options["descricao_size"])
+            )
+            return {
+                "sku": sku,
+                "nome": f"Product {sku}",
+                "descricao": palavras,
+                "preco": Decimal(random.randint(1000, 100000)) / 100,
+                "estoque": random.randint(0, 500),
+                "criado_em": agora,
+                "atualizado_em": agora,
+                "versao": random.randint(1, 50),
+            }
+
+        # Mesmo formato de corpo que o Celery publica (protocolo 2).
+        embed = {"callbacks": None, "errbacks": None, "chain": None, "chord": None}
+        scenarios = {
+            "single": [
+                ([random_product(sku)], {}, embed) for sku in range(options["messages"])
+            ],
+            "batch": [
+                (
+                    [[random_product(i * options["batch_size"] + j)
+                      for j in range(options["batch_size"])]],
+                    {},
+                    embed,
+                )
+                for i in range(max(options["messages"] // options["batch_size"], 1))
+            ],
+        }
+
+        results = []
+        for scenario, bodies in scenarios.items():
+            for serializer in ("json", SERIALIZER_NAME):
+                results.append(self._measure(registry, scenario, serializer, bodies))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'cenário':<8} {'serializador':<16} {'bytes/msg':>10} "
+            f"{'encode msg/s':>13} {'decode msg/s':>13}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['scenario']:<8} {result['serializer']:<16} "
+                f"{result['bytes_per_message']:>10.0f} "
+                f"{result['encode_per_second']:>13.0f} {result['decode_per_second']:>13.0f}"
+            )
+
+    def _measure(self, registry, scenario, serializer, bodies):
+        import time
+
+        start = time.perf_counter()
+        encoded = [registry.dumps(body, serializer=serializer) for body in bodies]
+        encode_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for content_type, content_encoding, data in encoded:
+            registry.loads(data, content_type, content_encoding)
+        decode_elapsed = time.perf_counter() - start
+
+        total_bytes = sum(len(data) for _, _, data in encoded)
+        return {
+            "scenario": scenario,
+            "serializer": serializer,
+            "messages": len(bodies),
+            "bytes_per_message": total_bytes / len(bodies),
+            "encode_per_second": len(bodies) / encode_elapsed,
+            "decode_per_second": len(bodies) / decode_elapsed,
+        }
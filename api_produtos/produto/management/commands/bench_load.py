@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Gera carga de inserções/atualizações de produtos a uma taxa fixa (benchmark)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rate", type=float, default=200.0, help="Gravações por segundo (padrão: 200)"
+        )
+        parser.add_argument(
+            "--duration", type=float, default=10.0, help="Duração em segundos (padrão: 10)"
+        )
+        parser.add_argument(
+            "--update-ratio",
+            type=float,
+            default=0.3,
+            help="Fração das gravações que atualiza um SKU já criado (padrão: 0.3)",
+        )
+        parser.add_argument(
+            "--first-sku", type=int, default=1, help="Primeiro SKU criado (padrão: 1)"
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Emite o resultado em JSON"
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Grava produtos pelo caminho normal (save → outbox) no ritmo pedido."""
+        import json
+        import random
+        import time
+        from decimal import Decimal
+
+        from produto.models import Produto
+
+        rate, duration = options["rate"], options["duration"]
+        total = int(rate * duration)
+        next_sku = options["first_sku"]
+        inserted, updated, behind = [], 0, 0
+
+        start = time.perf_counter()
+        for index in range(total):
+            # Agenda absoluto: atrasos não acumulam e a taxa média se mantém.
+            delay = start + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                behind += 1
+
+            if inserted and random.random() < options["update_ratio"]:
+                produto = Produto.objects.get(sku=random.choice(inserted))
+                produto.estoque = random.randint(0, 500)
+                produto.preco = Decimal(random.randint(1000, 100000)) / 100
+                produto.save()
+                updated += 1
+            else:
+                Produto.objects.create(
+                    sku=next_sku,
+                    nome=f"Bench {next_sku}",
+                    descricao=f"Produto de benchmark {next_sku}",
+                    preco=Decimal(random.randint(1000, 100000)) / 100,
+                    estoque=random.randint(0, 500),
+                )
+                inserted.append(next_sku)
+                next_sku += 1
+
+        elapsed = time.perf_counter() - start
+        result = {
+            "events": total,
+            "inserts": len(inserted),
+            "updates": updated,
+            "target_rate": rate,
+            "achieved_rate": total / elapsed if elapsed else 0.0,
+            "elapsed_s": elapsed,
+            "behind_schedule": behind,
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(result))
+        else:
+            self.stdout.write(
+                f"✅ {total} gravações ({len(inserted)} inserções, {updated} atualizações) "
+                f"em {elapsed:.1f}s — {result['achieved_rate']:.0f}/s"
+            )
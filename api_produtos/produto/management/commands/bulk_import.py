@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Importa um catálogo CSV/JSONL em blocos, com um evento por bloco"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo .csv ou .jsonl com os produtos")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            default=None,
+            help="Formato do arquivo (padrão: deduzido pela extensão)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Produtos por bloco/evento (padrão: 5000)",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Lê o arquivo em streaming e grava os produtos com bulk_create."""
+        import time
+
+        from produto.importer import (
+            DEFAULT_CHUNK_SIZE,
+            detect_format,
+            import_products,
+            iter_records,
+        )
+
+        path = options["path"]
+        chunk_size = options["chunk_size"] or DEFAULT_CHUNK_SIZE
+        try:
+            file_format = options["format"] or detect_format(path)
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        start = time.perf_counter()
+
+        def progress(result):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"  📦 {result['importados']} produtos em {result['lotes']} blocos "
+                f"({result['importados'] / elapsed:.0f}/s)"
+            )
+
+        self.stdout.write(f"📥 Importando {path} ({file_format}, blocos de {chunk_size})...")
+        with open(path, encoding="utf-8", newline="") as stream:
+            result = import_products(iter_records(stream, file_format), chunk_size, progress)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {result['importados']} produtos importados em {result['lotes']} blocos "
+                f"em {elapsed:.1f}s ({result['invalidos']} registros inválidos descartados)"
+            )
+        )
@@ -0,0 +1,135 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Publica em lotes os eventos pendentes do outbox de produtos"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Eventos por mensagem (padrão: settings.OUTBOX_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Espera entre varreduras quando o outbox está vazio "
+            "(padrão: settings.OUTBOX_RELAY_INTERVAL)",
+        )
+        parser.add_argument(
+            "--coalesce-window-ms",
+            type=float,
+            default=None,
+            help="Janela em que só o estado mais recente de cada SKU é publicado; "
+            "0 desliga o agrupamento (padrão: settings.OUTBOX_COALESCE_WINDOW_MS)",
+        )
+        parser.add_argument(
+            "--coalesce-max-skus",
+            type=int,
+            default=None,
+            help="SKUs/eventos em memória antes de publicar a janela "
+            "(padrão: settings.OUTBOX_COALESCE_MAX_SKUS)",
+        )
+        parser.add_argument(
+            "--buffer-policy",
+            choices=["block", "drop_oldest", "spill", "none"],
+            default=None,
+            help="Política da fila em memória do publicador quando cheia; 'none' publica "
+            "de forma síncrona (padrão: settings.OUTBOX_BUFFER_POLICY)",
+        )
+        parser.add_argument(
+            "--buffer-max-items",
+            type=int,
+            default=None,
+            help="Produtos na fila em memória (padrão: settings.OUTBOX_BUFFER_MAX_ITEMS)",
+        )
+        parser.add_argument(
+            "--shutdown-timeout",
+            type=float,
+            default=10.0,
+            help="Espera pela fila ao encerrar, em segundos (padrão: 10)",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Drena o outbox uma vez e encerra"
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Executa o relay do outbox até ser interrompido (ou uma vez, com --once)."""
+        import signal
+        import time
+
+        from django.conf import settings
+
+        from produto.kiwi.buffer import BufferedPublisher
+        from produto.kiwi.outbox import CoalescingRelay, prune_outbox, relay_outbox
+
+        batch_size = options["batch_size"]
+        interval = options["interval"] or settings.OUTBOX_RELAY_INTERVAL
+        window_ms = options["coalesce_window_ms"]
+        if window_ms is None:
+            window_ms = settings.OUTBOX_COALESCE_WINDOW_MS
+
+        # SIGTERM (docker stop, systemd) encerra como o Ctrl+C, publicando a janela aberta.
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+        policy = options["buffer_policy"] or settings.OUTBOX_BUFFER_POLICY
+        publisher = None
+        if policy != "none":
+            publisher = BufferedPublisher(options["buffer_max_items"], policy)
+            publisher.start()
+
+        coalescer = None
+        if window_ms:
+            coalescer = CoalescingRelay(
+                window_ms, options["coalesce_max_skus"], batch_size, publisher=publisher
+            )
+
+        self.stdout.write("📤 Iniciando relay do outbox...")
+        try:
+            while True:
+                if coalescer is None:
+                    published = relay_outbox(batch_size, publisher)
+                    if published:
+                        self.stdout.write(f"  ✅ {published} produtos publicados")
+                    busy = published
+                else:
+                    read, published = coalescer.poll(), 0
+                    if coalescer.due() or (options["once"] and not read):
+                        published, collapsed = coalescer.flush()
+                        self._report_flush(published, collapsed)
+                    busy = read or published
+                # Fila do publisher saturada (broker fora): espera antes de reler o outbox.
+                if busy and not (publisher is not None and publisher.backpressure):
+                    continue
+
+                pruned = prune_outbox()
+                if pruned:
+                    self.stdout.write(f"  🧹 {pruned} eventos antigos removidos")
+                if options["once"]:
+                    break
+
+                # Janela vencida sem flush (fila do publisher cheia): espera o intervalo.
+                time_left = coalescer.time_left() if coalescer is not None else None
+                time.sleep(min(interval, time_left) if time_left else interval)
+        except KeyboardInterrupt:
+            self.stdout.write("Relay interrompido")
+        finally:
+            if coalescer is not None:
+                self._report_flush(*coalescer.flush())
+            if publisher is not None:
+                publisher.stop(options["shutdown_timeout"])
+                if publisher.depth:
+                    self.stdout.write(
+                        f"  ⏳ {publisher.depth} produtos continuam pendentes no outbox"
+                    )
+
+        self.stdout.write(self.style.SUCCESS("✅ Relay do outbox finalizado"))
+
+    def _report_flush(self, published: int, collapsed: int):
+        if published:
+            self.stdout.write(
+                f"  ✅ {published} produtos publicados ({collapsed} eventos colapsados)"
+            )
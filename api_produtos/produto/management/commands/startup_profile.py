@@ -0,0 +1,106 @@
+from django.core.management.base import BaseCommand
+
+# Cada alvo roda num interpretador novo com ``-X importtime``, como um processo
+# que acabou de subir: só o settings, o Django completo, o worker do Celery
+# (app + descoberta das tasks) ou a API (URLconf com o Ninja).
+TARGETS = {
+    "settings": "from django.conf import settings; settings.INSTALLED_APPS",
+    "django": "import django; django.setup()",
+    "worker": (
+        "from core.celery import celery_app; "
+        "celery_app.loader.import_default_modules(); celery_app.finalize()"
+    ),
+    "api": "import django; django.setup(); import core.urls",
+}
+
+
+class Command(BaseCommand):
+    help = "Mede o tempo de import de cada módulo na subida dos processos do serviço"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            choices=sorted(TARGETS),
+            action="append",
+            default=None,
+            help="Processo a medir; repita para vários (padrão: todos)",
+        )
+        parser.add_argument(
+            "--top", type=int, default=15, help="Módulos e pacotes listados por alvo (padrão: 15)"
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Execuções por alvo; o tempo reportado é a mediana (padrão: 5)",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Roda cada alvo em subprocessos e resume o import por módulo e por pacote."""
+        for target in options["target"] or TARGETS:
+            runs = [self._run(TARGETS[target]) for _ in range(options["repeat"])]
+            wall = sorted(run[0] for run in runs)[len(runs) // 2]
+            startup = sorted(run[1] for run in runs)[len(runs) // 2]
+            imports = runs[-1][2]
+
+            self.stdout.write(
+                f"🚀 {target}: {wall:.0f} ms no processo ({startup:.0f} ms de código), "
+                f"{len(imports)} módulos importados"
+            )
+            self._report_packages(imports, options["top"])
+            self._report_modules(imports, options["top"])
+
+    def _run(self, code: str) -> tuple[float, float, list[tuple[str, int, int]]]:
+        """Executa ``code`` num interpretador novo.
+
+        Returns:
+            Tempo total do processo (ms), tempo do ``code`` (ms) e a lista de
+            módulos importados como ``(nome, próprio µs, cumulativo µs)``.
+        """
+        import subprocess
+        import sys
+        import time
+
+        from django.conf import settings
+
+        script = f"import time\n_t = time.perf_counter()\n{code}\nprint(time.perf_counter() - _t)"
+        start = time.perf_counter()
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-X", "importtime", "-c", script],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        wall = (time.perf_counter() - start) * 1000
+        startup = float(result.stdout.strip().splitlines()[-1]) * 1000
+        return wall, startup, self._parse(result.stderr)
+
+    @staticmethod
+    def _parse(output: str) -> list[tuple[str, int, int]]:
+        imports = []
+        for line in output.splitlines():
+            if not line.startswith("import time:") or "imported package" in line:
+                continue
+            own, cumulative, name = line.removeprefix("import time:").split("|")
+            imports.append((name.strip(), int(own), int(cumulative)))
+        return imports
+
+    def _report_packages(self, imports, top: int):
+        from collections import Counter
+
+        packages, modules = Counter(), Counter()
+        for name, own, _ in imports:
+            package = name.split(".")[0]
+            packages[package] += own
+            modules[package] += 1
+
+        self.stdout.write("  📦 por pacote (tempo próprio somado):")
+        for package, own in packages.most_common(top):
+            self.stdout.write(f"    {own / 1000:8.1f} ms  {modules[package]:>4} módulos  {package}")
+
+    def _report_modules(self, imports, top: int):
+        self.stdout.write("  📄 por módulo (cumulativo / próprio):")
+        for name, own, cumulative in sorted(imports, key=lambda item: -item[2])[:top]:
+            self.stdout.write(f"    {cumulative / 1000:8.1f} ms  {own / 1000:8.1f} ms  {name}")
@@ -0,0 +1,32 @@
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("produto", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProdutoEvento",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "payload",
+                    models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder),
+                ),
+                ("criado_em", models.DateTimeField(auto_now_add=True)),
+                ("publicado_em", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("publicado_em__isnull", True)),
+                        fields=["id"],
+                        name="produto_evento_pendente_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("produto", "0002_produtoevento"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="produto",
+            name="versao",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
-from django.db.models import Manager
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router, transaction
+from django.db.models import Manager, Q
 
 
 # Create your models here.
@@ -11,12 +12,35 @@ class Produto(models.Model):
     estoque = models.IntegerField()
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
+    versao = models.PositiveBigIntegerField(default=0)
 
     objects = Manager()
 
     def __str__(self):
         return f"{self.nome} - {self.preco}"
 
+    def save(self, *args, **kwargs):
+        # Cada gravação gera uma versão nova; o feed só aplica eventos mais novos
+        # que a linha que já tem, então a ordem de chegada deixa de importar.
+        # O post_save grava o evento no outbox; a transação garante que a linha
+        # do produto e o evento sejam confirmados (ou desfeitos) juntos.
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            # A versão parte da gravada no banco, com a linha travada até o commit,
+            # e não da carregada na instância: uma instância antiga (ou um
+            # adjust_stock concorrente) não pode fazer a versão voltar.
+            stored = (
+                Produto.objects.using(using)
+                .select_for_update()
+                .filter(pk=self.pk)
+                .values_list("versao", flat=True)
+                .first()
+            )
+            self.versao = (stored if stored is not None else self.versao or 0) + 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "versao"}
+            super().save(*args, **kwargs)
+
     def to_dict(self):
         return {
             "sku": self.sku,
@@ -26,4 +50,47 @@ class Produto(models.Model):
             "estoque": self.estoque,
             "criado_em": self.criado_em,
             "atualizado_em": self.atualizado_em,
+            "versao": self.versao,
         }
+
+
+class ProdutoEvento(models.Model):
+    """Outbox transacional de eventos de produto aguardando publicação."""
+
+    id = models.BigAutoField(primary_key=True)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    publicado_em = models.DateTimeField(null=True, blank=True)
+
+    objects = Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=Q(publicado_em__isnull=True),
+                name="produto_evento_pendente_idx",
+            ),
+        ]
+
+    def __str__(self):
+        status = "publicado" if self.publicado_em else "pendente"
+        return f"Evento {self.id} ({len(self.payload)} produtos, {status})"
+
+
+class OutboxLimpeza(models.Model):
+    """Marca d'água da limpeza do outbox: o maior ``id`` de ``ProdutoEvento`` já removido.
+
+    ``prune_outbox`` remove por ``publicado_em``, não por prefixo de ``id``, e o
+    outbox tem lacunas de transações desfeitas; só com a marca o catch-up de um
+    feed novo sabe se eventos depois da sua posição foram removidos. Linha única.
+    """
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    removidos_ate = models.BigIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    objects = Manager()
+
+    def __str__(self):
+        return f"Outbox limpo até o evento {self.removidos_ate}"
@@ -6,8 +6,9 @@ from produto.models import Produto
 
 @receiver(post_save, sender=Produto)
 def create_produto(sender, instance, created, **kwargs):
-    from produto.kiwi.publisher import send_product
+    from produto.kiwi.outbox import enqueue_products
 
     print(f"\nPassando dentro do Signal.\nInstância: {instance}\nCriada: {created}")
-    if created:
-        send_product(instance)
+    # Toda gravação (criação ou atualização) vira evento versionado no outbox,
+    # dentro da transação do save; o relay publica depois.
+    enqueue_products([instance.to_dict()], using=kwargs.get("using"))
@@ -0,0 +1,71 @@
+"""Ajuste de estoque sem ler-modificar-gravar.
+
+O estoque muda muito mais que os outros campos do produto. Em vez de carregar
+o ``Produto``, alterar e chamar ``save()`` (que trava a linha pelo tempo da
+leitura e publica o ``to_dict()`` inteiro, com ``descricao``), o ajuste é um
+único ``UPDATE ... SET estoque = estoque + delta`` e o evento publicado é
+compacto: só ``sku``, ``estoque``, ``versao`` e ``atualizado_em``.
+
+O evento leva o estoque resultante, não o delta, para continuar idempotente
+e sujeito ao last-writer-wins por ``versao`` no feed.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from produto.kiwi.outbox import enqueue_products
+from produto.models import Produto
+
+STOCK_EVENT = "estoque"
+
+
+class EstoqueInsuficienteError(Exception):
+    """O ajuste deixaria o estoque negativo."""
+
+
+def stock_event(sku: int, estoque: int, versao: int, atualizado_em) -> dict:
+    return {
+        "sku": sku,
+        "estoque": estoque,
+        "versao": versao,
+        "atualizado_em": atualizado_em,
+        "tipo": STOCK_EVENT,
+    }
+
+
+def is_stock_event(payload: dict) -> bool:
+    return payload.get("tipo") == STOCK_EVENT
+
+
+def adjust_stock(sku: int, delta: int) -> dict | None:
+    """Soma ``delta`` ao estoque do produto de forma atômica e registra o evento no outbox.
+
+    Returns:
+        O evento de estoque publicado, ou ``None`` se o produto não existe.
+
+    Raises:
+        EstoqueInsuficienteError: se ``delta`` deixaria o estoque negativo.
+    """
+    with transaction.atomic():
+        queryset = Produto.objects.filter(sku=sku)
+        if delta < 0:
+            queryset = queryset.filter(estoque__gte=-delta)
+        updated = queryset.update(
+            estoque=F("estoque") + delta,
+            versao=F("versao") + 1,
+            atualizado_em=timezone.now(),
+        )
+        if not updated:
+            if Produto.objects.filter(sku=sku).exists():
+                msg = f"Estoque insuficiente para o produto {sku}"
+                raise EstoqueInsuficienteError(msg)
+            return None
+
+        # A linha continua travada pelo UPDATE até o commit: a leitura vê o nosso valor.
+        estoque, versao, atualizado_em = (
+            Produto.objects.filter(sku=sku).values_list("estoque", "versao", "atualizado_em").get()
+        )
+        event = stock_event(sku, estoque, versao, atualizado_em)
+        enqueue_products([event])
+    return event
@@ -0,0 +1,18 @@
+from celery import shared_task
+
+
+@shared_task(name="relay_product_outbox")
+def relay_product_outbox(max_batches: int = 100):
+    """Drena o outbox de produtos em lotes (agendado pelo Celery beat)."""
+    from produto.kiwi.outbox import prune_outbox, relay_outbox
+
+    total = 0
+    for _ in range(max_batches):
+        published = relay_outbox()
+        if not published:
+            break
+        total += published
+
+    pruned = prune_outbox()
+    print(f"Relay do outbox: {total} produtos publicados, {pruned} eventos removidos")
+    return total
@@ -1,3 +1,460 @@
-from django.test import TestCase
+import contextvars
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core import db_router
+from core.db_router import (
+    PIN_COOKIE,
+    REPLICA_ALIAS,
+    PrimaryPinningMiddleware,
+    ReplicaRouter,
+    replica_reads,
+)
+from produto.bootstrap import PosicaoExpiradaError, events_after, snapshot_position
+from produto.importer import import_products, iter_records
+from produto.kiwi import codec
+from produto.kiwi.buffer import DROP_OLDEST, SPILL, BufferedPublisher
+from produto.kiwi.outbox import (
+    CoalescingRelay,
+    enqueue_products,
+    prune_outbox,
+    relay_outbox,
+)
+from produto.kiwi.partitions import jump_hash, partition_for, queue_name
+from produto.metrics import PUBLISH_BUFFER_DEPTH, REGISTRY
+from produto.models import Produto, ProdutoEvento
+from produto.reconcile import range_digests, row_digest
+from produto.stock import adjust_stock, stock_event
+
+
+def criar_produto(sku: int = 1, **campos) -> Produto:
+    valores = {"nome": f"Produto {sku}", "descricao": "d", "preco": Decimal("10.00"), "estoque": 5}
+    return Produto.objects.create(sku=sku, **{**valores, **campos})
+
+
+class OutboxTests(TestCase):
+    def test_relay_com_a_fila_saturada_nao_rele_eventos_descartados(self):
+        for sku in range(3):
+            criar_produto(sku)
+        publisher = BufferedPublisher(max_items=2, policy=DROP_OLDEST)
+
+        publicados = [relay_outbox(batch_size=1, publisher=publisher) for _ in range(4)]
+
+        self.assertEqual(publicados, [1, 1, 1, 0])
+        self.assertTrue(publisher.backpressure)
+
+    def test_save_desfeito_nao_deixa_evento(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            criar_produto()
+            raise RuntimeError
+
+        self.assertFalse(Produto.objects.exists())
+        self.assertFalse(ProdutoEvento.objects.exists())
+
+    @patch("produto.kiwi.publisher.send_products")
+    def test_relay_publica_em_ordem_e_marca_os_eventos(self, send_products):
+        criar_produto(1)
+        criar_produto(2)
+
+        self.assertEqual(relay_outbox(batch_size=10), 2)
+
+        payloads = send_products.call_args.args[0]
+        self.assertEqual([payload["sku"] for payload in payloads], [1, 2])
+        self.assertFalse(ProdutoEvento.objects.filter(publicado_em__isnull=True).exists())
+        self.assertEqual(relay_outbox(batch_size=10), 0)
+
+    @patch("produto.kiwi.publisher.send_products", side_effect=ConnectionError)
+    def test_falha_na_publicacao_mantem_os_eventos_pendentes(self, _):
+        criar_produto()
+
+        with self.assertRaises(ConnectionError):
+            relay_outbox()
+
+        self.assertTrue(ProdutoEvento.objects.filter(publicado_em__isnull=True).exists())
+
+
+@patch("produto.kiwi.publisher.send_products")
+class CoalescingRelayTests(TestCase):
+    def test_publica_so_a_versao_mais_nova_de_cada_sku(self, send_products):
+        produto = criar_produto(1)
+        for preco in ("11.00", "12.00"):
+            produto.preco = Decimal(preco)
+            produto.save()
+        criar_produto(2)
+        relay = CoalescingRelay(window_ms=0)
+
+        self.assertEqual(relay.poll(), 4)
+        self.assertTrue(relay.due())
+        self.assertEqual(relay.flush(), (2, 2))
+
+        payloads = {payload["sku"]: payload for payload in send_products.call_args.args[0]}
+        self.assertEqual((payloads[1]["versao"], payloads[1]["preco"]), (3, "12.00"))
+        self.assertFalse(ProdutoEvento.objects.filter(publicado_em__isnull=True).exists())
+
+    def test_ajuste_de_estoque_nao_apaga_a_mudanca_completa_da_janela(self, send_products):
+        produto = criar_produto(1)
+        produto.nome = "Renomeado"
+        produto.save()
+        adjust_stock(1, 10)
+        relay = CoalescingRelay(window_ms=0)
+
+        relay.poll()
+        relay.flush()
+
+        (payload,) = send_products.call_args.args[0]
+        campos = (payload["nome"], payload["estoque"], payload["versao"])
+        self.assertEqual(campos, ("Renomeado", 15, 3))
+        self.assertNotIn("tipo", payload)
+
+    def test_limite_de_skus_fecha_a_janela_antes_do_prazo(self, send_products):
+        for sku in range(3):
+            criar_produto(sku)
+        relay = CoalescingRelay(window_ms=60_000, max_skus=2)
+
+        self.assertEqual(relay.poll(), 2)
+        self.assertTrue(relay.due())
+        relay.flush()
+
+        self.assertEqual(ProdutoEvento.objects.filter(publicado_em__isnull=True).count(), 1)
+        send_products.assert_called_once()
+
+
+class ParticaoTests(SimpleTestCase):
+    def test_particao_de_cada_sku_e_fixa(self):
+        # Mesmos valores em feed/tests.py (api_feed): produtor e consumidor concordam.
+        particoes = [partition_for(sku, 8) for sku in range(10)]
+        self.assertEqual(particoes, [0, 6, 6, 3, 1, 4, 5, 0, 4, 7])
+
+    def test_nova_particao_so_recebe_skus_sem_mover_os_demais(self):
+        movidos = [sku for sku in range(10_000) if jump_hash(sku, 8) != jump_hash(sku, 9)]
+
+        self.assertTrue(all(jump_hash(sku, 9) == 8 for sku in movidos))
+        self.assertLess(abs(len(movidos) - 10_000 / 9), 200)
+
+    def test_uma_particao_usa_a_fila_original(self):
+        self.assertEqual(queue_name(0, 1), "product_reply")
+        self.assertEqual(queue_name(3, 4), "product_reply.3")
+
+
+class CodecTests(SimpleTestCase):
+    def test_ida_e_volta_de_produto_e_evento_de_estoque(self):
+        produto = {
+            "sku": 1,
+            "nome": "Caneca",
+            "descricao": "",
+            "preco": Decimal("19.90"),
+            "estoque": 3,
+            "criado_em": timezone.now(),
+            "atualizado_em": timezone.now(),
+            "versao": 2,
+            "evento_id": "0" * 31 + "1",
+        }
+        estoque = stock_event(1, 4, 3, timezone.now())
+        estoque["evento_id"] = "f" * 32
+
+        self.assertEqual(codec.decode(codec.encode([[produto, estoque]])), [[produto, estoque]])
+
+    def test_corpo_grande_sai_comprimido_e_volta_igual(self):
+        body = [{"sku": sku, "nome": "x" * 50, "extra": [Decimal("1.5")]} for sku in range(100)]
+
+        data = codec.encode(body)
+
+        self.assertEqual(data[1], 1)
+        self.assertEqual(codec.decode(data), body)
+
+    def test_versao_de_formato_desconhecida_e_recusada(self):
+        data = codec.encode({"sku": 1})
+
+        with self.assertRaises(ValueError):
+            codec.decode(bytes((codec.FORMAT_VERSION + 1,)) + data[1:])
+
+
+class VersaoTests(TestCase):
+    def test_save_incrementa_versao_a_cada_gravacao(self):
+        produto = criar_produto()
+        self.assertEqual(produto.versao, 1)
+
+        produto.preco = Decimal("12.00")
+        produto.save()
+
+        self.assertEqual(Produto.objects.get(sku=1).versao, 2)
+
+    def test_save_de_instancia_antiga_continua_aumentando_a_versao(self):
+        criar_produto()
+        antiga = Produto.objects.get(sku=1)
+        outra = Produto.objects.get(sku=1)
+        outra.nome = "Novo nome"
+        outra.save()
+
+        antiga.preco = Decimal("99.00")
+        antiga.save()
+
+        self.assertEqual(antiga.versao, 3)
+        self.assertEqual(Produto.objects.get(sku=1).versao, 3)
+        self.assertEqual(ProdutoEvento.objects.order_by("-id").first().payload[0]["versao"], 3)
+
+    def test_save_depois_de_adjust_stock_continua_aumentando_a_versao(self):
+        criar_produto()
+        antiga = Produto.objects.get(sku=1)
+        adjust_stock(1, 3)
+        adjust_stock(1, -2)
+        self.assertEqual(Produto.objects.get(sku=1).versao, 3)
+
+        antiga.preco = Decimal("15.00")
+        antiga.save()
+
+        produto = Produto.objects.get(sku=1)
+        self.assertEqual(produto.versao, 4)
+        self.assertEqual(produto.preco, Decimal("15.00"))
+        versoes = [evento.payload[0]["versao"] for evento in ProdutoEvento.objects.order_by("id")]
+        self.assertEqual(versoes, [1, 2, 3, 4])
+
+
+class ListagemTests(TestCase):
+    def setUp(self):
+        for sku in (5, 1, 3, 4, 2):
+            criar_produto(sku)
+
+    def test_paginas_por_cursor_cobrem_o_catalogo_em_ordem(self):
+        skus, cursor = [], None
+        while True:
+            params = {"limit": 2, "fields": "nome"}
+            if cursor is not None:
+                params["cursor"] = cursor
+            page = self.client.get("/produtos/", params).json()
+            self.assertTrue(all(set(item) == {"sku", "nome"} for item in page["items"]))
+            skus.extend(item["sku"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(skus, [1, 2, 3, 4, 5])
+
+    def test_campos_e_limites_invalidos_devolvem_400(self):
+        self.assertEqual(self.client.get("/produtos/", {"limit": 0}).status_code, 400)
+        self.assertEqual(self.client.get("/produtos/", {"fields": "senha"}).status_code, 400)
+
+    def test_export_em_ndjson(self):
+        response = self.client.get("/produtos/export", {"fields": "sku", "chunk_size": 2})
+
+        linhas = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(linha)["sku"] for linha in linhas], [1, 2, 3, 4, 5])
+        self.assertEqual(json.loads(linhas[0]), {"sku": 1})
+
+
+class BatchTests(TestCase):
+    def test_itens_na_ordem_pedida_com_null_e_missing(self):
+        criar_produto(1)
+        criar_produto(2)
+
+        response = self.client.post(
+            "/produtos/batch?fields=nome",
+            {"skus": [2, 9, 1, 2]},
+            content_type="application/json",
+        )
+
+        body = response.json()
+        self.assertEqual(
+            body["items"],
+            [
+                {"sku": 2, "nome": "Produto 2"},
+                None,
+                {"sku": 1, "nome": "Produto 1"},
+                {"sku": 2, "nome": "Produto 2"},
+            ],
+        )
+        self.assertEqual(body["missing"], [9])
+
+    def test_lote_acima_do_limite_devolve_400(self):
+        response = self.client.post(
+            "/produtos/batch", {"skus": list(range(5001))}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class DigestTests(TestCase):
+    def test_digest_da_linha_e_o_mesmo_do_feed(self):
+        # O feed (feed/reconcile.py) fixa o mesmo valor: os dois algoritmos não podem divergir.
+        self.assertEqual(row_digest(1, "Caneca", Decimal("19.90"), 3), 0x342635B4CDE05AEB)
+
+    def test_digest_da_faixa_e_a_soma_das_subfaixas(self):
+        rows = [(sku, f"Produto {sku}", Decimal("10.00"), sku) for sku in range(10, 30)]
+
+        (inteira,) = range_digests(rows, 10, 30, 1)
+        partes = range_digests(rows, 10, 30, 4)
+
+        soma = sum(int(parte["digest"], 16) for parte in partes) & ((1 << 64) - 1)
+        self.assertEqual(int(inteira["digest"], 16), soma)
+        self.assertEqual([parte["count"] for parte in partes], [5, 5, 5, 5])
+
+    def test_endpoint_de_digests_cobre_o_catalogo(self):
+        for sku in (3, 8, 12):
+            criar_produto(sku)
+
+        body = self.client.get("/produtos/digests", {"parts": 2}).json()
+
+        self.assertEqual((body["lo"], body["hi"]), (3, 13))
+        self.assertEqual([faixa["count"] for faixa in body["ranges"]], [1, 2])
+
+
+class ImportacaoTests(TestCase):
+    def importar(self, conteudo: str, file_format: str, chunk_size: int = 2) -> dict:
+        return import_products(iter_records(io.StringIO(conteudo), file_format), chunk_size)
+
+    def test_linha_jsonl_malformada_e_descartada_e_contada(self):
+        conteudo = (
+            '{"sku": 1, "nome": "a", "preco": "1.50", "estoque": 1}\n'
+            '{"sku": 2, "nome": "b", "preco": \n'
+            "\n"
+            '{"sku": 3, "nome": "c", "preco": "3.00", "estoque": 3}\n'
+        )
+
+        result = self.importar(conteudo, "jsonl")
+
+        self.assertEqual(result, {"importados": 2, "invalidos": 1, "lotes": 2})
+        self.assertEqual(sorted(Produto.objects.values_list("sku", flat=True)), [1, 3])
+
+    def test_linha_csv_incompleta_e_descartada_e_contada(self):
+        conteudo = "sku,nome,preco,estoque\n1,a,1.50,1\n2,b,,2\n3,c,3.00,3\n"
+
+        result = self.importar(conteudo, "csv")
+
+        self.assertEqual(result["importados"], 2)
+        self.assertEqual(result["invalidos"], 1)
+
+    def test_importacao_atualiza_existentes_e_publica_um_evento_por_bloco(self):
+        criar_produto(1)
+        adjust_stock(1, 1)
+        conteudo = "sku,nome,preco,estoque\n1,a,1.50,1\n2,b,2.00,2\n3,c,3.00,3\n"
+        eventos_antes = ProdutoEvento.objects.count()
+
+        result = self.importar(conteudo, "csv")
+
+        self.assertEqual(result["lotes"], 2)
+        self.assertEqual(ProdutoEvento.objects.count(), eventos_antes + 2)
+        self.assertEqual(Produto.objects.get(sku=1).versao, 3)
+        self.assertEqual(Produto.objects.get(sku=2).versao, 1)
+
+
+class BufferedPublisherTests(SimpleTestCase):
+    def test_spill_recusa_lote_com_a_fila_cheia(self):
+        publisher = BufferedPublisher(max_items=2, policy=SPILL)
+
+        self.assertTrue(publisher.submit([[{"sku": 1}, {"sku": 2}]], [1]))
+        self.assertFalse(publisher.submit([[{"sku": 3}]], [2]))
+        self.assertEqual(publisher.depth, 2)
+        self.assertEqual(publisher.cursor, 1)
+
+    def test_drop_oldest_nao_recua_o_cursor_sobre_lotes_na_fila(self):
+        publisher = BufferedPublisher(max_items=2, policy=DROP_OLDEST)
+        for evento_id in (1, 2, 3):
+            self.assertTrue(publisher.submit([[{"sku": evento_id}]], [evento_id]))
+
+        self.assertEqual(publisher.depth, 2)
+        self.assertEqual(publisher.cursor, 3)
+        self.assertTrue(publisher.backpressure)
+
+    def test_stop_zera_a_profundidade_e_exporta(self):
+        publisher = BufferedPublisher(max_items=10, policy=SPILL)
+        publisher.submit([[{"sku": 1}]], [1])
+        self.assertEqual(PUBLISH_BUFFER_DEPTH.value, 1)
+
+        with (
+            patch("produto.kiwi.publisher.send_products", side_effect=ConnectionError),
+            patch.object(REGISTRY, "maybe_export") as maybe_export,
+            self.assertLogs("produto.kiwi.buffer", "ERROR"),
+        ):
+            publisher.start()
+            publisher.stop(timeout=0.1)
+
+        self.assertEqual(PUBLISH_BUFFER_DEPTH.value, 0)
+        maybe_export.assert_called_with(force=True)
+
+
+@patch("core.db_router.has_replica", return_value=True)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        # Gravações de outros testes fixaram este contexto no primário.
+        token = db_router._primary_until.set(0.0)
+        self.addCleanup(db_router._primary_until.reset, token)
+
+    def test_leitura_marcada_vai_para_a_replica(self, _):
+        self.assertEqual(self.router.db_for_read(Produto), DEFAULT_DB_ALIAS)
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Produto), REPLICA_ALIAS)
+
+    def test_escrita_fixa_as_leituras_no_primario(self, _):
+        def view():
+            with replica_reads():
+                self.router.db_for_write(Produto)
+                return self.router.db_for_read(Produto)
+
+        self.assertEqual(contextvars.copy_context().run(view), DEFAULT_DB_ALIAS)
+
+    def test_middleware_so_grava_o_cookie_quando_a_requisicao_escreveu(self, _):
+        request = RequestFactory().post("/produtos/batch")
+
+        def leitura(request):
+            return HttpResponse()
+
+        def escrita(request):
+            self.router.db_for_write(Produto)
+            return HttpResponse()
+
+        self.assertNotIn(PIN_COOKIE, PrimaryPinningMiddleware(leitura)(request).cookies)
+        self.assertIn(PIN_COOKIE, PrimaryPinningMiddleware(escrita)(request).cookies)
+
+
+class CatchUpTests(TestCase):
+    def criar_eventos(self, quantidade: int) -> list[int]:
+        return [enqueue_products([{"sku": sku, "versao": 1}]).id for sku in range(quantidade)]
+
+    def publicar_ha_dias(self, ids: list[int]):
+        ProdutoEvento.objects.filter(id__in=ids).update(
+            publicado_em=timezone.now() - timedelta(days=3)
+        )
+
+    def test_eventos_depois_da_posicao_em_ordem(self):
+        ids = self.criar_eventos(3)
+
+        eventos = events_after(ids[0], limit=10)
+
+        self.assertEqual([evento["id"] for evento in eventos], ids[1:])
+        self.assertEqual(eventos[0]["produtos"][0]["sku"], 1)
+
+    def test_lacuna_de_transacao_desfeita_nao_e_limpeza(self):
+        ids = self.criar_eventos(4)
+        ProdutoEvento.objects.filter(id__in=ids[:2]).delete()
+
+        self.assertEqual(len(events_after(ids[0] - 1, limit=10)), 2)
+
+    def test_limpeza_fora_de_ordem_depois_da_posicao_devolve_410(self):
+        pendente, *publicados = self.criar_eventos(3)
+        self.publicar_ha_dias(publicados)
+
+        self.assertEqual(prune_outbox(), 2)
+
+        with self.assertRaises(PosicaoExpiradaError):
+            events_after(pendente, limit=10)
+        response = self.client.get("/produtos/eventos", {"depois_de": pendente})
+        self.assertEqual(response.status_code, 410)
+
+    def test_posicao_do_snapshot_nunca_fica_atras_da_limpeza(self):
+        ids = self.criar_eventos(3)
+        self.publicar_ha_dias(ids[:2])
+        prune_outbox()
+
+        posicao = snapshot_position()
+
+        self.assertEqual(posicao, ids[1])
+        self.assertEqual([evento["id"] for evento in events_after(posicao, limit=10)], ids[2:])
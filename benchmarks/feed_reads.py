@@ -0,0 +1,159 @@
+"""Compara a vazão de leituras concorrentes do feed em WSGI (gunicorn) e ASGI (uvicorn).
+
+Os dois modos sobem com o mesmo número de workers sobre o mesmo banco SQLite
+(``ECOSSISTEM_BENCH_DIR``), já populado com ``seed_mirror``. Um cliente asyncio
+mantém ``--concurrency`` requisições em andamento contra ``GET /produtos/{sku}``
+durante ``--duration`` segundos, e o resultado sai em JSON.
+
+Uso:
+    uv run python benchmarks/feed_reads.py --workers 2 --concurrency 64 --output reads.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FEED_DIR = ROOT / "api_feed"
+
+SERVERS = {
+    "wsgi": lambda port, workers: [
+        sys.executable, "-m", "gunicorn", "core.wsgi:application",
+        "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+    ],
+    "asgi": lambda port, workers: [
+        sys.executable, "-m", "uvicorn", "core.asgi:application",
+        "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning",
+    ],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_listening(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    msg = f"Servidor não subiu na porta {port} em {timeout}s"
+    raise TimeoutError(msg)
+
+
+async def fetch(port: int, path: str) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n".encode()
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    return int(response.split(b" ", 2)[1])
+
+
+async def load(port: int, args: argparse.Namespace) -> dict:
+    latencies, errors = [], 0
+    deadline = time.monotonic() + args.duration
+
+    async def client():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            sku = random.randint(1, args.products)
+            start = time.perf_counter()
+            try:
+                status = await fetch(port, f"/produtos/{sku}")
+            except OSError:
+                errors += 1
+                continue
+            if status != 200:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    started = time.monotonic()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+
+    def rank(p):
+        return latencies[min(int(p / 100 * len(latencies)), len(latencies) - 1)] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": len(latencies) / elapsed,
+        "latency_ms": {"p50": rank(50), "p95": rank(95), "p99": rank(99)} if latencies else {},
+    }
+
+
+def run_mode(mode: str, env: dict, args: argparse.Namespace) -> dict:
+    port = free_port()
+    server = subprocess.Popen(SERVERS[mode](port, args.workers), cwd=FEED_DIR, env=env)
+    try:
+        wait_until_listening(port)
+        return asyncio.run(load(port, args))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--modes", nargs="+", choices=sorted(SERVERS), default=["wsgi", "asgi"])
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ecossistem-reads-") as workdir:
+        env = {**os.environ, "ECOSSISTEM_BENCH_DIR": workdir}
+        manage = [sys.executable, "manage.py"]
+        subprocess.run([*manage, "migrate", "-v0"], cwd=FEED_DIR, env=env, check=True)
+        subprocess.run(
+            [*manage, "seed_mirror", f"--count={args.products}"],
+            cwd=FEED_DIR,
+            env=env,
+            check=True,
+        )
+
+        result = {
+            "config": {
+                "workers": args.workers,
+                "concurrency": args.concurrency,
+                "duration_s": args.duration,
+                "products": args.products,
+            },
+            **{mode: run_mode(mode, env, args) for mode in args.modes},
+        }
+
+    rendered = json.dumps(result, indent=2)
+    if args.output:
+        args.output.write_text(rendered + "\n")
+    print(rendered)
+
+
+if __name__ == "__main__":
+    main()
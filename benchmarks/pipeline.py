@@ -0,0 +1,160 @@
+"""Benchmark ponta a ponta do pipeline produto → broker → feed numa só máquina.
+
+Sobe os dois serviços com ``ECOSSISTEM_BENCH_DIR`` (SQLite, broker kombu em
+arquivos e cache em memória), gera carga de gravações a uma taxa fixa na API de
+produtos, drena o outbox com o relay e consome no feed com o consumidor em
+lotes. Mede latência de propagação até o ``ProdutoMirror`` (p50/p95/p99) e
+eventos por segundo sustentados, e grava o resultado em JSON.
+
+Uso:
+    uv run python benchmarks/pipeline.py --rate 200 --duration 10 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PRODUTOS_DIR = ROOT / "api_produtos"
+FEED_DIR = ROOT / "api_feed"
+
+
+def manage(service_dir: Path, *args: str) -> list[str]:
+    return [sys.executable, str(service_dir / "manage.py"), *args]
+
+
+def last_json_line(output: str) -> dict:
+    """Os serviços ainda imprimem logs no stdout; o resultado é a última linha JSON."""
+    for line in reversed(output.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    msg = f"Nenhum resultado JSON na saída:\n{output[-2000:]}"
+    raise RuntimeError(msg)
+
+
+def wait_for(path: Path, timeout: float):
+    deadline = time.monotonic() + timeout
+    while not path.exists():
+        if time.monotonic() > deadline:
+            msg = f"{path} não apareceu em {timeout}s"
+            raise TimeoutError(msg)
+        time.sleep(0.1)
+
+
+def run(args: argparse.Namespace, workdir: Path) -> dict:
+    (workdir / "broker" / "data").mkdir(parents=True, exist_ok=True)
+    (workdir / "broker" / "control").mkdir(parents=True, exist_ok=True)
+    env = {**os.environ, "ECOSSISTEM_BENCH_DIR": str(workdir)}
+
+    for service_dir in (PRODUTOS_DIR, FEED_DIR):
+        subprocess.run(manage(service_dir, "migrate", "-v0"), cwd=service_dir, env=env, check=True)
+
+    expected = int(args.rate * args.duration)
+    consumer = subprocess.Popen(
+        manage(
+            FEED_DIR,
+            "bench_consume",
+            "--json",
+            f"--expected={expected}",
+            f"--max-items={args.max_items}",
+            f"--max-latency-ms={args.max_latency_ms}",
+        ),
+        cwd=FEED_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    relay = None
+    try:
+        # O consumidor declara o binding da fila; só então o produtor consegue rotear.
+        wait_for(workdir / "broker" / "control" / "product_events.exchange", timeout=60)
+
+        relay = subprocess.Popen(
+            manage(
+                PRODUTOS_DIR,
+                "relay_outbox",
+                f"--batch-size={args.relay_batch_size}",
+                f"--interval={args.relay_interval}",
+                # Sem agrupamento por SKU: o consumidor conta cada evento gravado.
+                "--coalesce-window-ms=0",
+            ),
+            cwd=PRODUTOS_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        load = subprocess.run(
+            manage(
+                PRODUTOS_DIR,
+                "bench_load",
+                "--json",
+                f"--rate={args.rate}",
+                f"--duration={args.duration}",
+                f"--update-ratio={args.update_ratio}",
+            ),
+            cwd=PRODUTOS_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        consumer_output, _ = consumer.communicate(timeout=args.duration + 120)
+    finally:
+        for process in (relay, consumer):
+            if process is not None and process.poll() is None:
+                process.send_signal(signal.SIGINT)
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    return {
+        "config": {
+            "rate": args.rate,
+            "duration_s": args.duration,
+            "update_ratio": args.update_ratio,
+            "relay_batch_size": args.relay_batch_size,
+            "relay_interval_s": args.relay_interval,
+            "feed_max_items": args.max_items,
+            "feed_max_latency_ms": args.max_latency_ms,
+        },
+        "producer": last_json_line(load.stdout),
+        "feed": last_json_line(consumer_output),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=200.0, help="Gravações por segundo")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duração da carga (s)")
+    parser.add_argument("--update-ratio", type=float, default=0.3)
+    parser.add_argument("--relay-batch-size", type=int, default=500)
+    parser.add_argument("--relay-interval", type=float, default=0.05)
+    parser.add_argument("--max-items", type=int, default=500)
+    parser.add_argument("--max-latency-ms", type=float, default=200.0)
+    parser.add_argument("--output", type=Path, default=None, help="Arquivo JSON de resultado")
+    parser.add_argument(
+        "--workdir", type=Path, default=None, help="Diretório de trabalho (padrão: temporário)"
+    )
+    args = parser.parse_args()
+
+    if args.workdir:
+        args.workdir.mkdir(parents=True, exist_ok=True)
+        result = run(args, args.workdir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="ecossistem-bench-") as workdir:
+            result = run(args, Path(workdir))
+
+    rendered = json.dumps(result, indent=2)
+    if args.output:
+        args.output.write_text(rendered + "\n")
+    print(rendered)
+
+
+if __name__ == "__main__":
+    main()